@@ -3,14 +3,17 @@ Sistema articoli/blog collegato alle aree di attività.
 Segue i pattern Wagtail: Page models, Snippets, ParentalManyToManyField.
 """
 from django.db import models
+from django.db.models import Prefetch
 from django.utils.html import strip_tags
 from wagtail.models import Page
 from wagtail.fields import RichTextField
 from wagtail.admin.panels import FieldPanel, MultiFieldPanel
 from wagtail.snippets.models import register_snippet
 from wagtail.search import index
+from wagtail.images.models import Rendition
 from modelcluster.fields import ParentalManyToManyField
 from services.models import ServiceArea
+from sld_project.renditions import SET_CARD, all_specs
 
 
 # ═══════════════════════════════════════════════════════════════════════════
@@ -71,7 +74,16 @@ class ArticleIndexPage(Page):
         
         # Filtro per categoria
         category_slug = request.GET.get('categoria')
-        articles = ArticlePage.objects.live().child_of(self).order_by('-first_published_at')
+        articles = (
+            ArticlePage.objects.live().child_of(self)
+            .select_related('category', 'cover_image')
+            .prefetch_related(Prefetch(
+                'cover_image__renditions',
+                queryset=Rendition.objects.filter(filter_spec__in=all_specs([SET_CARD])),
+                to_attr='prefetched_renditions',
+            ))
+            .order_by('-first_published_at')
+        )
         
         if category_slug:
             articles = articles.filter(category__slug=category_slug)
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from django.contrib import messages
+from django.db.models import Count
 from .models import Appointment
 from .email_service import send_booking_confirmation
 
@@ -36,9 +37,11 @@ class AppointmentAdmin(admin.ModelAdmin):
     ordering = ['-date', '-time']
     actions = [resend_confirmation_email]
     
-    @admin.display(description='📎 Allegati')
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(attachments_count=Count('attachments'))
+    
+    @admin.display(description='📎 Allegati', ordering='attachments_count')
     def allegati_count(self, obj):
-        count = obj.attachments.count()
-        if count == 0:
+        if obj.attachments_count == 0:
             return '—'
-        return f'✓ {count}'
+        return f'✓ {obj.attachments_count}'
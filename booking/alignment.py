@@ -0,0 +1,202 @@
+"""
+Verifica di allineamento tra appuntamenti locali e Google Calendar.
+
+Il confronto è un merge a due indici su liste già ordinate per orario:
+ogni appuntamento confermato cerca il primo evento Google che inizia
+entro ±TOLERANCE, avanzando l'indice degli eventi senza mai tornare
+indietro (O(n + m) invece di O(n·m)).
+
+La sincronizzazione forzata con Google non avviene più al caricamento
+della pagina: il pulsante "Aggiorna da Google" mette in coda una riga
+GoogleCalendarRefresh e la pagina interroga refresh_state() finché non
+termina. La esegue il worker delle anteprime
+(`manage.py process_document_previews --loop`), che la prende con
+SELECT … FOR UPDATE SKIP LOCKED come gli allegati e vi scrive
+l'avanzamento; un vincolo unico impedisce due aggiornamenti in coda
+anche se due utenti premono insieme il pulsante.
+"""
+import logging
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from .models import Appointment, GoogleCalendarEvent, GoogleCalendarRefresh
+
+logger = logging.getLogger(__name__)
+
+# Differenza massima tra appuntamento ed evento Google (esclusa)
+TOLERANCE = timedelta(minutes=5)
+
+# Un aggiornamento senza avanzamenti per questo tempo (secondi) è considerato interrotto
+REFRESH_TIMEOUT = getattr(settings, 'GOOGLE_CALENDAR_REFRESH_TIMEOUT', 5 * 60)
+# Intervallo minimo (secondi) tra due scritture dell'avanzamento
+PROGRESS_INTERVAL = 1
+
+
+def align_appointments(appointments, events, tolerance=TOLERANCE):
+    """
+    Abbina ogni appuntamento al primo evento Google entro la tolleranza.
+
+    `appointments` è una lista di coppie (appuntamento, data/ora) e `events`
+    una lista di eventi con start_datetime, entrambe in ordine crescente.
+    Come in precedenza, uno stesso evento può coprire più appuntamenti
+    allo stesso orario.
+    """
+    alignment_info = []
+    index = 0
+    for appointment, appt_datetime in appointments:
+        # Gli eventi troppo vecchi per questo appuntamento lo sono anche per i successivi
+        while index < len(events) and events[index].start_datetime <= appt_datetime - tolerance:
+            index += 1
+        matching_event = None
+        if index < len(events) and events[index].start_datetime < appt_datetime + tolerance:
+            matching_event = events[index]
+        alignment_info.append({
+            'appointment': appointment,
+            'datetime': appt_datetime,
+            'google_event': matching_event,
+            'is_aligned': matching_event is not None,
+        })
+    return alignment_info
+
+
+def alignment_report(now):
+    """Contesto della pagina di verifica: appuntamenti confermati futuri ed eventi Google."""
+    appointments = [
+        (appt, timezone.make_aware(datetime.combine(appt.date, appt.time)))
+        for appt in Appointment.objects.filter(date__gte=now.date(), status='confirmed').order_by('date', 'time')
+    ]
+    # (date, time) in ordine è anche ordine di data/ora, tranne al cambio dell'ora legale
+    appointments.sort(key=lambda item: item[1])
+    events = list(
+        GoogleCalendarEvent.objects.filter(start_datetime__gte=now).order_by('start_datetime')
+    )
+
+    alignment_info = align_appointments(appointments, events)
+    aligned_count = sum(1 for item in alignment_info if item['is_aligned'])
+    return {
+        'alignment_info': alignment_info,
+        'total_local': len(appointments),
+        'total_google': len(events),
+        'aligned_count': aligned_count,
+        'orphan_count': len(alignment_info) - aligned_count,
+    }
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# AGGIORNAMENTO IN BACKGROUND
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _update(job, **fields):
+    GoogleCalendarRefresh.objects.filter(pk=job.pk).update(updated_at=timezone.now(), **fields)
+
+
+def expire_stale_refresh(now=None):
+    """
+    Chiude con errore gli aggiornamenti fermi da più di REFRESH_TIMEOUT:
+    worker interrotto durante la sincronizzazione, o nessun worker attivo.
+    """
+    cutoff = (now or timezone.now()) - timedelta(seconds=REFRESH_TIMEOUT)
+    stale = GoogleCalendarRefresh.objects.filter(
+        status__in=GoogleCalendarRefresh.ACTIVE_STATUSES, updated_at__lt=cutoff
+    )
+    return stale.update(
+        status=GoogleCalendarRefresh.STATUS_ERROR,
+        phase='error',
+        error="Aggiornamento interrotto: il worker non ha risposto in tempo",
+        finished_at=now or timezone.now(),
+    )
+
+
+def refresh_state():
+    """Stato dell'ultimo aggiornamento da Google (None se mai richiesto)."""
+    expire_stale_refresh()
+    job = GoogleCalendarRefresh.objects.order_by('-pk').first()
+    if job is None:
+        return None
+
+    state = {
+        # Per la pagina "in coda" e "in corso" sono lo stesso stato, con fasi diverse
+        'status': 'running' if job.status in job.ACTIVE_STATUSES else job.status,
+        'phase': job.phase,
+        'done': job.done,
+        'total': job.total,
+        'updated_at': job.updated_at.isoformat(),
+    }
+    if job.error:
+        state['error'] = job.error
+    if job.finished_at:
+        state['finished_at'] = job.finished_at.isoformat()
+    return state
+
+
+def start_refresh():
+    """
+    Mette in coda un aggiornamento forzato, eseguito dal worker.
+
+    Restituisce False quando un altro aggiornamento è già in coda o in corso.
+    """
+    expire_stale_refresh()
+    if GoogleCalendarRefresh.objects.filter(status__in=GoogleCalendarRefresh.ACTIVE_STATUSES).exists():
+        return False
+    try:
+        with transaction.atomic():
+            GoogleCalendarRefresh.objects.create()
+    except IntegrityError:
+        # Richiesto nello stesso istante da un altro utente
+        return False
+    return True
+
+
+def claim_refresh():
+    """Segna "in corso" l'aggiornamento in coda e lo ritorna (None se non ce ne sono)."""
+    with transaction.atomic():
+        queryset = GoogleCalendarRefresh.objects.filter(
+            status=GoogleCalendarRefresh.STATUS_PENDING
+        ).order_by('pk')
+        if connection.features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True)
+        job = queryset.first()
+        if job is None:
+            return None
+        job.status, job.phase = GoogleCalendarRefresh.STATUS_RUNNING, 'download'
+        job.save(update_fields=['status', 'phase', 'updated_at'])
+    return job
+
+
+def refresh(job):
+    """Sincronizza Google Calendar (forzata) aggiornando lo stato nella riga."""
+    from .google_calendar import sync_google_calendar_events
+
+    last_update = {'phase': job.phase, 'at': 0.0}
+
+    def progress(phase, done=0, total=0):
+        # Una UPDATE al più ogni PROGRESS_INTERVAL, non una per evento
+        now = time.monotonic()
+        if phase == last_update['phase'] and done not in (0, total) and now - last_update['at'] < PROGRESS_INTERVAL:
+            return
+        last_update.update(phase=phase, at=now)
+        _update(job, phase=phase, done=done, total=total)
+
+    try:
+        sync_google_calendar_events(force=True, progress=progress)
+        _update(job, status=GoogleCalendarRefresh.STATUS_DONE, phase='done', finished_at=timezone.now())
+    except Exception as e:
+        logger.exception(f"Errore nell'aggiornamento da Google Calendar: {e}")
+        _update(
+            job, status=GoogleCalendarRefresh.STATUS_ERROR, phase='error',
+            error=str(e), finished_at=timezone.now(),
+        )
+
+
+def process_pending_refresh():
+    """Esegue l'aggiornamento in coda, se c'è. Ritorna True se ne ha eseguito uno."""
+    expire_stale_refresh()
+    job = claim_refresh()
+    if job is None:
+        return False
+    refresh(job)
+    return True
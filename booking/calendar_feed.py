@@ -0,0 +1,198 @@
+"""
+Feed JSON degli eventi per il calendario dell'admin.
+
+FullCalendar chiede gli eventi dell'intervallo visualizzato (parametri
+`start` ed `end`) a CalendarEventsView, invece di ricevere 60 giorni di
+eventi inline nella pagina. Il feed contiene:
+
+- eventi Google Calendar (appuntamenti telefonici);
+- prenotazioni online non annullate, con la durata da slot_count;
+- udienze delle domiciliazioni non annullate (un'ora, come nel file .ics;
+  senza orario come evento di tutto il giorno).
+
+Le query leggono solo le colonne necessarie con values(). Le risposte
+restano in cache per intervallo e versione dei dati (SCOPE_CALENDAR,
+aggiornata dai signal in sld_project/signals.py): navigare tra i mesi già
+visti non tocca il database.
+"""
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from sld_project.cache_policy import SCOPE_CALENDAR, SCOPE_SETTINGS, get_version
+
+from .models import Appointment, GoogleCalendarEvent
+
+# Intervallo massimo per richiesta (la vista mese ne chiede circa 42 giorni)
+MAX_RANGE = timedelta(days=100)
+# Le risposte sono indicizzate per versione: il TTL serve solo a liberare spazio
+CACHE_TTL = 24 * 60 * 60
+CACHE_KEY = 'booking:calendar_feed:{version}:{start}:{end}'
+
+# Durata presunta di un'udienza (vedi domiciliazioni/ical.py)
+HEARING_DURATION = timedelta(hours=1)
+
+
+def parse_bound(value):
+    """Estremo dell'intervallo di FullCalendar (data o data/ora ISO 8601)."""
+    if not value:
+        return None
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            parsed = datetime.combine(day, time.min) if day else None
+    except ValueError:
+        return None
+    if parsed is not None and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _local(day, hour):
+    return timezone.make_aware(datetime.combine(day, hour))
+
+
+def _days(start, end):
+    """Giorni locali dell'intervallo (end è escluso)."""
+    return timezone.localdate(start), timezone.localdate(end - timedelta(microseconds=1))
+
+
+def google_events(start, end):
+    rows = (
+        GoogleCalendarEvent.objects
+        .filter(start_datetime__lt=end, end_datetime__gt=start)
+        .order_by('start_datetime')
+        .values('id', 'summary', 'start_datetime', 'end_datetime')
+    )
+    return [
+        {
+            'id': f"google-{row['id']}",
+            'title': row['summary'],
+            'start': row['start_datetime'].isoformat(),
+            'end': row['end_datetime'].isoformat(),
+            'eventType': 'google',
+            'allDay': False,
+        }
+        for row in rows
+    ]
+
+
+def booking_events(start, end):
+    slot_duration = getattr(settings, 'BOOKING_SLOT_DURATION', 30)
+    start_day, end_day = _days(start, end)
+    rows = (
+        Appointment.objects
+        .filter(date__gte=start_day, date__lte=end_day)
+        .exclude(status='cancelled')
+        .order_by('date', 'time')
+        .values('id', 'first_name', 'last_name', 'date', 'time', 'slot_count', 'status')
+    )
+    events = []
+    for row in rows:
+        start_dt = _local(row['date'], row['time'])
+        events.append({
+            'id': f"booking-{row['id']}",
+            'title': f"{row['first_name']} {row['last_name']}",
+            'start': start_dt.isoformat(),
+            'end': (start_dt + timedelta(minutes=row['slot_count'] * slot_duration)).isoformat(),
+            'eventType': 'pending' if row['status'] == 'pending' else 'booking',
+            'url': reverse('wagtailsnippets_booking_appointment:edit', args=[row['id']]),
+            'allDay': False,
+        })
+    return events
+
+
+def hearing_events(start, end):
+    from domiciliazioni.models import DomiciliazioniSubmission, get_tribunale_choices
+
+    start_day, end_day = _days(start, end)
+    rows = (
+        DomiciliazioniSubmission.objects
+        .filter(data_udienza__gte=start_day, data_udienza__lte=end_day)
+        .exclude(status='cancelled')
+        .order_by('data_udienza', 'ora_udienza')
+        .values('id', 'numero_rg', 'tribunale', 'data_udienza', 'ora_udienza')
+    )
+    tribunali = dict(get_tribunale_choices())
+    events = []
+    for row in rows:
+        event = {
+            'id': f"hearing-{row['id']}",
+            'title': f"Udienza {row['numero_rg']} - {tribunali.get(row['tribunale'], row['tribunale'])}",
+            'eventType': 'hearing',
+            'url': reverse('wagtailsnippets_domiciliazioni_domiciliazionisubmission:edit', args=[row['id']]),
+        }
+        if row['ora_udienza']:
+            start_dt = _local(row['data_udienza'], row['ora_udienza'])
+            event.update(start=start_dt.isoformat(), end=(start_dt + HEARING_DURATION).isoformat(), allDay=False)
+        else:
+            event.update(start=row['data_udienza'].isoformat(), allDay=True)
+        events.append(event)
+    return events
+
+
+def calendar_events(start, end):
+    """Eventi di FullCalendar che cadono nell'intervallo [start, end)."""
+    return google_events(start, end) + booking_events(start, end) + hearing_events(start, end)
+
+
+def cached_calendar_events(start, end):
+    """calendar_events() in cache per intervallo e versione dei dati."""
+    # I nomi dei tribunali arrivano da SiteSettings
+    version = f"{get_version(SCOPE_CALENDAR)}-{get_version(SCOPE_SETTINGS)}"
+    key = CACHE_KEY.format(version=version, start=start.timestamp(), end=end.timestamp())
+    events = cache.get(key)
+    if events is None:
+        events = calendar_events(start, end)
+        cache.set(key, events, CACHE_TTL)
+    return events
+
+
+def upcoming_events(now, limit=25):
+    """Prossimi appuntamenti (Google + prenotazioni) per la lista sotto il calendario."""
+    events = []
+    google_rows = (
+        GoogleCalendarEvent.objects
+        .filter(start_datetime__gte=now, start_datetime__lte=now + timedelta(days=60))
+        .order_by('start_datetime')
+        .values('summary', 'start_datetime')[:20]
+    )
+    for row in google_rows:
+        local_start = timezone.localtime(row['start_datetime'])
+        events.append({
+            'date': local_start.date(),
+            'time': local_start.strftime('%H:%M'),
+            'title': row['summary'].replace('App ', '').replace('app ', ''),
+            'type': 'google',
+            'type_label': 'Tel.',
+            'sort_key': row['start_datetime'],
+        })
+
+    today = timezone.localdate(now)
+    appointment_rows = (
+        Appointment.objects
+        .filter(date__gte=today, date__lte=today + timedelta(days=60))
+        .exclude(status='cancelled')
+        .order_by('date', 'time')
+        .values('first_name', 'last_name', 'date', 'time', 'status')[:20]
+    )
+    for row in appointment_rows:
+        pending = row['status'] == 'pending'
+        events.append({
+            'date': row['date'],
+            'time': row['time'].strftime('%H:%M'),
+            'title': f"{row['first_name']} {row['last_name']}",
+            'type': 'pending' if pending else 'booking',
+            'type_label': 'Attesa' if pending else 'Online',
+            'sort_key': _local(row['date'], row['time']),
+        })
+
+    # Ordina per data/ora, più vicini in cima
+    events.sort(key=lambda event: event['sort_key'])
+    return events[:limit]
+
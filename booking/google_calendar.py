@@ -82,13 +82,15 @@ def fetch_calendar_events():
         return []
 
 
-def sync_google_calendar_events(force=False):
+def sync_google_calendar_events(force=False, progress=None):
     """
     Sincronizza gli eventi da Google Calendar al database locale.
     Usa cache per evitare chiamate troppo frequenti.
     
     Args:
         force: Se True, ignora la cache e sincronizza comunque
+        progress: callback opzionale progress(fase, fatti, totale),
+            usata dall'aggiornamento in background (booking/alignment.py)
     """
     from .models import GoogleCalendarEvent
     
@@ -127,7 +129,9 @@ def sync_google_calendar_events(force=False):
         logger.info(f"Eliminati {len(to_delete)} eventi non più nel calendario")
     
     # Aggiorna o crea eventi
-    for event in future_events:
+    if progress:
+        progress('save', 0, len(future_events))
+    for done, event in enumerate(future_events, start=1):
         GoogleCalendarEvent.objects.update_or_create(
             google_uid=event['uid'],
             defaults={
@@ -137,6 +141,8 @@ def sync_google_calendar_events(force=False):
                 'synced_at': timezone.now(),
             }
         )
+        if progress:
+            progress('save', done, len(future_events))
     
     # Imposta cache
     cache.set(cache_key, timezone.now(), cache_ttl)
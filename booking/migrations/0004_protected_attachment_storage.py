@@ -0,0 +1,19 @@
+import booking.models
+import sld_project.protected_media
+import sld_project.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0003_add_refund_and_payment_token_fields'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='appointmentattachment',
+            name='file',
+            field=models.FileField(storage=sld_project.protected_media.protected_storage, upload_to=booking.models.appointment_attachment_path, validators=[sld_project.validators.FileValidator(allowed_extensions={'.doc': 'application/msword', '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document', '.jpeg': 'image/jpeg', '.jpg': 'image/jpeg', '.odt': 'application/vnd.oasis.opendocument.text', '.pdf': 'application/pdf', '.png': 'image/png', '.rtf': 'application/rtf', '.tif': 'image/tiff', '.tiff': 'image/tiff', '.txt': 'text/plain', '.zip': 'application/zip'}, max_size=20971520)], verbose_name='File'),
+        ),
+    ]
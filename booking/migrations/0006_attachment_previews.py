@@ -0,0 +1,44 @@
+# Generated by Django 5.2.9 on 2026-10-19 00:31
+
+import sld_project.protected_media
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0005_deduplicated_attachment_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointmentattachment',
+            name='extracted_text',
+            field=models.TextField(blank=True, verbose_name='Testo estratto'),
+        ),
+        migrations.AddField(
+            model_name='appointmentattachment',
+            name='page_count',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Pagine'),
+        ),
+        migrations.AddField(
+            model_name='appointmentattachment',
+            name='preview_error',
+            field=models.CharField(blank=True, max_length=255, verbose_name='Errore anteprima'),
+        ),
+        migrations.AddField(
+            model_name='appointmentattachment',
+            name='preview_status',
+            field=models.CharField(choices=[('pending', 'In coda'), ('processing', 'In elaborazione'), ('done', 'Pronta'), ('unsupported', 'Formato senza anteprima'), ('failed', 'Errore')], db_index=True, default='pending', max_length=20, verbose_name='Stato anteprima'),
+        ),
+        migrations.AddField(
+            model_name='appointmentattachment',
+            name='preview_updated_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Anteprima aggiornata il'),
+        ),
+        migrations.AddField(
+            model_name='appointmentattachment',
+            name='thumbnail',
+            field=models.FileField(blank=True, storage=sld_project.protected_media.protected_storage, upload_to='previews/%Y/%m/', verbose_name='Miniatura'),
+        ),
+    ]
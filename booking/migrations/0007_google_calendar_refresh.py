@@ -0,0 +1,32 @@
+# Generated by Django 5.2.9 on 2026-10-19 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0006_attachment_previews'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GoogleCalendarRefresh',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'In coda'), ('running', 'In corso'), ('done', 'Completato'), ('error', 'Errore')], default='pending', max_length=10, verbose_name='Stato')),
+                ('phase', models.CharField(default='queued', max_length=20, verbose_name='Fase')),
+                ('done', models.PositiveIntegerField(default=0, verbose_name='Eventi salvati')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Eventi da salvare')),
+                ('error', models.TextField(blank=True, verbose_name='Errore')),
+                ('requested_at', models.DateTimeField(auto_now_add=True, verbose_name='Richiesto il')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Aggiornato il')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Terminato il')),
+            ],
+            options={
+                'verbose_name': 'Aggiornamento da Google Calendar',
+                'verbose_name_plural': 'Aggiornamenti da Google Calendar',
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status__in', ['pending', 'running'])), fields=('status',), name='booking_refresh_single_active')],
+            },
+        ),
+    ]
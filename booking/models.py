@@ -6,6 +6,9 @@ from modelcluster.fields import ParentalKey
 from modelcluster.models import ClusterableModel
 from wagtail.admin.panels import FieldPanel, InlinePanel, HelpPanel, MultiFieldPanel
 from wagtail.snippets.models import register_snippet
+from sld_project.dedup_storage import attachment_storage
+from sld_project.document_previews import DocumentPreviewPanel
+from sld_project.models import DocumentPreviewFields
 from sld_project.validators import validate_attachment_file
 
 
@@ -35,6 +38,49 @@ class GoogleCalendarEvent(models.Model):
         return int(delta.total_seconds() / 60)
 
 
+class GoogleCalendarRefresh(models.Model):
+    """
+    Aggiornamento forzato da Google Calendar richiesto dalla verifica di
+    allineamento. La tabella è la coda: lo esegue il worker delle
+    anteprime (manage.py process_document_previews), vedi booking/alignment.py.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_ERROR = 'error'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'In coda'),
+        (STATUS_RUNNING, 'In corso'),
+        (STATUS_DONE, 'Completato'),
+        (STATUS_ERROR, 'Errore'),
+    ]
+    ACTIVE_STATUSES = (STATUS_PENDING, STATUS_RUNNING)
+
+    status = models.CharField("Stato", max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    phase = models.CharField("Fase", max_length=20, default='queued')
+    done = models.PositiveIntegerField("Eventi salvati", default=0)
+    total = models.PositiveIntegerField("Eventi da salvare", default=0)
+    error = models.TextField("Errore", blank=True)
+    requested_at = models.DateTimeField("Richiesto il", auto_now_add=True)
+    updated_at = models.DateTimeField("Aggiornato il", auto_now=True)
+    finished_at = models.DateTimeField("Terminato il", null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Aggiornamento da Google Calendar"
+        verbose_name_plural = "Aggiornamenti da Google Calendar"
+        constraints = [
+            # Al più un aggiornamento in coda e uno in corso, anche con richieste simultanee
+            models.UniqueConstraint(
+                fields=['status'],
+                condition=models.Q(status__in=['pending', 'running']),
+                name='booking_refresh_single_active',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_status_display()} - {self.requested_at.strftime('%d/%m/%Y %H:%M')}"
+
+
 class AvailabilityRule(models.Model):
     """Regola di disponibilità ricorsiva per appuntamenti."""
     
@@ -340,7 +386,7 @@ def appointment_attachment_path(instance, filename):
     return f'appointments/{instance.appointment.id}/{filename}'
 
 
-class AppointmentAttachment(models.Model):
+class AppointmentAttachment(DocumentPreviewFields):
     """Allegato per un appuntamento."""
     
     appointment = ParentalKey(
@@ -352,6 +398,7 @@ class AppointmentAttachment(models.Model):
     file = models.FileField(
         "File", 
         upload_to=appointment_attachment_path,
+        storage=attachment_storage,
         validators=[validate_attachment_file]
     )
     original_filename = models.CharField("Nome file originale", max_length=255)
@@ -360,6 +407,7 @@ class AppointmentAttachment(models.Model):
     panels = [
         FieldPanel('file'),
         FieldPanel('original_filename', read_only=True),
+        DocumentPreviewPanel(heading="Anteprima"),
     ]
     
     class Meta:
@@ -5,7 +5,6 @@ from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 from django.conf import settings
-from django.core.exceptions import ValidationError
 from datetime import datetime, date, timedelta
 from decimal import Decimal
 import json
@@ -14,6 +13,8 @@ import logging
 from .models import Appointment, AvailabilityRule, BlockedDate, AppointmentAttachment
 from .email_service import send_booking_confirmation
 from .payment_service import payment_service
+from sld_project.attachments import save_uploads, validate_uploads
+from sld_project.uploads import MAX_ATTACHMENTS_TOTAL_SIZE
 from sld_project.validators import validate_attachment_file
 from sld_project.ratelimit import RateLimitMixin, RATE_LIMITS
 
@@ -64,7 +65,7 @@ def get_available_slots(request, date):
 
 class CreateCheckoutSession(RateLimitMixin, View):
     """Creates a payment checkout session for booking appointments."""
-    MAX_UPLOAD_SIZE = 20 * 1024 * 1024  # 20MB
+    MAX_UPLOAD_SIZE = MAX_ATTACHMENTS_TOTAL_SIZE  # 20MB
     PENDING_TIMEOUT_MINUTES = 30  # Timeout per appuntamenti pending
     rate_limit = RATE_LIMITS['booking']  # Rate limit: 10/minute per IP
     
@@ -75,17 +76,20 @@ class CreateCheckoutSession(RateLimitMixin, View):
                 data = request.POST.dict()
                 files = request.FILES.getlist('attachments')
                 
+                # Upload interrotto durante lo streaming (sld_project/uploads.py)
+                upload_error = getattr(request, 'upload_error', None)
+                if upload_error:
+                    return JsonResponse({'error': upload_error}, status=400)
+                
                 # Verifica dimensione totale file
                 total_size = sum(f.size for f in files)
                 if total_size > self.MAX_UPLOAD_SIZE:
                     return JsonResponse({'error': 'La dimensione totale degli allegati supera i 20MB'}, status=400)
                 
-                # Valida tipo e contenuto di ogni file
-                for f in files:
-                    try:
-                        validate_attachment_file(f)
-                    except ValidationError as e:
-                        return JsonResponse({'error': f'File "{f.name}": {e.message}'}, status=400)
+                # Valida tipo e contenuto dei file (in parallelo)
+                upload_error = validate_uploads(files, validate_attachment_file)
+                if upload_error:
+                    return JsonResponse({'error': upload_error}, status=400)
             else:
                 data = json.loads(request.body)
                 files = []
@@ -162,13 +166,8 @@ class CreateCheckoutSession(RateLimitMixin, View):
             if consultation_type == 'video':
                 appointment.save()
             
-            # Salva gli allegati
-            for f in files:
-                AppointmentAttachment.objects.create(
-                    appointment=appointment,
-                    file=f,
-                    original_filename=f.name
-                )
+            # Salva gli allegati (un'unica INSERT)
+            save_uploads(AppointmentAttachment, files, appointment=appointment)
             
             # Usa il servizio di pagamento unificato
             result = payment_service.create_payment(request, appointment, data)
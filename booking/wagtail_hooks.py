@@ -8,14 +8,18 @@ from wagtail.log_actions import log as wagtail_log, registry as log_registry, Lo
 from django.urls import reverse, path
 from django.views.generic import TemplateView
 from django.views import View
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.db.models import Count
 from django.utils.html import format_html
 from django.conf import settings
 from datetime import timedelta, datetime
-import json
 
+from sld_project.document_previews import thumbnails_html
+
+from .alignment import alignment_report, refresh_state, start_refresh
+from .calendar_feed import MAX_RANGE, cached_calendar_events, parse_bound, upcoming_events
 from .models import Appointment, AvailabilityRule, BlockedDate, GoogleCalendarEvent
 
 
@@ -62,87 +66,9 @@ class CalendarAdminView(WagtailAdminTemplateMixin, TemplateView):
         from .google_calendar import sync_google_calendar_events
         sync_google_calendar_events()
         
-        now = timezone.now()
-        today = now.date()
-        
-        # Prepara eventi per FullCalendar
-        calendar_events = []
-        
-        # Eventi Google Calendar (prossimi 60 giorni)
-        google_events = GoogleCalendarEvent.objects.filter(
-            start_datetime__gte=now,
-            start_datetime__lte=now + timedelta(days=60)
-        )
-        
-        for event in google_events:
-            calendar_events.append({
-                'id': f'google-{event.id}',
-                'title': event.summary,
-                'start': event.start_datetime.isoformat(),
-                'end': event.end_datetime.isoformat(),
-                'eventType': 'google',
-                'allDay': False,
-            })
-        
-        # Prenotazioni online (confermate e pending)
-        appointments = Appointment.objects.filter(
-            date__gte=today,
-            date__lte=today + timedelta(days=60)
-        ).exclude(status='cancelled')
-        
-        for appt in appointments:
-            event_type = 'pending' if appt.status == 'pending' else 'booking'
-            start_dt = timezone.make_aware(
-                timezone.datetime.combine(appt.date, appt.time)
-            )
-            end_dt = start_dt + timedelta(minutes=30)
-            
-            calendar_events.append({
-                'id': f'booking-{appt.id}',
-                'title': f"{appt.first_name} {appt.last_name}",
-                'start': start_dt.isoformat(),
-                'end': end_dt.isoformat(),
-                'eventType': event_type,
-                'url': reverse('wagtailsnippets_booking_appointment:edit', args=[appt.pk]),
-                'allDay': False,
-            })
-        
-        context['calendar_events_json'] = json.dumps(calendar_events)
-        
-        # Lista prossimi appuntamenti (unione Google + Booking)
-        upcoming_events = []
-        
-        # Google events
-        for event in google_events.order_by('start_datetime')[:20]:
-            local_start = timezone.localtime(event.start_datetime)
-            upcoming_events.append({
-                'date': local_start.date(),
-                'time': local_start.strftime('%H:%M'),
-                'title': event.summary.replace('App ', '').replace('app ', ''),
-                'type': 'google',
-                'type_label': 'Tel.',
-                'sort_key': event.start_datetime,
-            })
-        
-        # Booking events
-        for appt in appointments.order_by('date', 'time')[:20]:
-            event_type = 'pending' if appt.status == 'pending' else 'booking'
-            type_label = 'Attesa' if appt.status == 'pending' else 'Online'
-            
-            upcoming_events.append({
-                'date': appt.date,
-                'time': appt.time.strftime('%H:%M'),
-                'title': f"{appt.first_name} {appt.last_name}",
-                'type': event_type,
-                'type_label': type_label,
-                'sort_key': timezone.make_aware(
-                    timezone.datetime.combine(appt.date, appt.time)
-                ),
-            })
-        
-        # Ordina per data/ora, più vicini in cima
-        upcoming_events.sort(key=lambda x: x['sort_key'])
-        context['upcoming_events'] = upcoming_events[:25]
+        # Gli eventi del calendario arrivano da CalendarEventsView
+        context['calendar_events_url'] = reverse('booking_calendar_events')
+        context['upcoming_events'] = upcoming_events(timezone.now())
         
         # Ultima sincronizzazione
         last_event = GoogleCalendarEvent.objects.order_by('-synced_at').first()
@@ -151,12 +77,27 @@ class CalendarAdminView(WagtailAdminTemplateMixin, TemplateView):
         return context
 
 
+class CalendarEventsView(View):
+    """Feed JSON per FullCalendar: eventi dell'intervallo start/end (vedi booking/calendar_feed.py)."""
+    
+    def get(self, request):
+        start = parse_bound(request.GET.get('start'))
+        end = parse_bound(request.GET.get('end'))
+        if start is None or end is None or end <= start:
+            return JsonResponse({'error': 'Parametri start/end non validi'}, status=400)
+        if end - start > MAX_RANGE:
+            return JsonResponse({'error': f'Intervallo massimo: {MAX_RANGE.days} giorni'}, status=400)
+        return JsonResponse(cached_calendar_events(start, end), safe=False)
+
+
 @hooks.register('register_admin_urls')
 def register_calendar_url():
     """Registra URL per la vista calendario."""
     return [
         path('calendario/', CalendarAdminView.as_view(), name='booking_calendar'),
+        path('calendario/eventi/', CalendarEventsView.as_view(), name='booking_calendar_events'),
         path('calendario/verifica-allineamento/', AllineamentoView.as_view(), name='booking_alignment_check'),
+        path('calendario/verifica-allineamento/aggiorna/', AllineamentoRefreshView.as_view(), name='booking_alignment_refresh'),
         path('calendario/download-ics/<int:appointment_id>/', DownloadAppointmentICSView.as_view(), name='booking_download_ics'),
     ]
 
@@ -170,56 +111,28 @@ class AllineamentoView(WagtailAdminTemplateMixin, TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Forza sincronizzazione (ignora cache)
-        from .google_calendar import sync_google_calendar_events
-        sync_google_calendar_events(force=True)
-        
-        now = timezone.now()
-        today = now.date()
+        # La sincronizzazione con Google è un'azione esplicita (AllineamentoRefreshView)
+        context.update(alignment_report(timezone.now()))
+        context['refresh_url'] = reverse('booking_alignment_refresh')
+        context['refresh_state'] = refresh_state()
         
-        # Appuntamenti futuri confermati
-        local_appointments = Appointment.objects.filter(
-            date__gte=today,
-            status='confirmed'
-        ).order_by('date', 'time')
-        
-        # Eventi Google Calendar futuri
-        google_events = GoogleCalendarEvent.objects.filter(
-            start_datetime__gte=now
-        ).order_by('start_datetime')
-        
-        # Analisi allineamento
-        alignment_info = []
-        
-        for appt in local_appointments:
-            appt_datetime = timezone.make_aware(
-                timezone.datetime.combine(appt.date, appt.time)
-            )
-            
-            # Cerca un evento Google corrispondente (stesso orario ±5 minuti)
-            matching_event = None
-            for event in google_events:
-                time_diff = abs((event.start_datetime - appt_datetime).total_seconds())
-                if time_diff < 300:  # 5 minuti di tolleranza
-                    matching_event = event
-                    break
-            
-            alignment_info.append({
-                'appointment': appt,
-                'datetime': appt_datetime,
-                'google_event': matching_event,
-                'is_aligned': matching_event is not None,
-            })
-        
-        context['alignment_info'] = alignment_info
-        context['total_local'] = local_appointments.count()
-        context['total_google'] = google_events.count()
-        context['aligned_count'] = sum(1 for a in alignment_info if a['is_aligned'])
-        context['orphan_count'] = sum(1 for a in alignment_info if not a['is_aligned'])
+        last_event = GoogleCalendarEvent.objects.order_by('-synced_at').first()
+        context['last_sync'] = last_event.synced_at if last_event else None
         
         return context
 
 
+class AllineamentoRefreshView(View):
+    """Avvia (POST) e riporta (GET) l'aggiornamento da Google Calendar in background."""
+    
+    def get(self, request):
+        return JsonResponse(refresh_state() or {'status': 'idle'})
+    
+    def post(self, request):
+        started = start_refresh()
+        return JsonResponse({'started': started, **(refresh_state() or {})}, status=202 if started else 409)
+
+
 class DownloadAppointmentICSView(View):
     """Genera e scarica un file .ics per un appuntamento."""
     
@@ -289,13 +202,13 @@ Stato: {appointment.get_status_display()}"""
 
 
 class AllegatiColumn(Column):
-    """Colonna personalizzata per mostrare il conteggio allegati."""
+    """Colonna personalizzata con conteggio e miniature degli allegati."""
     
     def get_value(self, instance):
-        count = instance.attachments.count()
-        if count == 0:
+        # Conteggio annotato dal queryset del ViewSet, miniature dal prefetch
+        if not instance.attachments_count:
             return "—"
-        return f"✓ {count}"
+        return format_html("✓ {} {}", instance.attachments_count, thumbnails_html(instance.attachments.all()))
 
 
 class AppointmentViewSet(SnippetViewSet):
@@ -309,6 +222,10 @@ class AppointmentViewSet(SnippetViewSet):
     search_fields = ['first_name', 'last_name', 'email']
     ordering = ['-date', '-time']
 
+    def get_queryset(self, request):
+        # Conteggio allegati nella query dell'elenco, anteprime in una sola query per pagina
+        return self.model.objects.annotate(attachments_count=Count('attachments')).prefetch_related('attachments')
+
 
 # Registra il ViewSet personalizzato
 register_snippet(AppointmentViewSet)
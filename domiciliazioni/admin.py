@@ -1,6 +1,8 @@
 from django.contrib import admin
 from django.contrib import messages
+from django.db.models import Count
 from .models import DomiciliazioniSubmission, DomiciliazioniDocument
+from .search import search_submissions
 from .views import send_domiciliazione_notification
 
 
@@ -11,7 +13,7 @@ def resend_domiciliazione_email(modeladmin, request, queryset):
     
     for submission in queryset:
         try:
-            send_domiciliazione_notification(submission)
+            send_domiciliazione_notification(submission, request)
             success_count += 1
         except Exception as e:
             error_count += 1
@@ -40,12 +42,18 @@ class DomiciliazioniSubmissionAdmin(admin.ModelAdmin):
     inlines = [DomiciliazioniDocumentInline]
     actions = [resend_domiciliazione_email]
     
-    @admin.display(description='📎 Allegati')
+    def get_search_results(self, request, queryset, search_term):
+        # Ricerca full-text al posto di icontains (vedi domiciliazioni/search.py)
+        return search_submissions(queryset, search_term, order_by_rank=False), False
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(documents_count=Count('documents'))
+    
+    @admin.display(description='📎 Allegati', ordering='documents_count')
     def allegati_count(self, obj):
-        count = obj.documents.count()
-        if count == 0:
+        if obj.documents_count == 0:
             return '—'
-        return f'✓ {count}'
+        return f'✓ {obj.documents_count}'
     
     fieldsets = (
         ('Avvocato Richiedente', {
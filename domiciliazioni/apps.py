@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class DomiciliazioniConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'domiciliazioni'
+
+    def ready(self):
+        # Registra i signal di aggiornamento della ricerca full-text
+        from . import signals  # noqa: F401
@@ -0,0 +1,18 @@
+import sld_project.protected_media
+import sld_project.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('domiciliazioni', '0003_rename_aree_attivita'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='domiciliazionidocument',
+            name='file',
+            field=models.FileField(storage=sld_project.protected_media.protected_storage, upload_to='domiciliazioni/%Y/%m/', validators=[sld_project.validators.FileValidator()], verbose_name='Documento'),
+        ),
+    ]
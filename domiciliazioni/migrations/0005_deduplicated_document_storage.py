@@ -0,0 +1,18 @@
+import sld_project.dedup_storage
+import sld_project.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('domiciliazioni', '0004_protected_document_storage'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='domiciliazionidocument',
+            name='file',
+            field=models.FileField(storage=sld_project.dedup_storage.attachment_storage, upload_to='domiciliazioni/%Y/%m/', validators=[sld_project.validators.FileValidator()], verbose_name='Documento'),
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.2.9 on 2026-10-19 00:35
+
+import django.contrib.postgres.search
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery, TextField, Value
+from django.db.models.functions import Coalesce
+
+# Indici solo PostgreSQL: fuori da Meta.indexes, così le migrazioni
+# restano eseguibili su SQLite (test)
+CREATE_INDEXES = [
+    'CREATE INDEX IF NOT EXISTS domiciliazioni_search_vector_gin '
+    'ON domiciliazioni_domiciliazionisubmission USING gin (search_vector)',
+    'CREATE INDEX IF NOT EXISTS domiciliazioni_numero_rg_trgm '
+    'ON domiciliazioni_domiciliazionisubmission USING gin (numero_rg gin_trgm_ops)',
+]
+DROP_INDEXES = [
+    'DROP INDEX IF EXISTS domiciliazioni_search_vector_gin',
+    'DROP INDEX IF EXISTS domiciliazioni_numero_rg_trgm',
+]
+
+
+def search_vector_expression(document_model):
+    """
+    Copia congelata di domiciliazioni.search.search_vector_expression
+    al momento di questa migrazione (non seguirne le modifiche).
+    """
+    documents_text = Subquery(
+        document_model.objects
+        .filter(submission=OuterRef('pk'))
+        .values('submission')
+        .annotate(text=StringAgg('extracted_text', delimiter=' '))
+        .values('text')
+    )
+    return (
+        SearchVector('numero_rg', 'nome_avvocato', 'parti_causa', weight='A', config='italian')
+        + SearchVector('tribunale', 'email', 'attivita_richieste', 'note', weight='B', config='italian')
+        + SearchVector(Coalesce(documents_text, Value(''), output_field=TextField()), weight='C', config='italian')
+    )
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for sql in CREATE_INDEXES:
+        schema_editor.execute(sql)
+
+    # Popola le richieste esistenti
+    Submission = apps.get_model('domiciliazioni', 'DomiciliazioniSubmission')
+    Document = apps.get_model('domiciliazioni', 'DomiciliazioniDocument')
+    Submission.objects.update(search_vector=search_vector_expression(Document))
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for sql in DROP_INDEXES:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('domiciliazioni', '0006_document_previews'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='domiciliazionisubmission',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
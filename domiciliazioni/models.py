@@ -1,3 +1,4 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.utils.html import format_html
 from modelcluster.fields import ParentalKey
@@ -7,6 +8,9 @@ from wagtail.fields import RichTextField
 from wagtail.admin.panels import FieldPanel, InlinePanel, MultiFieldPanel
 from wagtail.contrib.forms.models import AbstractEmailForm, AbstractFormField
 from wagtail.snippets.models import register_snippet
+from sld_project.dedup_storage import attachment_storage
+from sld_project.document_previews import DocumentPreviewPanel
+from sld_project.models import DocumentPreviewFields
 from sld_project.validators import validate_document_file
 
 
@@ -189,6 +193,9 @@ class DomiciliazioniSubmission(ClusterableModel):
     status = models.CharField("Stato", max_length=20, choices=STATUS_CHOICES, default='pending')
     esito_udienza = models.TextField("Esito udienza", blank=True)
     
+    # Ricerca full-text (solo PostgreSQL, vedi domiciliazioni/search.py)
+    search_vector = SearchVectorField(null=True, editable=False)
+    
     panels = [
         MultiFieldPanel([
             FieldPanel('nome_avvocato'),
@@ -228,13 +235,14 @@ class DomiciliazioniSubmission(ClusterableModel):
         return f"{self.tribunale} - {self.data_udienza} - {self.numero_rg}"
 
 
-class DomiciliazioniDocument(models.Model):
+class DomiciliazioniDocument(DocumentPreviewFields):
     """Documento allegato."""
     
     submission = ParentalKey(DomiciliazioniSubmission, on_delete=models.CASCADE, related_name='documents')
     file = models.FileField(
         "Documento", 
         upload_to='domiciliazioni/%Y/%m/',
+        storage=attachment_storage,
         validators=[validate_document_file]
     )
     original_filename = models.CharField("Nome file", max_length=255)
@@ -243,6 +251,7 @@ class DomiciliazioniDocument(models.Model):
     panels = [
         FieldPanel('file'),
         FieldPanel('original_filename', read_only=True),
+        DocumentPreviewPanel(heading="Anteprima"),
     ]
     
     class Meta:
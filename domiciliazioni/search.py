@@ -0,0 +1,103 @@
+"""
+Ricerca full-text sulle richieste di domiciliazione.
+
+Su PostgreSQL ogni richiesta ha una colonna search_vector (tsvector,
+dizionario italiano) con indice GIN, che raccoglie:
+
+- A: numero R.G., avvocato, parti in causa;
+- B: tribunale, email, attività richieste, note;
+- C: testo estratto dagli allegati (sld_project/document_previews.py).
+
+Il numero R.G. ha anche un indice trigram (pg_trgm) per la ricerca
+approssimata: "1234/2025" trova anche "1243/2025" o "RG 1234/25".
+La colonna viene aggiornata dai signal (domiciliazioni/signals.py) al
+salvataggio della richiesta e quando cambia il testo di un allegato.
+
+Su altri database (SQLite nei test) la ricerca ricade su icontains.
+"""
+import logging
+
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+from django.db import connection
+from django.db.models import Exists, F, OuterRef, Q, Subquery, TextField, Value
+from django.db.models.functions import Coalesce
+
+logger = logging.getLogger(__name__)
+
+# Dizionario PostgreSQL (stemming e stop word)
+SEARCH_CONFIG = 'italian'
+
+# Campi usati dove non c'è PostgreSQL
+FALLBACK_FIELDS = ['nome_avvocato', 'email', 'numero_rg', 'parti_causa', 'attivita_richieste', 'note']
+
+
+def is_supported():
+    return connection.vendor == 'postgresql'
+
+
+def search_vector_expression(document_model):
+    """
+    Espressione del search_vector di una richiesta.
+
+    `document_model` è passato esplicitamente per poterlo usare anche
+    con i modelli storici delle migrazioni (che però ne tengono una copia
+    congelata, vedi 0007_submission_search).
+    """
+    documents_text = Subquery(
+        document_model.objects
+        .filter(submission=OuterRef('pk'))
+        .values('submission')
+        .annotate(text=StringAgg('extracted_text', delimiter=' '))
+        .values('text')
+    )
+    return (
+        SearchVector('numero_rg', 'nome_avvocato', 'parti_causa', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('tribunale', 'email', 'attivita_richieste', 'note', weight='B', config=SEARCH_CONFIG)
+        + SearchVector(Coalesce(documents_text, Value(''), output_field=TextField()), weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vector(submission_ids):
+    """Ricalcola il search_vector delle richieste indicate (una sola UPDATE)."""
+    from .models import DomiciliazioniDocument, DomiciliazioniSubmission
+
+    if not is_supported() or not submission_ids:
+        return 0
+    return DomiciliazioniSubmission.objects.filter(pk__in=submission_ids).update(
+        search_vector=search_vector_expression(DomiciliazioniDocument)
+    )
+
+
+def search_submissions(queryset, query, order_by_rank=True):
+    """
+    Filtra le richieste per la ricerca dell'admin.
+
+    Con order_by_rank i risultati sono ordinati per pertinenza (prima le
+    corrispondenze nel numero R.G. e nei nomi, poi negli allegati).
+    """
+    from .models import DomiciliazioniDocument
+
+    query = query.strip()
+    if not query:
+        return queryset
+
+    if not is_supported():
+        condition = Q()
+        for field in FALLBACK_FIELDS:
+            condition |= Q(**{f'{field}__icontains': query})
+        condition |= Q(Exists(DomiciliazioniDocument.objects.filter(
+            submission=OuterRef('pk'), extracted_text__icontains=query,
+        )))
+        return queryset.filter(condition)
+
+    search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+    queryset = queryset.filter(Q(search_vector=search_query) | Q(numero_rg__trigram_word_similar=query))
+    if order_by_rank:
+        queryset = queryset.annotate(
+            rank=(
+                Coalesce(SearchRank(F('search_vector'), search_query), Value(0.0))
+                + TrigramWordSimilarity(query, 'numero_rg')
+            ),
+        ).order_by('-rank', '-submit_time')
+    return queryset
@@ -0,0 +1,37 @@
+"""
+Signal che mantengono aggiornato il search_vector delle richieste
+(vedi domiciliazioni/search.py).
+
+Il ricalcolo avviene dopo il commit, quando anche gli allegati inline
+salvati dall'admin sono già nel database.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import DomiciliazioniDocument, DomiciliazioniSubmission
+from .search import is_supported, update_search_vector
+
+
+def _schedule_update(submission_id):
+    if is_supported() and submission_id is not None:
+        transaction.on_commit(lambda: update_search_vector([submission_id]))
+
+
+@receiver(post_save, sender=DomiciliazioniSubmission)
+def submission_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _schedule_update(instance.pk)
+
+
+@receiver(post_save, sender=DomiciliazioniDocument)
+def document_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Nuovo testo estratto dal worker delle anteprime."""
+    if raw or (update_fields is not None and 'extracted_text' not in update_fields):
+        return
+    _schedule_update(instance.submission_id)
+
+
+@receiver(post_delete, sender=DomiciliazioniDocument)
+def document_deleted(sender, instance, **kwargs):
+    _schedule_update(instance.submission_id)
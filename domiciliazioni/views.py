@@ -4,12 +4,14 @@ from django.views.decorators.http import require_POST
 from django.core.mail import EmailMultiAlternatives
 from django.core.exceptions import ValidationError
 from django.conf import settings
+from django.template.defaultfilters import filesizeformat
 from datetime import datetime
 from django_ratelimit.decorators import ratelimit
 from django_ratelimit.exceptions import Ratelimited
 
 from .models import DomiciliazioniSubmission, DomiciliazioniDocument, DomiciliazioniPage
 from .ical import generate_domiciliazione_ical, generate_domiciliazione_ical_filename
+from sld_project.attachments import email_attachments, save_uploads, validate_uploads
 from sld_project.validators import validate_document_file
 from sld_project.ratelimit import RATE_LIMITS
 
@@ -69,6 +71,12 @@ def process_domiciliazione_form(request, page):
         # Estrai dati dal form
         data = request.POST
         
+        # Upload interrotto durante lo streaming (sld_project/uploads.py):
+        # i campi successivi ai file potrebbero mancare, nessuna submission
+        upload_error = getattr(request, 'upload_error', None)
+        if upload_error:
+            raise ValidationError(upload_error)
+        
         # Parsing ora (può essere vuota)
         ora_udienza = None
         if data.get('ora_udienza'):
@@ -77,6 +85,12 @@ def process_domiciliazione_form(request, page):
             except ValueError:
                 pass
         
+        # Valida i documenti allegati prima di creare la submission
+        files = request.FILES.getlist('documents')
+        upload_error = validate_uploads(files, validate_document_file)
+        if upload_error:
+            raise ValidationError(upload_error)
+        
         # Crea submission
         submission = DomiciliazioniSubmission.objects.create(
             page=page,
@@ -96,25 +110,11 @@ def process_domiciliazione_form(request, page):
             note=data.get('note', ''),
         )
         
-        # Salva documenti allegati (con validazione)
-        files = request.FILES.getlist('documents')
-        for f in files:
-            # Valida tipo e contenuto del file
-            try:
-                validate_document_file(f)
-            except ValidationError as e:
-                # Elimina la submission se la validazione fallisce
-                submission.delete()
-                raise ValidationError(f'File "{f.name}": {e.message}')
-            
-            DomiciliazioniDocument.objects.create(
-                submission=submission,
-                file=f,
-                original_filename=f.name
-            )
+        # Salva documenti allegati (un'unica INSERT)
+        save_uploads(DomiciliazioniDocument, files, submission=submission)
         
         # Invia email di notifica
-        send_domiciliazione_notification(submission)
+        send_domiciliazione_notification(submission, request)
         
         return submission
         
@@ -123,8 +123,14 @@ def process_domiciliazione_form(request, page):
         return None
 
 
-def send_domiciliazione_notification(submission):
-    """Invia email di notifica per nuova richiesta domiciliazione con allegato iCal."""
+def send_domiciliazione_notification(submission, request=None):
+    """
+    Invia email di notifica per nuova richiesta domiciliazione con allegato iCal.
+    
+    I documenti piccoli sono allegati, quelli grandi inviati come link firmati
+    (vedi sld_project.attachments.email_attachments); `request` serve a
+    costruire l'URL assoluto, in sua assenza si usa WAGTAILADMIN_BASE_URL.
+    """
     from .models import get_tribunale_choices, get_tipo_udienza_choices
     
     # Recupera impostazioni studio
@@ -144,6 +150,17 @@ def send_domiciliazione_notification(submission):
     ical_content = generate_domiciliazione_ical(submission)
     ical_filename = generate_domiciliazione_ical_filename(submission)
     
+    # Documenti: piccoli in allegato, grandi come link di download
+    base_url = request.build_absolute_uri('/') if request else settings.WAGTAILADMIN_BASE_URL
+    inline_documents, document_links = email_attachments(submission.documents.all(), base_url)
+    documents_text = f"Documenti allegati: {len(inline_documents)}"
+    if document_links:
+        days = settings.PROTECTED_MEDIA_EMAIL_URL_TTL // (24 * 3600)
+        documents_text += f"\nDocumenti da scaricare (link validi {days} giorni):"
+        for link in document_links:
+            size = filesizeformat(link['size']).replace('\xa0', ' ')
+            documents_text += f"\n- {link['name']} ({link['mimetype']}, {size})\n  {link['url']}"
+    
     # Email allo studio
     subject = f"Nuova richiesta domiciliazione - R.G. {submission.numero_rg} - {tribunale_display}"
     
@@ -174,7 +191,7 @@ NOTE:
 {submission.note or 'Nessuna nota'}
 
 ---
-Documenti allegati: {submission.documents.count()}
+{documents_text}
 File calendario (.ics) allegato.
 """
     
@@ -188,14 +205,9 @@ File calendario (.ics) allegato.
         )
         # Allega il file iCal
         email.attach(ical_filename, ical_content, 'text/calendar')
-        # Allega i documenti caricati dall'utente
-        for doc in submission.documents.all():
-            try:
-                doc.file.open('rb')
-                email.attach(doc.original_filename, doc.file.read(), None)
-                doc.file.close()
-            except Exception as doc_err:
-                print(f"Errore allegando documento {doc.original_filename}: {doc_err}")
+        # Allega i documenti sotto soglia caricati dall'utente
+        for filename, content, mimetype in inline_documents:
+            email.attach(filename, content, mimetype)
         email.send()
     except Exception as e:
         print(f"Errore invio email domiciliazione: {e}")
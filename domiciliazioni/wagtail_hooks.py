@@ -5,22 +5,37 @@ from wagtail import hooks
 from wagtail.admin.menu import MenuItem, Menu, SubmenuMenuItem
 from wagtail.admin.ui.tables import Column
 from wagtail.snippets.models import register_snippet
-from wagtail.snippets.views.snippets import SnippetViewSet
+from wagtail.snippets.views.snippets import IndexView, SnippetViewSet
+from django.db.models import Count
+from django.utils.html import format_html
+
+from sld_project.document_previews import thumbnails_html
 
 from .models import DomiciliazioniSubmission
+from .search import search_submissions
 
 
 class AllegatiColumn(Column):
-    """Colonna personalizzata per mostrare il conteggio allegati."""
+    """Colonna personalizzata con conteggio e miniature degli allegati."""
     
     def get_value(self, instance):
-        count = instance.documents.count()
-        if count == 0:
+        # Conteggio annotato dal queryset del ViewSet, miniature dal prefetch
+        if not instance.documents_count:
             return "—"
-        return f"✓ {count}"
+        return format_html("✓ {} {}", instance.documents_count, thumbnails_html(instance.documents.all()))
+
+
+class DomiciliazioniIndexView(IndexView):
+    """Elenco richieste con ricerca full-text (vedi domiciliazioni/search.py)."""
+    
+    def search_queryset(self, queryset):
+        if not self.is_searching:
+            return queryset
+        return search_submissions(queryset, self.search_query, order_by_rank=not self.is_explicitly_ordered)
 
 
 class DomiciliazioniSubmissionViewSet(SnippetViewSet):
+    index_view_class = DomiciliazioniIndexView
     model = DomiciliazioniSubmission
     icon = "doc-full"
     menu_label = "Richieste"
@@ -31,6 +46,10 @@ class DomiciliazioniSubmissionViewSet(SnippetViewSet):
     search_fields = ['nome_avvocato', 'email', 'numero_rg', 'parti_causa']
     ordering = ['-submit_time']
 
+    def get_queryset(self, request):
+        # Conteggio allegati nella query dell'elenco, anteprime in una sola query per pagina
+        return self.model.objects.annotate(documents_count=Count('documents')).prefetch_related('documents')
+
 
 # Registra il ViewSet personalizzato
 register_snippet(DomiciliazioniSubmissionViewSet)
@@ -60,3 +60,15 @@ proxy_allow_ips = "*"
 # SSL (configure if needed for direct HTTPS, usually handled by Nginx)
 # keyfile = "/path/to/ssl/key.pem"
 # certfile = "/path/to/ssl/cert.pem"
+
+
+def post_worker_init(worker):
+    """Riempie la cache di processo delle rendition prima delle richieste."""
+    try:
+        from django.db import connections
+        from sld_project.renditions import warm_rendition_cache
+
+        warm_rendition_cache()
+        connections.close_all()
+    except Exception as e:
+        worker.log.warning(f"Riscaldamento cache rendition non riuscito: {e}")
@@ -0,0 +1,41 @@
+"""
+Template tags per il CSS critico inline e il caricamento asincrono del foglio di stile.
+"""
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+from sld_project.critical_css import STYLESHEET, current_stylesheet, get_critical_css
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def stylesheet(context):
+    """
+    Inserisce il foglio di stile del sito.
+
+    Se per il template della pagina è stato generato il CSS critico
+    (manage.py build_critical_css), lo scrive inline e carica il foglio
+    completo in modo asincrono; altrimenti scrive inline l'intero foglio
+    di stile, senza richieste bloccanti.
+
+    Uso nel template:
+    {% stylesheet %}
+    """
+    template_name = getattr(context.template, 'name', None)
+    critical = get_critical_css(template_name)
+    # Il CSS è il foglio di stile del sito (o ne è estratto)
+    if not critical:
+        return mark_safe(f'<style>{current_stylesheet()}</style>')
+
+    url = static(STYLESHEET)
+    return mark_safe(
+        f'<style data-critical>{critical}</style>\n'
+        + format_html(
+            '<link rel="preload" href="{0}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">\n'
+            '<noscript><link rel="stylesheet" href="{0}"></noscript>',
+            url,
+        )
+    )
@@ -0,0 +1,19 @@
+"""
+Template tags per lo sprite delle icone Lucide.
+"""
+from django import template
+
+from sld_project.icons import get_sprite_url
+
+register = template.Library()
+
+
+@register.simple_tag
+def icon_sprite_url():
+    """
+    Ritorna l'URL dello sprite SVG con le icone usate dal sito.
+
+    Uso nel template:
+    <script src="{% static 'js/lucide-sprite.js' %}" data-sprite="{% icon_sprite_url %}"></script>
+    """
+    return get_sprite_url()
@@ -0,0 +1,40 @@
+"""
+Template tags per le immagini responsive (<picture> con AVIF/WebP).
+
+Le rendition arrivano dalla cache di processo di sld_project/renditions.py:
+dopo il primo uso (o il riscaldamento all'avvio) non costano query.
+"""
+from django import template
+from wagtail.images.models import Picture
+
+from sld_project.renditions import get_cached_rendition, get_cached_renditions, specs_for
+
+register = template.Library()
+
+
+@register.simple_tag
+def rendition(image, filter_spec):
+    """
+    Ritorna la rendition dell'immagine (istanza o id) per il filtro indicato.
+
+    Uso nel template (con l'id l'immagine non viene caricata se la rendition è in cache):
+    {% rendition settings.sld_project.SiteSettings.default_social_image_id "fill-1200x630" as og_image %}
+    """
+    if not image:
+        return None
+    return get_cached_rendition(image, filter_spec)
+
+
+@register.simple_tag
+def responsive_picture(image, set_name, **attrs):
+    """
+    Renderizza l'immagine come <picture> con le rendition dell'insieme
+    dichiarato in sld_project/renditions.py (generate in anticipo).
+
+    Uso nel template:
+    {% responsive_picture page.cover_image 'cover' alt=page.title sizes="100vw" class="w-full" %}
+    """
+    if not image:
+        return ''
+    renditions = get_cached_renditions(image, specs_for(image, set_name))
+    return Picture(renditions, attrs)
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class SldProjectConfig(AppConfig):
+    name = "sld_project"
+
+    def ready(self):
+        # Registra i signal di invalidazione delle cache
+        from . import signals  # noqa: F401
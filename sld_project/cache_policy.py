@@ -0,0 +1,217 @@
+"""
+Politica di caching HTTP per le risposte pubbliche.
+
+Una tabella di regole per percorso stabilisce Cache-Control, ETag e
+Last-Modified delle risposte GET/HEAD ai visitatori anonimi.
+
+ETag e Last-Modified derivano da una "versione" del contenuto (un
+timestamp in cache) che viene aggiornata dai signal quando cambiano
+pagine, snippet o impostazioni (vedi sld_project/signals.py).
+Se il browser o un proxy rivalidano con If-None-Match/If-Modified-Since
+e la versione non è cambiata, rispondiamo 304 senza eseguire la view.
+
+Per i visitatori anonimi (senza cookie di sessione) la sessione non
+viene toccata e "Cookie" viene tolto da Vary, così le cache condivise
+possono effettivamente memorizzare le pagine.
+"""
+import hashlib
+import logging
+import os
+import re
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'cache_policy:version:{scope}'
+
+# Ambito di versione di pagine, snippet e impostazioni
+SCOPE_CONTENT = 'content'
+# Solo SiteSettings (es. testi legali con le variabili sostituite)
+SCOPE_SETTINGS = 'settings'
+# Appuntamenti, eventi Google e udienze (feed del calendario admin, booking/calendar_feed.py)
+SCOPE_CALENDAR = 'calendar'
+
+
+@dataclass(frozen=True)
+class CacheRule:
+    """Regola di caching per un gruppo di percorsi."""
+    pattern: str
+    max_age: int = 0
+    s_maxage: int | None = None
+    # Ambito di versione per ETag/Last-Modified (None = ETag dal contenuto)
+    scope: str | None = SCOPE_CONTENT
+    # False = nessuna politica, la risposta resta com'è
+    cacheable: bool = True
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# TABELLA DELLE REGOLE - la prima che corrisponde vince
+# ═══════════════════════════════════════════════════════════════════════════════
+
+CACHE_RULES = [
+    # Aree riservate, form e pagamenti: mai in cache condivisa
+    CacheRule(r'^/(admin|django-admin|documents|search|static|media)/', cacheable=False),
+
+    # Slot disponibili: cambiano con prenotazioni e Google Calendar
+    CacheRule(r'^/prenota/slots/', max_age=60, scope=None),
+    # Prenotazione e pagamenti: date calcolate al momento, form con CSRF
+    CacheRule(r'^/prenota/', cacheable=False),
+
+    CacheRule(r'^/robots\.txt$', max_age=86400),
+    # Expires cambia ogni giorno: ETag dal contenuto, non dalla versione
+    CacheRule(r'^/\.well-known/security\.txt$', max_age=86400, scope=None),
+    CacheRule(r'^/sitemap[^/]*\.xml$', max_age=3600),
+    CacheRule(r'^/(privacy|termini)/$', max_age=3600),
+
+    # Pagine Wagtail
+    CacheRule(r'^/', max_age=60, s_maxage=600),
+]
+
+_COMPILED_RULES = [(re.compile(rule.pattern), rule) for rule in CACHE_RULES]
+
+
+def match_rule(path):
+    """Restituisce la regola applicabile al percorso (o None)."""
+    for regex, rule in _COMPILED_RULES:
+        if regex.match(path):
+            return rule if rule.cacheable else None
+    return None
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# VERSIONI DEL CONTENUTO
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def get_version(scope):
+    """Versione corrente (timestamp) dell'ambito indicato."""
+    key = VERSION_KEY.format(scope=scope)
+    version = cache.get(key)
+    if version is None:
+        # add() evita che due worker inizializzino versioni diverse
+        cache.add(key, time.time(), None)
+        version = cache.get(key) or time.time()
+    return version
+
+
+def bump_version(scope):
+    """Segnala che il contenuto dell'ambito è cambiato."""
+    cache.set(VERSION_KEY.format(scope=scope), time.time(), None)
+
+
+@lru_cache(maxsize=1)
+def _deploy_id():
+    """
+    Identificativo del deploy corrente: un nuovo collectstatic (nuovi
+    template/statici) cambia tutti gli ETag anche senza modifiche ai contenuti.
+    """
+    manifest = os.path.join(settings.STATIC_ROOT, 'staticfiles.json')
+    try:
+        return str(os.stat(manifest).st_mtime_ns)
+    except OSError:
+        return ''
+
+
+def make_etag(request, version):
+    """ETag debole per percorso + host + versione."""
+    key = f"{request.get_host()}|{request.get_full_path()}|{version}|{_deploy_id()}"
+    return f'W/"{hashlib.md5(key.encode("utf-8")).hexdigest()}"'
+
+
+def is_anonymous_request(request):
+    """Visitatore senza cookie di sessione: nessuna sessione da leggere."""
+    return settings.SESSION_COOKIE_NAME not in request.COOKIES
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# MIDDLEWARE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class CachePolicyMiddleware:
+    """
+    Applica CACHE_RULES alle risposte pubbliche.
+
+    Va posizionato prima di SessionMiddleware: la risposta gli arriva
+    dopo quella di sessione e CSRF, con l'eventuale Vary: Cookie da rimuovere.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # Usato da base.html per non caricare la userbar (e la sessione)
+        request.has_session_cookie = not is_anonymous_request(request)
+
+        rule = None
+        if request.method in ('GET', 'HEAD') and not request.has_session_cookie:
+            rule = match_rule(request.path_info)
+
+        if rule is None:
+            return self.get_response(request)
+
+        etag = last_modified = None
+        if rule.scope:
+            version = get_version(rule.scope)
+            etag = make_etag(request, version)
+            last_modified = int(version)
+            # Rivalidazione senza eseguire la view
+            not_modified = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+            if not_modified is not None:
+                self._apply_headers(not_modified, rule, etag, last_modified)
+                return not_modified
+
+        response = self.get_response(request)
+        if rule.scope and get_version(rule.scope) != version:
+            # Contenuto modificato durante il rendering (es. SiteSettings creato
+            # al primo accesso): la risposta non corrisponde con certezza alla versione
+            etag = last_modified = None
+        if self._is_cacheable_response(response):
+            self._apply_headers(response, rule, etag, last_modified)
+            if etag is None and rule.scope is None and not response.streaming:
+                # ETag dal contenuto (es. slot): il 304 fa solo risparmiare banda
+                response['ETag'] = f'"{hashlib.md5(response.content).hexdigest()}"'
+                return get_conditional_response(
+                    request, etag=response['ETag'], response=response
+                )
+        return response
+
+    @staticmethod
+    def _is_cacheable_response(response):
+        """Solo 200 senza cookie impostati e senza Cache-Control scelto dalla view."""
+        return (
+            response.status_code == 200
+            and not response.cookies
+            and not response.has_header('Cache-Control')
+        )
+
+    @staticmethod
+    def _apply_headers(response, rule, etag, last_modified):
+        directives = {'public': True, 'max_age': rule.max_age}
+        if rule.s_maxage is not None:
+            directives['s_maxage'] = rule.s_maxage
+        patch_cache_control(response, **directives)
+
+        # ETag/Last-Modified scelti dalla view (es. sitemap) hanno la precedenza
+        if etag and not response.has_header('ETag'):
+            response['ETag'] = etag
+        if last_modified and not response.has_header('Last-Modified'):
+            response['Last-Modified'] = http_date(last_modified)
+
+        # La risposta non dipende dai cookie: niente Vary: Cookie
+        if response.has_header('Vary'):
+            vary = [
+                value.strip() for value in response['Vary'].split(',')
+                if value.strip() and value.strip().lower() != 'cookie'
+            ]
+            if vary:
+                response['Vary'] = ', '.join(vary)
+            else:
+                del response['Vary']
@@ -0,0 +1,356 @@
+"""
+CSS critico (above-the-fold) per i template principali.
+
+Il foglio di stile del sito (css/sld_project.css) viene caricato in modo
+asincrono; nel <head> viene invece scritto inline solo il sottoinsieme di
+regole che serve a disegnare la prima schermata di ciascun template.
+
+L'estrazione avviene offline (`manage.py build_critical_css`):
+1. per ogni template viene renderizzata una pagina rappresentativa e ne
+   viene salvata l'istantanea HTML in CRITICAL_CSS_ROOT/snapshots/;
+2. dall'istantanea si tengono navigazione e prime sezioni di <main>;
+3. si conservano le regole del foglio di stile i cui selettori trovano
+   almeno un elemento in quella porzione di pagina.
+
+Il risultato è scritto in CRITICAL_CSS_ROOT/<template>.<hash CSS>.css:
+se il foglio di stile cambia, il file non corrisponde più e la pagina
+torna ad avere l'intero foglio di stile inline (come prima di questa
+pipeline, nessuna richiesta bloccante) finché non si rigenera.
+
+Tailwind resta sulla CDN (generato a runtime nel browser) e non fa parte
+dell'estrazione.
+"""
+import hashlib
+import logging
+import os
+import re
+
+from bs4 import BeautifulSoup
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+
+logger = logging.getLogger(__name__)
+
+# Foglio di stile completo (percorso per {% static %})
+STYLESHEET = 'css/sld_project.css'
+
+# Template con CSS critico: chiave → template e pagina rappresentativa
+CRITICAL_TEMPLATES = {
+    'home': {'template': 'home/home_page.html', 'page_model': 'home.HomePage'},
+    'service': {'template': 'services/service_page.html', 'page_model': 'services.ServicePage'},
+    'article': {'template': 'articles/article_page.html', 'page_model': 'articles.ArticlePage'},
+    'booking': {'template': 'booking/booking.html', 'url_name': 'booking:booking'},
+}
+
+# Sezioni di <main> considerate visibili senza scorrere
+ABOVE_THE_FOLD_SECTIONS = 2
+
+SNAPSHOT_DIR = 'snapshots'
+
+COMMENT_RE = re.compile(r'/\*.*?\*/', re.DOTALL)
+WHITESPACE_RE = re.compile(r'\s+')
+
+# Pseudo-classi/elementi dinamici: non hanno corrispondenza in un'istantanea
+# statica, quindi si valuta il selettore senza di essi
+DYNAMIC_PSEUDO_RE = re.compile(
+    r'::?(hover|focus|focus-visible|focus-within|active|visited|link|target|'
+    r'before|after|placeholder|selection|marker|first-letter|first-line|'
+    r'-webkit-[a-z-]+|-moz-[a-z-]+)\b',
+    re.IGNORECASE,
+)
+
+# At-rule che contengono altre regole (filtrate ricorsivamente)
+NESTED_AT_RULES = ('@media', '@supports')
+# At-rule conservate per intero
+KEPT_AT_RULES = ('@font-face',)
+
+# Cache di processo (solo i file trovati: uno generato dopo l'avvio viene letto)
+_stylesheet = {}
+_critical_cache = {}
+
+
+def get_critical_css_root():
+    return getattr(settings, 'CRITICAL_CSS_ROOT', os.path.join(settings.BASE_DIR, 'critical_css'))
+
+
+def _template_key(template_name):
+    for key, config in CRITICAL_TEMPLATES.items():
+        if config['template'] == template_name:
+            return key
+    return None
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# FOGLIO DI STILE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def read_stylesheet():
+    """Contenuto del foglio di stile completo (stringa vuota se non trovato)."""
+    path = finders.find(STYLESHEET)
+    if not path:
+        try:
+            path = staticfiles_storage.path(STYLESHEET)
+        except NotImplementedError:
+            path = None
+    if not path or not os.path.exists(path):
+        logger.warning(f"CSS critico: foglio di stile {STYLESHEET} non trovato")
+        return ''
+    with open(path, encoding='utf-8') as fh:
+        return fh.read()
+
+
+def css_hash(css):
+    return hashlib.sha256(css.encode('utf-8')).hexdigest()[:12]
+
+
+def current_stylesheet():
+    """Foglio di stile completo, letto una volta per processo."""
+    if 'css' not in _stylesheet:
+        _stylesheet['css'] = read_stylesheet()
+    return _stylesheet['css']
+
+
+def current_stylesheet_hash():
+    """Hash del foglio di stile, calcolato una volta per processo."""
+    if 'hash' not in _stylesheet:
+        _stylesheet['hash'] = css_hash(current_stylesheet())
+    return _stylesheet['hash']
+
+
+def parse_css(css):
+    """
+    Suddivide il CSS in regole.
+
+    Returns:
+        Lista di (prelude, corpo): il corpo è una stringa per le regole
+        semplici e una lista di regole per @media/@supports.
+    """
+    rules, _pos = _parse_block(COMMENT_RE.sub('', css), 0)
+    return rules
+
+
+def _matching_brace(css, start):
+    """Posizione della graffa che chiude quella aperta in `start`."""
+    depth = 0
+    for pos in range(start, len(css)):
+        if css[pos] == '{':
+            depth += 1
+        elif css[pos] == '}':
+            depth -= 1
+            if depth == 0:
+                return pos
+    return len(css)
+
+
+def _parse_block(css, pos):
+    rules = []
+    while pos < len(css):
+        open_pos = css.find('{', pos)
+        close_pos = css.find('}', pos)
+        if close_pos != -1 and (open_pos == -1 or close_pos < open_pos):
+            return rules, close_pos + 1
+        if open_pos == -1:
+            break
+
+        # Istruzioni senza blocco (@charset, @import) prima della regola
+        prelude = css[pos:open_pos].rsplit(';', 1)[-1].strip()
+        if prelude.lower().startswith(NESTED_AT_RULES):
+            children, pos = _parse_block(css, open_pos + 1)
+            rules.append((prelude, children))
+        else:
+            end = _matching_brace(css, open_pos)
+            rules.append((prelude, css[open_pos + 1:end].strip()))
+            pos = end + 1
+    return rules, pos
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ESTRAZIONE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def above_the_fold(html, sections=ABOVE_THE_FOLD_SECTIONS):
+    """
+    Riduce l'istantanea alla prima schermata: tutto ciò che precede <main>
+    (navigazione) e le prime `sections` sezioni del contenuto.
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    for tag in soup.find_all(['script', 'noscript', 'template']):
+        tag.decompose()
+
+    main = soup.find('main')
+    if main is None:
+        return soup
+
+    for index, child in enumerate(main.find_all(recursive=False)):
+        if index >= sections:
+            child.decompose()
+    for sibling in main.find_next_siblings():
+        sibling.decompose()
+    return soup
+
+
+def _selector_matches(soup, selector):
+    selector = DYNAMIC_PSEUDO_RE.sub('', selector).strip()
+    if not selector or selector == '*':
+        return True
+    try:
+        return soup.select_one(selector) is not None
+    except Exception:
+        # Selettore non supportato da soupsieve: meglio tenerlo
+        return True
+
+
+def _filter_rules(rules, soup):
+    kept = []
+    for prelude, body in rules:
+        if isinstance(body, list):
+            children = _filter_rules(body, soup)
+            if children:
+                kept.append(f"{prelude}{{{''.join(children)}}}")
+        elif prelude.lower().startswith(KEPT_AT_RULES):
+            kept.append(f"{prelude}{{{body}}}")
+        elif prelude.startswith('@'):
+            continue
+        elif any(_selector_matches(soup, selector) for selector in prelude.split(',')):
+            kept.append(f"{prelude}{{{body}}}")
+    return [WHITESPACE_RE.sub(' ', rule) for rule in kept]
+
+
+def extract_critical_css(html, css):
+    """CSS necessario alla prima schermata dell'istantanea HTML."""
+    soup = above_the_fold(html)
+    return '\n'.join(_filter_rules(parse_css(css), soup))
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# GENERAZIONE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def critical_css_path(key, stylesheet_hash):
+    return os.path.join(get_critical_css_root(), f'{key}.{stylesheet_hash}.css')
+
+
+def snapshot_path(key):
+    return os.path.join(get_critical_css_root(), SNAPSHOT_DIR, f'{key}.html')
+
+
+def _write(path, text):
+    """Scrittura atomica: un worker non legge mai un file a metà."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as fh:
+        fh.write(text)
+    os.replace(tmp_path, path)
+
+
+def representative_url(key):
+    """URL di una pagina pubblicata che usa il template (None se non ce ne sono)."""
+    from django.apps import apps
+    from django.urls import reverse
+
+    config = CRITICAL_TEMPLATES[key]
+    if 'url_name' in config:
+        return reverse(config['url_name'])
+
+    model = apps.get_model(config['page_model'])
+    page = model.objects.live().public().order_by('path').first()
+    return page.get_url() if page else None
+
+
+def render_snapshot(key, client=None, host=None):
+    """
+    Renderizza la pagina rappresentativa e ne salva l'istantanea HTML.
+
+    Returns:
+        L'HTML della pagina, o None se non c'è una pagina pubblicata
+
+    Raises:
+        RuntimeError: se la pagina non risponde 200
+    """
+    # Il Client di Django esegue in-process l'intero stack di middleware
+    # (sito Wagtail, impostazioni, template context) senza passare dalla
+    # rete: è il modo più semplice per ottenere l'HTML che vede un visitatore
+    from django.test import Client
+    from wagtail.models import Site
+
+    url = representative_url(key)
+    if url is None:
+        logger.warning(f"CSS critico: nessuna pagina pubblicata per '{key}'")
+        return None
+
+    if host is None:
+        site = Site.objects.filter(is_default_site=True).first()
+        host = site.hostname if site else 'localhost'
+    # secure=True: in produzione SECURE_SSL_REDIRECT risponderebbe 301 all'HTTP
+    response = (client or Client()).get(url, HTTP_HOST=host, secure=True)
+    if response.status_code != 200:
+        location = f" → {response['Location']}" if response.has_header('Location') else ''
+        raise RuntimeError(f"CSS critico: {url} ha risposto {response.status_code}{location}")
+
+    html = response.content.decode(response.charset or 'utf-8')
+    _write(snapshot_path(key), html)
+    return html
+
+
+def read_snapshot(key):
+    try:
+        with open(snapshot_path(key), encoding='utf-8') as fh:
+            return fh.read()
+    except FileNotFoundError:
+        return None
+
+
+def write_critical_css(key, html, css, force=False):
+    """
+    Estrae e salva il CSS critico per il template.
+
+    Returns:
+        (percorso, generato): generato è False se il file per questo
+        hash del foglio di stile esisteva già
+    """
+    stylesheet_hash = css_hash(css)
+    path = critical_css_path(key, stylesheet_hash)
+    if os.path.exists(path) and not force:
+        return path, False
+
+    _write(path, extract_critical_css(html, css))
+
+    # Rimuove i file generati per versioni precedenti del foglio di stile
+    root = get_critical_css_root()
+    for filename in os.listdir(root):
+        if filename.startswith(f'{key}.') and filename.endswith('.css') and filename != os.path.basename(path):
+            os.remove(os.path.join(root, filename))
+    return path, True
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# LETTURA (runtime)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def get_critical_css(template_name):
+    """
+    CSS critico per il template della pagina (None se non disponibile o
+    non generato per la versione corrente del foglio di stile).
+    """
+    if template_name in _critical_cache:
+        return _critical_cache[template_name]
+
+    key = _template_key(template_name)
+    if key is None:
+        return None
+    try:
+        with open(critical_css_path(key, current_stylesheet_hash()), encoding='utf-8') as fh:
+            critical = fh.read()
+    except FileNotFoundError:
+        # Non si memorizza l'assenza: il file può essere generato con il sito attivo
+        return None
+
+    _critical_cache[template_name] = critical
+    return critical
+
+
+def clear_cache():
+    """Svuota le cache di processo (dopo una rigenerazione o nei test)."""
+    _stylesheet.clear()
+    _critical_cache.clear()
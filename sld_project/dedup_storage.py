@@ -0,0 +1,145 @@
+"""
+Storage deduplicato per gli allegati di prenotazioni e domiciliazioni.
+
+Lo stesso PDF (documento d'identità, contratto) arriva spesso con più
+prenotazioni o domiciliazioni. Il contenuto viene salvato una sola volta
+in MEDIA_ROOT/.blobs/, con lo SHA-256 come nome; il percorso del FileField
+(upload_to invariato) è un hard link al blob. Così:
+
+- un duplicato non occupa altro spazio su disco;
+- URL firmati, X-Accel-Redirect e nome del download restano quelli del
+  percorso originale (sld_project/protected_media.py), senza query;
+- StoredBlob conta i riferimenti e BlobReference collega ogni percorso al
+  suo blob: all'eliminazione dell'ultimo riferimento il blob viene
+  rimosso (signal post_delete in sld_project/signals.py).
+
+Lo SHA-256 arriva già calcolato durante lo streaming dell'upload
+(sld_project/uploads.py); per gli altri file lo si calcola al salvataggio.
+I file salvati prima di questo storage non hanno riferimenti e vengono
+semplicemente cancellati.
+"""
+import errno
+import hashlib
+import logging
+import os
+import shutil
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+from .protected_media import ProtectedFileSystemStorage
+
+logger = logging.getLogger(__name__)
+
+# Directory dei contenuti (relativa a MEDIA_ROOT, bloccata da nginx)
+BLOB_DIR = '.blobs'
+
+# Errori di os.link per cui si ripiega sulla copia: filesystem diversi o senza hard link
+NO_HARD_LINK_ERRORS = {errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP, errno.EOPNOTSUPP}
+
+
+def blob_name(digest, extension=''):
+    """Percorso del blob: .blobs/ab/cd/abcd…<ext>."""
+    return f'{BLOB_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+def content_sha256(content):
+    """SHA-256 del file (quello calcolato in streaming, se disponibile)."""
+    digest = getattr(content, 'sha256', None)
+    if digest:
+        return digest
+    hasher = hashlib.sha256()
+    for chunk in content.chunks():
+        hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+@deconstructible
+class DeduplicatedStorage(ProtectedFileSystemStorage):
+    """ProtectedFileSystemStorage con contenuti condivisi tramite hard link."""
+
+    def _save(self, name, content):
+        from .models import BlobReference
+
+        digest = content_sha256(content)
+        with transaction.atomic():
+            blob = self._acquire_blob(digest, os.path.splitext(name)[1].lower(), content)
+            name = self._link(blob.name, name, content)
+            BlobReference.objects.create(name=name, blob=blob)
+        return name
+
+    def delete(self, name):
+        from .models import BlobReference, StoredBlob
+
+        super().delete(name)
+        with transaction.atomic():
+            reference = BlobReference.objects.select_for_update().filter(name=name).first()
+            if reference is None:
+                return
+            reference.delete()
+            StoredBlob.objects.filter(pk=reference.blob_id).update(refcount=F('refcount') - 1)
+            orphan = StoredBlob.objects.filter(pk=reference.blob_id, refcount__lte=0).first()
+            if orphan is not None:
+                orphan.delete()
+                super().delete(orphan.name)
+                logger.info(f"Blob {reference.blob_id[:12]} rimosso: nessun riferimento")
+
+    def _acquire_blob(self, digest, extension, content):
+        """Blob esistente con un riferimento in più, oppure nuovo blob su disco."""
+        from .models import StoredBlob
+
+        if StoredBlob.objects.filter(pk=digest).update(refcount=F('refcount') + 1):
+            return StoredBlob.objects.get(pk=digest)
+
+        name = blob_name(digest, extension)
+        if not self.exists(name):
+            self._write_blob(name, content)
+        try:
+            with transaction.atomic():
+                return StoredBlob.objects.create(sha256=digest, name=name, size=content.size, refcount=1)
+        except IntegrityError:
+            StoredBlob.objects.filter(pk=digest).update(refcount=F('refcount') + 1)
+            return StoredBlob.objects.get(pk=digest)
+
+    def _write_blob(self, name, content):
+        """Scrive il contenuto del blob su disco."""
+        stored = super()._save(name, content)
+        if stored != name:
+            # Scritto in contemporanea da un'altra richiesta: stesso contenuto
+            super().delete(stored)
+
+    def _link(self, source_name, name, content):
+        """Hard link dal blob al percorso richiesto (primo nome libero)."""
+        source = self.path(source_name)
+        while True:
+            path = self.path(name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            try:
+                os.link(source, path)
+            except FileExistsError:
+                name = self.get_available_name(name)
+                continue
+            except FileNotFoundError:
+                if os.path.exists(source):
+                    raise
+                # Blob rimosso dall'eliminazione dell'ultimo riferimento mentre
+                # questa richiesta ne ricreava la riga: lo si riscrive
+                logger.warning(f"Blob {source_name} mancante su disco: riscritto")
+                self._write_blob(source_name, content)
+                continue
+            except OSError as e:
+                if e.errno not in NO_HARD_LINK_ERRORS:
+                    raise
+                # Filesystem senza hard link: copia (nessun risparmio di spazio)
+                logger.warning(f"Hard link non disponibile per {name}: {e}")
+                shutil.copyfile(source, path)
+            return name
+
+
+_attachment_storage = DeduplicatedStorage()
+
+
+def attachment_storage():
+    """Storage per i FileField degli allegati (callable, per le migrazioni)."""
+    return _attachment_storage
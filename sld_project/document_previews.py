@@ -0,0 +1,289 @@
+"""
+Anteprime degli allegati di prenotazioni e domiciliazioni.
+
+Per smistare le richieste lo studio apriva ogni allegato dall'admin. Ora
+ogni allegato (modelli con DocumentPreviewFields, sld_project/models.py)
+porta con sé miniatura della prima pagina, numero di pagine e testo
+estratto, generati in background:
+
+- una riga nuova nasce con preview_status "in coda": la coda è la tabella
+  stessa, senza broker né servizi in più;
+- `manage.py process_document_previews --loop` prende le righe in coda a
+  lotti (SELECT … FOR UPDATE SKIP LOCKED su PostgreSQL, così più worker
+  non elaborano lo stesso file) e salva i risultati;
+- le righe rimaste "in elaborazione" per un worker interrotto tornano in
+  coda dopo STALE_AFTER.
+
+Formati: PDF con pypdfium2 (opzionale, come libmagic per i validatori),
+immagini con Pillow, testo da .txt, .docx e .odt. Gli altri restano
+"senza anteprima". Le miniature (JPEG) stanno nello storage protetto,
+con URL firmati come gli allegati.
+"""
+import html
+import io
+import logging
+import os
+import re
+import zipfile
+from collections import namedtuple
+from datetime import timedelta
+
+try:
+    import pypdfium2 as pdfium
+    PDFIUM_AVAILABLE = True
+except ImportError:
+    PDFIUM_AVAILABLE = False
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+from django.utils.html import format_html, format_html_join
+from PIL import Image, ImageOps
+from wagtail.admin.panels import Panel
+
+logger = logging.getLogger(__name__)
+
+# Lato massimo della miniatura (pixel)
+DEFAULT_THUMBNAIL_SIZE = 320
+# Testo estratto: limite di caratteri e di pagine PDF lette
+TEXT_MAX_CHARS = 100_000
+TEXT_MAX_PAGES = 50
+# Limite di lettura dell'XML dentro .docx/.odt (l'archivio è già stato
+# verificato dal validatore, questo è solo un tetto alla memoria)
+XML_MAX_SIZE = 10 * 1024 * 1024
+# Righe per lotto e tempo oltre il quale una riga "in elaborazione" torna in coda
+BATCH_SIZE = 20
+STALE_AFTER = timedelta(minutes=10)
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.tif', '.tiff'}
+TEXT_DOCUMENTS = {'.docx': 'word/document.xml', '.odt': 'content.xml'}
+
+# Fine paragrafo (Word, OpenDocument) e tag XML
+_PARAGRAPH_END = re.compile(r'</(?:w|text):(?:p|h)>')
+_XML_TAG = re.compile(r'<[^>]+>')
+
+Preview = namedtuple('Preview', ['image', 'page_count', 'text'])
+
+# Esito di process_document per gli allegati eliminati durante l'elaborazione
+PREVIEW_DELETED = 'deleted'
+
+
+def get_thumbnail_size():
+    return getattr(settings, 'DOCUMENT_PREVIEW_THUMBNAIL_SIZE', DEFAULT_THUMBNAIL_SIZE)
+
+
+def preview_models():
+    """Modelli di allegato con i campi di anteprima."""
+    from .models import DocumentPreviewFields
+
+    return [model for model in apps.get_models() if issubclass(model, DocumentPreviewFields)]
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# ESTRAZIONE
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _clean_text(text):
+    # PostgreSQL non accetta NUL nei campi di testo
+    return text.replace('\x00', '').strip()[:TEXT_MAX_CHARS]
+
+
+def pdf_preview(file):
+    """Prima pagina renderizzata, numero di pagine e testo delle prime pagine."""
+    pdf = pdfium.PdfDocument(file.read())
+    try:
+        page_count = len(pdf)
+        image, texts, length = None, [], 0
+        for index in range(min(page_count, TEXT_MAX_PAGES)):
+            page = pdf[index]
+            if index == 0:
+                scale = get_thumbnail_size() / max(page.get_size())
+                image = page.render(scale=scale).to_pil()
+            textpage = page.get_textpage()
+            texts.append(textpage.get_text_bounded())
+            textpage.close()
+            page.close()
+            length += len(texts[-1])
+            if length >= TEXT_MAX_CHARS:
+                break
+    finally:
+        pdf.close()
+    return Preview(image, page_count, '\n\n'.join(texts))
+
+
+def image_preview(file):
+    """Miniatura dell'immagine; le TIFF multipagina contano le pagine."""
+    image = Image.open(file)
+    page_count = getattr(image, 'n_frames', 1)
+    image.draft('RGB', (get_thumbnail_size(), get_thumbnail_size()))
+    image = ImageOps.exif_transpose(image)
+    return Preview(image, page_count, '')
+
+
+def text_preview(file):
+    return Preview(None, None, file.read(TEXT_MAX_CHARS * 4).decode('utf-8', errors='replace'))
+
+
+def office_text_preview(file, member):
+    """Testo dei paragrafi dell'XML principale di un .docx/.odt."""
+    with zipfile.ZipFile(file) as archive, archive.open(member) as xml:
+        content = xml.read(XML_MAX_SIZE).decode('utf-8', errors='replace')
+    content = _PARAGRAPH_END.sub('\n', content)
+    return Preview(None, None, html.unescape(_XML_TAG.sub('', content)))
+
+
+def extract_preview(file, extension):
+    """Preview per il file, o None se il formato non ha anteprima."""
+    if extension == '.pdf' and PDFIUM_AVAILABLE:
+        return pdf_preview(file)
+    if extension in IMAGE_EXTENSIONS:
+        return image_preview(file)
+    if extension == '.txt':
+        return text_preview(file)
+    if extension in TEXT_DOCUMENTS:
+        return office_text_preview(file, TEXT_DOCUMENTS[extension])
+    return None
+
+
+def thumbnail_content(image):
+    """JPEG della miniatura (sfondo bianco al posto della trasparenza)."""
+    size = get_thumbnail_size()
+    image.thumbnail((size, size))
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=80, optimize=True)
+    return ContentFile(buffer.getvalue())
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CODA
+# ═══════════════════════════════════════════════════════════════════════════
+
+def process_document(document):
+    """
+    Genera e salva l'anteprima di un allegato. Ritorna lo stato finale,
+    o PREVIEW_DELETED se l'allegato è stato eliminato nel frattempo.
+    """
+    extension = os.path.splitext(document.file.name)[1].lower()
+    document.page_count, document.extracted_text, document.preview_error = None, '', ''
+    if document.thumbnail:
+        document.thumbnail.delete(save=False)
+
+    try:
+        with document.file.open('rb') as f:
+            preview = extract_preview(f, extension)
+        if preview is None:
+            document.preview_status = document.PREVIEW_UNSUPPORTED
+        else:
+            if preview.image is not None:
+                stem = os.path.splitext(os.path.basename(document.file.name))[0]
+                document.thumbnail.save(f'{stem}.jpg', thumbnail_content(preview.image), save=False)
+            document.page_count = preview.page_count
+            document.extracted_text = _clean_text(preview.text)
+            document.preview_status = document.PREVIEW_DONE
+    except Exception as e:
+        # File danneggiato o non leggibile: l'allegato resta scaricabile
+        logger.warning(f"Anteprima non generata per {document.file.name}: {e}")
+        document.preview_status = document.PREVIEW_FAILED
+        document.preview_error = str(e)[:255]
+
+    document.preview_updated_at = timezone.now()
+    try:
+        with transaction.atomic():
+            document.save(update_fields=[
+                'preview_status', 'thumbnail', 'page_count', 'extracted_text',
+                'preview_error', 'preview_updated_at',
+            ])
+    except DatabaseError:
+        # Allegato (o richiesta) eliminato dallo staff durante l'elaborazione:
+        # la miniatura appena scritta non ha più una riga che la usi
+        if type(document).objects.filter(pk=document.pk).exists():
+            raise
+        if document.thumbnail:
+            document.thumbnail.delete(save=False)
+        logger.info(f"Allegato {document.pk} eliminato durante l'anteprima")
+        return PREVIEW_DELETED
+    return document.preview_status
+
+
+def claim_pending(model, limit=BATCH_SIZE):
+    """Segna "in elaborazione" fino a `limit` righe in coda e le ritorna."""
+    with transaction.atomic():
+        queryset = model.objects.filter(preview_status=model.PREVIEW_PENDING).order_by('pk')
+        if connection.features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True)
+        ids = list(queryset.values_list('pk', flat=True)[:limit])
+        model.objects.filter(pk__in=ids).update(
+            preview_status=model.PREVIEW_PROCESSING, preview_updated_at=timezone.now()
+        )
+    return list(model.objects.filter(pk__in=ids).order_by('pk'))
+
+
+def requeue_stale(now=None):
+    """Rimette in coda le righe di worker interrotti durante l'elaborazione."""
+    cutoff = (now or timezone.now()) - STALE_AFTER
+    requeued = 0
+    for model in preview_models():
+        requeued += model.objects.filter(
+            preview_status=model.PREVIEW_PROCESSING, preview_updated_at__lt=cutoff
+        ).update(preview_status=model.PREVIEW_PENDING)
+    return requeued
+
+
+def process_pending(limit=BATCH_SIZE):
+    """Elabora un lotto per ogni modello; ritorna {stato: numero di allegati}."""
+    counts = {}
+    for model in preview_models():
+        for document in claim_pending(model, limit):
+            status = process_document(document)
+            counts[status] = counts.get(status, 0) + 1
+    return counts
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# ADMIN
+# ═══════════════════════════════════════════════════════════════════════════
+
+def thumbnail_html(document, height=48):
+    """Miniatura cliccabile (apre l'originale), o il nome se non è pronta."""
+    if not document.thumbnail:
+        return format_html('<span title="{}">📄</span>', document.get_preview_status_display())
+    return format_html(
+        '<a href="{}" target="_blank" title="{}">'
+        '<img src="{}" alt="" loading="lazy" height="{}" style="border:1px solid #ddd;vertical-align:middle">'
+        '</a>',
+        document.file.url, document.original_filename, document.thumbnail.url, height,
+    )
+
+
+def thumbnails_html(documents, limit=3):
+    """Miniature dei primi `limit` allegati, per le colonne degli elenchi."""
+    return format_html_join(' ', '{}', ((thumbnail_html(document),) for document in documents[:limit]))
+
+
+class DocumentPreviewPanel(Panel):
+    """Anteprima dell'allegato nel pannello inline della richiesta."""
+
+    class BoundPanel(Panel.BoundPanel):
+        template_name = 'sld_project/admin/document_preview_panel.html'
+
+        def is_shown(self):
+            return bool(self.instance and self.instance.pk and self.instance.file)
+
+        def get_context_data(self, parent_context=None):
+            context = super().get_context_data(parent_context)
+            document = self.instance
+            context.update({
+                'document': document,
+                'thumbnail_url': document.thumbnail.url if document.thumbnail else '',
+                'excerpt': document.extracted_text[:1000],
+            })
+            return context
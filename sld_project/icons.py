@@ -0,0 +1,264 @@
+"""
+Sprite SVG self-hosted per le icone Lucide.
+
+Invece di caricare l'intera libreria Lucide da CDN, generiamo un unico
+sprite con le sole icone effettivamente usate:
+- icone scritte nei template (attributo data-lucide="...")
+- icone scelte dall'admin (ServiceArea.icon, ArticleCategory.icon)
+
+Lo sprite viene scritto in ICON_SPRITE_DIR con un nome contenente
+l'hash del contenuto, quindi può essere messo in cache per sempre.
+Un piccolo manifest JSON indica ai template quale sprite usare.
+Accanto allo sprite vengono scritte le varianti precompresse .gz / .br.
+
+Lo sprite può essere rigenerato a runtime (icona nuova scelta
+dall'admin), quindi non sta in STATIC_ROOT: WhiteNoise indicizza gli
+statici solo all'avvio e risponderebbe 404 fino al riavvio dei worker.
+Lo serve nginx da ICON_SPRITE_DIR (/icons/) e, senza nginx,
+icon_sprite_view con la stessa cache immutabile.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+from importlib.resources import files
+from xml.etree import ElementTree
+from zipfile import ZipFile
+
+from django.conf import settings
+from django.http import FileResponse, Http404
+from django.urls import reverse
+from django.utils.cache import patch_vary_headers
+from whitenoise.compress import Compressor
+
+logger = logging.getLogger(__name__)
+
+# Nomi storici di Lucide ancora usati nei template/DB → nome attuale nel pacchetto
+ICON_ALIASES = {
+    'alert-circle': 'circle-alert',
+    'alert-triangle': 'triangle-alert',
+    'check-circle': 'circle-check-big',
+    'pause-circle': 'circle-pause',
+    'x-circle': 'circle-x',
+}
+
+# Icone sempre incluse (usate come fallback per i valori admin non validi)
+DEFAULT_ICONS = {'file-text', 'scale'}
+
+TEMPLATE_ICON_RE = re.compile(r'data-lucide="([a-z0-9-]+)"')
+ICON_NAME_RE = re.compile(r'^[a-z0-9-]+$')
+
+SVG_NS = 'http://www.w3.org/2000/svg'
+MANIFEST_NAME = 'sprite.json'
+SPRITE_NAME_RE = re.compile(r'^sprite\.[0-9a-f]{12}\.svg$')
+
+# Il nome contiene l'hash del contenuto: cache di un anno, immutabile
+SPRITE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Cache di processo del manifest: (mtime, dati)
+_manifest_cache = {'mtime': None, 'data': None}
+
+
+def get_sprite_dir():
+    """Directory in cui vengono scritti sprite e manifest."""
+    return getattr(settings, 'ICON_SPRITE_DIR', os.path.join(settings.BASE_DIR, 'icon_sprite'))
+
+
+def _template_dirs():
+    """Tutte le directory template (progetto + app)."""
+    from django.template import engines
+
+    dirs = []
+    for engine in engines.all():
+        dirs.extend(str(d) for d in engine.template_dirs)
+    return dirs
+
+
+def collect_template_icons():
+    """Scansiona i template e restituisce i nomi icona scritti letteralmente."""
+    names = set()
+    for template_dir in _template_dirs():
+        for root, _dirs, filenames in os.walk(template_dir):
+            for filename in filenames:
+                if not filename.endswith('.html'):
+                    continue
+                try:
+                    with open(os.path.join(root, filename), encoding='utf-8') as fh:
+                        names.update(TEMPLATE_ICON_RE.findall(fh.read()))
+                except (OSError, UnicodeDecodeError):
+                    continue
+    return names
+
+
+def collect_model_icons():
+    """Restituisce le icone scelte dall'admin per aree di attività e categorie."""
+    names = set()
+    try:
+        from services.models import ServiceArea
+        from articles.models import ArticleCategory
+        for model in (ServiceArea, ArticleCategory):
+            names.update(
+                model.objects.exclude(icon='').values_list('icon', flat=True)
+            )
+    except Exception as e:
+        # DB non disponibile (es. durante il build dell'immagine): solo template
+        logger.warning(f"Icone da database non disponibili: {e}")
+    return {name.strip() for name in names if ICON_NAME_RE.match(name.strip())}
+
+
+def _open_icon_archive():
+    return ZipFile(files('lucide').joinpath('lucide.zip').open('rb'))
+
+
+def build_sprite(names):
+    """
+    Costruisce lo sprite SVG per i nomi indicati.
+
+    Returns:
+        (svg_text, missing): il contenuto dello sprite e i nomi non trovati
+    """
+    ElementTree.register_namespace('', SVG_NS)
+    sprite = ElementTree.Element(f'{{{SVG_NS}}}svg')
+    missing = []
+
+    with _open_icon_archive() as archive:
+        for name in sorted(names):
+            source_name = ICON_ALIASES.get(name, name)
+            try:
+                icon = ElementTree.fromstring(archive.read(f'{source_name}.svg'))
+            except KeyError:
+                missing.append(name)
+                continue
+
+            symbol = ElementTree.SubElement(sprite, f'{{{SVG_NS}}}symbol', {
+                'id': name,
+                'viewBox': icon.get('viewBox', '0 0 24 24'),
+                'fill': icon.get('fill', 'none'),
+                'stroke': icon.get('stroke', 'currentColor'),
+                'stroke-width': icon.get('stroke-width', '2'),
+                'stroke-linecap': icon.get('stroke-linecap', 'round'),
+                'stroke-linejoin': icon.get('stroke-linejoin', 'round'),
+            })
+            symbol.extend(list(icon))
+
+    svg_text = ElementTree.tostring(sprite, encoding='unicode')
+    return svg_text, missing
+
+
+def read_manifest():
+    """Legge il manifest dello sprite (con cache di processo basata su mtime)."""
+    path = os.path.join(get_sprite_dir(), MANIFEST_NAME)
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return None
+
+    if _manifest_cache['mtime'] != mtime:
+        try:
+            with open(path, encoding='utf-8') as fh:
+                _manifest_cache['data'] = json.load(fh)
+            _manifest_cache['mtime'] = mtime
+        except (OSError, ValueError):
+            return None
+    return _manifest_cache['data']
+
+
+def write_sprite(names=None):
+    """
+    Genera lo sprite e aggiorna il manifest.
+
+    Args:
+        names: insieme di nomi icona; se None vengono raccolti da template e DB
+
+    Returns:
+        Il manifest scritto (dict con 'file', 'icons', 'missing')
+    """
+    if names is None:
+        names = collect_template_icons() | collect_model_icons() | DEFAULT_ICONS
+
+    svg_text, missing = build_sprite(names)
+    digest = hashlib.sha256(svg_text.encode('utf-8')).hexdigest()[:12]
+    filename = f'sprite.{digest}.svg'
+
+    sprite_dir = get_sprite_dir()
+    os.makedirs(sprite_dir, exist_ok=True)
+
+    sprite_path = os.path.join(sprite_dir, filename)
+    if not os.path.exists(sprite_path):
+        with open(sprite_path, 'w', encoding='utf-8') as fh:
+            fh.write(svg_text)
+        # Lo sprite non passa da collectstatic: lo comprimiamo qui
+        for _compressed in Compressor(quiet=True).compress(sprite_path):
+            pass
+
+    manifest = {
+        'file': filename,
+        'icons': sorted(set(names) - set(missing)),
+        'missing': sorted(missing),
+    }
+
+    # Scrittura atomica: gli altri worker leggono sempre un manifest completo
+    manifest_path = os.path.join(sprite_dir, MANIFEST_NAME)
+    tmp_path = f'{manifest_path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as fh:
+        json.dump(manifest, fh)
+    os.replace(tmp_path, manifest_path)
+
+    if missing:
+        logger.warning(f"Icone Lucide non trovate: {', '.join(sorted(missing))}")
+    logger.info(f"Sprite icone generato: {filename} ({len(manifest['icons'])} icone)")
+    return manifest
+
+
+def get_sprite_url():
+    """URL pubblico dello sprite corrente (lo genera al primo utilizzo)."""
+    manifest = read_manifest()
+    if manifest is None:
+        try:
+            manifest = write_sprite()
+        except Exception as e:
+            logger.error(f"Impossibile generare lo sprite icone: {e}")
+            return ''
+    return reverse('icon_sprite', args=[manifest['file']])
+
+
+def ensure_icon(name):
+    """
+    Rigenera lo sprite se l'icona indicata non è ancora inclusa.
+    Usato quando l'admin sceglie una nuova icona.
+
+    Returns:
+        True se lo sprite è stato rigenerato
+    """
+    name = (name or '').strip()
+    if not ICON_NAME_RE.match(name):
+        return False
+
+    manifest = read_manifest()
+    if manifest and (name in manifest['icons'] or name in manifest['missing']):
+        return False
+
+    write_sprite()
+    return True
+
+
+def icon_sprite_view(request, filename):
+    """Serve lo sprite (con la variante .gz se il client la accetta)."""
+    if not SPRITE_NAME_RE.match(filename):
+        raise Http404("Sprite non trovato")
+
+    path = os.path.join(get_sprite_dir(), filename)
+    encoding = None
+    if 'gzip' in request.headers.get('Accept-Encoding', '') and os.path.exists(f'{path}.gz'):
+        path, encoding = f'{path}.gz', 'gzip'
+    try:
+        response = FileResponse(open(path, 'rb'), content_type='image/svg+xml')
+    except FileNotFoundError:
+        raise Http404("Sprite non trovato")
+
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['Cache-Control'] = SPRITE_CACHE_CONTROL
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
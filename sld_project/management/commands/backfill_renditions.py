@@ -0,0 +1,43 @@
+"""
+Management command per generare le rendition mancanti delle immagini esistenti.
+Uso: python manage.py backfill_renditions [--all]
+
+Di default tratta le immagini usate dal sito (copertine degli articoli
+pubblicati e immagine social predefinita) con i soli insiemi che servono;
+con --all genera tutti gli insiemi dichiarati per ogni immagine.
+Le rendition già presenti non vengono rigenerate.
+"""
+from django.core.management.base import BaseCommand
+from wagtail.images import get_image_model
+
+from sld_project import renditions
+
+
+class Command(BaseCommand):
+    help = 'Genera in anticipo le rendition (anche AVIF/WebP) delle immagini esistenti'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Tutte le immagini della libreria, con tutti gli insiemi dichiarati',
+        )
+
+    def handle(self, *args, **options):
+        Image = get_image_model()
+        if options['all']:
+            usages = {pk: set(renditions.RENDITION_SETS) for pk in Image.objects.values_list('pk', flat=True)}
+        else:
+            usages = renditions.image_usages()
+
+        created = 0
+        for image in Image.objects.filter(pk__in=usages).order_by('pk'):
+            count = renditions.pregenerate(image, sorted(usages[image.pk]))
+            created += count
+            if count:
+                self.stdout.write(f"  {image.title}: {count} rendition")
+
+        formats = ', '.join(renditions.picture_formats())
+        self.stdout.write(self.style.SUCCESS(
+            f"{created} rendition generate per {len(usages)} immagini (formati <picture>: {formats})"
+        ))
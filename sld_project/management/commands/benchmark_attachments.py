@@ -0,0 +1,52 @@
+"""
+Management command per misurare la validazione degli allegati.
+Uso: python manage.py benchmark_attachments [--files 10] [--size-mb 2] [--workers 4]
+
+Confronta la verifica sequenziale con quella in parallelo di
+sld_project/attachments.py su file generati in memoria (PDF fittizi).
+"""
+import os
+import time
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+
+from sld_project.attachments import validate_uploads
+from sld_project.validators import validate_attachment_file
+
+
+class Command(BaseCommand):
+    help = "Confronta la validazione sequenziale e parallela degli allegati"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--files', type=int, default=10, help="Numero di file (default 10)")
+        parser.add_argument('--size-mb', type=int, default=2, help="Dimensione di ogni file in MB (default 2)")
+        parser.add_argument('--workers', type=int, default=4, help="Thread per la prova parallela (default 4)")
+        parser.add_argument('--rounds', type=int, default=5, help="Ripetizioni, vale la migliore (default 5)")
+
+    def handle(self, *args, **options):
+        size = options['size_mb'] * 1024 * 1024
+        files = [
+            SimpleUploadedFile(f'documento_{i}.pdf', b'%PDF-1.4\n' + os.urandom(size - 9))
+            for i in range(options['files'])
+        ]
+
+        sequential = self._best(files, 1, options['rounds'])
+        parallel = self._best(files, options['workers'], options['rounds'])
+
+        self.stdout.write(f"{len(files)} file da {options['size_mb']}MB, migliore di {options['rounds']} prove:")
+        self.stdout.write(f"  Sequenziale: {sequential * 1000:.1f} ms")
+        self.stdout.write(f"  Parallela ({options['workers']} thread): {parallel * 1000:.1f} ms")
+        if parallel:
+            self.stdout.write(self.style.SUCCESS(f"  Rapporto: {sequential / parallel:.2f}x"))
+
+    def _best(self, files, workers, rounds):
+        best = None
+        for _ in range(max(1, rounds)):
+            start = time.perf_counter()
+            error = validate_uploads(files, validate_attachment_file, max_workers=workers)
+            elapsed = time.perf_counter() - start
+            if error:
+                self.stderr.write(error)
+            best = elapsed if best is None else min(best, elapsed)
+        return best
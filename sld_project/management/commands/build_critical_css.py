@@ -0,0 +1,74 @@
+"""
+Management command per generare il CSS critico (above-the-fold) per template.
+Uso: python manage.py build_critical_css [--template home] [--from-snapshots] [--force]
+
+Da eseguire al deploy dopo collectstatic: per ogni template viene
+renderizzata una pagina rappresentativa, salvata come istantanea HTML,
+e da questa viene estratto il CSS della prima schermata.
+Con --from-snapshots si usano le istantanee già presenti in
+CRITICAL_CSS_ROOT/snapshots/ senza renderizzare nulla.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from sld_project import critical_css
+
+
+class Command(BaseCommand):
+    help = 'Estrae il CSS critico per home, servizi, articoli e prenotazione'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--template',
+            action='append',
+            dest='templates',
+            choices=sorted(critical_css.CRITICAL_TEMPLATES),
+            help='Genera solo per questo template (ripetibile)',
+        )
+        parser.add_argument(
+            '--from-snapshots',
+            action='store_true',
+            help='Usa le istantanee HTML già salvate invece di renderizzare le pagine',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Rigenera anche se esiste già il CSS per il foglio di stile corrente',
+        )
+
+    def handle(self, *args, **options):
+        css = critical_css.read_stylesheet()
+        if not css:
+            self.stderr.write(self.style.ERROR(f"Foglio di stile {critical_css.STYLESHEET} non trovato"))
+            return
+
+        keys = options['templates'] or list(critical_css.CRITICAL_TEMPLATES)
+        generated = 0
+        errors = []
+        for key in keys:
+            if options['from_snapshots']:
+                html = critical_css.read_snapshot(key)
+            else:
+                try:
+                    html = critical_css.render_snapshot(key)
+                except RuntimeError as e:
+                    errors.append(str(e))
+                    self.stderr.write(self.style.ERROR(f"  {key}: {e}"))
+                    continue
+            if html is None:
+                self.stdout.write(self.style.WARNING(f"  {key}: nessuna istantanea disponibile"))
+                continue
+
+            path, created = critical_css.write_critical_css(key, html, css, force=options['force'])
+            if created:
+                generated += 1
+                self.stdout.write(f"  {key}: {path}")
+            else:
+                self.stdout.write(f"  {key}: già aggiornato")
+
+        critical_css.clear_cache()
+        if errors:
+            # Un deploy non deve proseguire credendo di avere il CSS critico
+            raise CommandError(f"CSS critico non generato per {len(errors)} template")
+        self.stdout.write(self.style.SUCCESS(
+            f"CSS critico generato per {generated} template in {critical_css.get_critical_css_root()}"
+        ))
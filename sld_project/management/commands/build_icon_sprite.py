@@ -0,0 +1,42 @@
+"""
+Management command per generare lo sprite SVG delle icone Lucide.
+Uso: python manage.py build_icon_sprite [--list]
+
+Da eseguire al deploy (dopo collectstatic): raccoglie le icone usate
+nei template e quelle scelte dall'admin, e scrive uno sprite con nome hashato.
+"""
+from django.core.management.base import BaseCommand
+
+from sld_project import icons
+
+
+class Command(BaseCommand):
+    help = 'Genera lo sprite SVG con le sole icone Lucide usate dal sito'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--list',
+            action='store_true',
+            help='Mostra le icone che verrebbero incluse senza scrivere lo sprite'
+        )
+
+    def handle(self, *args, **options):
+        template_icons = icons.collect_template_icons()
+        model_icons = icons.collect_model_icons()
+        names = template_icons | model_icons | icons.DEFAULT_ICONS
+
+        if options['list']:
+            for name in sorted(names):
+                source = 'admin' if name in model_icons and name not in template_icons else 'template'
+                self.stdout.write(f"  {name} ({source})")
+            self.stdout.write(f"\nTotale: {len(names)} icone")
+            return
+
+        manifest = icons.write_sprite(names)
+
+        for name in manifest['missing']:
+            self.stdout.write(self.style.WARNING(f"⚠ Icona non trovata: {name}"))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Sprite generato: {manifest['file']} ({len(manifest['icons'])} icone)"
+        ))
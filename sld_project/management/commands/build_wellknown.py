@@ -0,0 +1,38 @@
+"""
+Management command per generare robots.txt e favicon per host.
+Uso: python manage.py build_wellknown [--host example.com]
+
+Da eseguire al deploy: nginx serve i file da WELLKNOWN_ROOT/<host>/
+senza passare da Django (vedi nginx.conf). security.txt è generato da
+Django a ogni richiesta, così la data Expires non scade mai.
+"""
+from django.core.management.base import BaseCommand
+
+from sld_project import wellknown
+
+
+class Command(BaseCommand):
+    help = 'Genera robots.txt e favicon statici per ogni host configurato'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--host',
+            action='append',
+            dest='hosts',
+            help='Genera solo per questo host (ripetibile)',
+        )
+
+    def handle(self, *args, **options):
+        hosts = options['hosts']
+        if hosts:
+            invalid = [host for host in hosts if not wellknown.HOSTNAME_RE.match(host.lower())]
+            if invalid:
+                self.stderr.write(self.style.ERROR(f"Host non validi: {', '.join(invalid)}"))
+                return
+            hosts = [host.lower() for host in hosts]
+
+        generated = wellknown.write_wellknown_files(hosts)
+        root = wellknown.get_wellknown_root()
+        for host in generated:
+            self.stdout.write(f"  {host}")
+        self.stdout.write(self.style.SUCCESS(f"File generati in {root} per {len(generated)} host"))
@@ -0,0 +1,83 @@
+"""
+Management command che elabora la coda delle anteprime degli allegati.
+Uso: python manage.py process_document_previews [--loop] [--retry-failed]
+
+Senza opzioni elabora tutti gli allegati in coda ed esce (adatto a cron);
+con --loop resta in attesa di nuovi allegati, controllando la coda ogni
+--interval secondi (servizio `worker` in docker-compose.yml).
+Vedi sld_project/document_previews.py.
+
+Lo stesso worker esegue gli aggiornamenti da Google Calendar richiesti
+dalla verifica di allineamento (booking/alignment.py).
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from booking import alignment
+from sld_project import document_previews
+
+
+class Command(BaseCommand):
+    help = 'Genera miniature, numero di pagine e testo degli allegati in coda ed esegue gli aggiornamenti da Google Calendar richiesti'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Resta attivo ed elabora i nuovi allegati man mano che arrivano',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=10,
+            help='Secondi di attesa tra due controlli della coda vuota (default: 10)',
+        )
+        parser.add_argument(
+            '--batch',
+            type=int,
+            default=document_previews.BATCH_SIZE,
+            help=f'Allegati per lotto (default: {document_previews.BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--retry-failed',
+            action='store_true',
+            help='Rimette in coda gli allegati la cui anteprima è fallita',
+        )
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            for model in document_previews.preview_models():
+                count = model.objects.filter(preview_status=model.PREVIEW_FAILED).update(
+                    preview_status=model.PREVIEW_PENDING
+                )
+                if count:
+                    self.stdout.write(f"  {model._meta.verbose_name_plural}: {count} rimessi in coda")
+
+        total = 0
+        try:
+            while True:
+                requeued = document_previews.requeue_stale()
+                if requeued:
+                    self.stdout.write(f"  {requeued} allegati di un worker interrotto rimessi in coda")
+
+                refreshed = alignment.process_pending_refresh()
+                if refreshed:
+                    self.stdout.write("  Aggiornamento da Google Calendar eseguito")
+
+                counts = document_previews.process_pending(options['batch'])
+                processed = sum(counts.values())
+                total += processed
+                if processed:
+                    summary = ', '.join(f"{status}: {count}" for status, count in sorted(counts.items()))
+                    self.stdout.write(f"  {processed} allegati elaborati ({summary})")
+                elif refreshed:
+                    continue
+                elif not options['loop']:
+                    break
+                else:
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f"{total} anteprime elaborate"))
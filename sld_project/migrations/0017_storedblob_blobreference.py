@@ -0,0 +1,40 @@
+# Generated by Django 5.2.9 on 2026-10-19 00:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sld_project', '0016_remove_payment_fields_from_sitesettings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='SHA-256')),
+                ('name', models.CharField(max_length=255, verbose_name='File')),
+                ('size', models.BigIntegerField(verbose_name='Dimensione (byte)')),
+                ('refcount', models.PositiveIntegerField(default=0, verbose_name='Riferimenti')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Creato il')),
+            ],
+            options={
+                'verbose_name': 'Contenuto allegato',
+                'verbose_name_plural': 'Contenuti allegati',
+            },
+        ),
+        migrations.CreateModel(
+            name='BlobReference',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='File')),
+                ('blob', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='references', to='sld_project.storedblob')),
+            ],
+            options={
+                'verbose_name': 'Riferimento allegato',
+                'verbose_name_plural': 'Riferimenti allegati',
+            },
+        ),
+    ]
@@ -5,6 +5,8 @@ from django.db import models
 from wagtail.admin.panels import FieldPanel, MultiFieldPanel
 from wagtail.contrib.settings.models import BaseSiteSetting, register_setting
 
+from .protected_media import protected_storage
+
 
 @register_setting(icon="cog")
 class SiteSettings(BaseSiteSetting):
@@ -512,3 +514,80 @@ class SiteSettings(BaseSiteSetting):
     def get_tipi_udienza_choices(self):
         """Ritorna le choices per tipi udienza come lista di tuple."""
         return self._parse_choices(self.domiciliazioni_tipi_udienza)
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# ALLEGATI DEDUPLICATI (vedi sld_project/dedup_storage.py)
+# ═══════════════════════════════════════════════════════════════════════════
+
+class StoredBlob(models.Model):
+    """Contenuto di un allegato, salvato una sola volta e indicizzato per SHA-256."""
+
+    sha256 = models.CharField("SHA-256", max_length=64, primary_key=True)
+    name = models.CharField("File", max_length=255)
+    size = models.BigIntegerField("Dimensione (byte)")
+    refcount = models.PositiveIntegerField("Riferimenti", default=0)
+    created_at = models.DateTimeField("Creato il", auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Contenuto allegato"
+        verbose_name_plural = "Contenuti allegati"
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.refcount} riferimenti)"
+
+
+class BlobReference(models.Model):
+    """Nome di un FileField che punta (hard link) a uno StoredBlob."""
+
+    id = models.BigAutoField(primary_key=True)
+    name = models.CharField("File", max_length=255, unique=True)
+    blob = models.ForeignKey(StoredBlob, on_delete=models.PROTECT, related_name='references')
+
+    class Meta:
+        verbose_name = "Riferimento allegato"
+        verbose_name_plural = "Riferimenti allegati"
+
+    def __str__(self):
+        return self.name
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# ANTEPRIME DEGLI ALLEGATI (vedi sld_project/document_previews.py)
+# ═══════════════════════════════════════════════════════════════════════════
+
+class DocumentPreviewFields(models.Model):
+    """
+    Anteprima di un allegato: miniatura della prima pagina, pagine e testo.
+
+    Le righe nuove nascono "in coda"; le elabora in background
+    `manage.py process_document_previews`.
+    """
+
+    PREVIEW_PENDING = 'pending'
+    PREVIEW_PROCESSING = 'processing'
+    PREVIEW_DONE = 'done'
+    PREVIEW_UNSUPPORTED = 'unsupported'
+    PREVIEW_FAILED = 'failed'
+    PREVIEW_STATUS_CHOICES = [
+        (PREVIEW_PENDING, 'In coda'),
+        (PREVIEW_PROCESSING, 'In elaborazione'),
+        (PREVIEW_DONE, 'Pronta'),
+        (PREVIEW_UNSUPPORTED, 'Formato senza anteprima'),
+        (PREVIEW_FAILED, 'Errore'),
+    ]
+
+    preview_status = models.CharField(
+        "Stato anteprima", max_length=20,
+        choices=PREVIEW_STATUS_CHOICES, default=PREVIEW_PENDING, db_index=True
+    )
+    thumbnail = models.FileField(
+        "Miniatura", upload_to='previews/%Y/%m/', storage=protected_storage, blank=True
+    )
+    page_count = models.PositiveIntegerField("Pagine", null=True, blank=True)
+    extracted_text = models.TextField("Testo estratto", blank=True)
+    preview_error = models.CharField("Errore anteprima", max_length=255, blank=True)
+    preview_updated_at = models.DateTimeField("Anteprima aggiornata il", null=True, blank=True)
+
+    class Meta:
+        abstract = True
@@ -0,0 +1,148 @@
+"""
+Gestione economica delle risposte 404.
+
+I bot che sondano /wp-admin, /.env, /xmlrpc.php e simili rendono il 404
+una delle risposte più frequenti. Per contenerne il costo:
+- i percorsi che non possono essere pagine (estensioni di file, pattern
+  noti degli scanner) ricevono subito una risposta minima, senza
+  sessione né database (NotFoundFastPathMiddleware), salvo che esista
+  un redirect per quel percorso (indice in memoria, sld_project/redirects.py);
+- la pagina 404 completa viene renderizzata una sola volta per versione
+  del contenuto e servita dalla cache (vedi custom_404_view).
+
+Il volume dei 404 è contato per tipo in memoria, in ogni processo, e
+scritto nel log a intervalli regolari (vedi record_404): nessun accesso
+alla cache condivisa, nemmeno per le risposte minime.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.http import HttpResponseNotFound
+from django.urls import Resolver404, resolve
+
+logger = logging.getLogger(__name__)
+
+# Pattern tipici degli scanner di vulnerabilità
+SCANNER_PATH_RE = re.compile(
+    r'(^|/)(wp-admin|wp-login|wp-content|wp-includes|wp-json|xmlrpc|phpmyadmin|'
+    r'cgi-bin|vendor|actuator|\.git|\.svn|\.env|\.aws|\.ssh|\.DS_Store|config\.json|'
+    r'server-status|boaform|HNAP1)(/|\.|$)',
+    re.IGNORECASE,
+)
+
+# Le pagine Wagtail non hanno estensione: un ultimo segmento "nome.ext" è un file
+FILE_EXTENSION_RE = re.compile(r'\.[A-Za-z0-9]{1,8}$')
+
+# Nome della view catch-all di Wagtail (pagine)
+WAGTAIL_SERVE_URL_NAME = 'wagtail_serve'
+
+# Metriche: contatori di processo per tipo di 404, riepilogati nel log
+METRIC_KINDS = ('fast', 'cached', 'rendered')
+METRIC_LOG_INTERVAL = getattr(settings, 'NOTFOUND_METRIC_INTERVAL', 5 * 60)
+
+MINIMAL_BODY = 'Not Found'
+
+
+def is_obvious_non_page(path):
+    """True se il percorso non può corrispondere a una pagina del sito."""
+    return bool(SCANNER_PATH_RE.search(path) or FILE_EXTENSION_RE.search(path.rstrip('/')))
+
+
+def minimal_not_found():
+    """Risposta 404 minima, cacheabile dai proxy."""
+    response = HttpResponseNotFound(MINIMAL_BODY, content_type='text/plain; charset=utf-8')
+    response['Cache-Control'] = 'public, max-age=3600'
+    return response
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# METRICHE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_metrics_lock = threading.Lock()
+_metrics = dict.fromkeys(METRIC_KINDS, 0)
+_metrics_since = time.monotonic()
+
+
+def record_404(kind):
+    """
+    Conta un 404 del tipo indicato.
+
+    Ogni METRIC_LOG_INTERVAL secondi il processo scrive nel log i
+    conteggi del periodo e li azzera: il totale del sito è la somma
+    delle righe "404 negli ultimi ..." di tutti i worker.
+    """
+    global _metrics_since
+
+    now = time.monotonic()
+    with _metrics_lock:
+        _metrics[kind] += 1
+        elapsed = now - _metrics_since
+        if elapsed < METRIC_LOG_INTERVAL:
+            return
+        counts = dict(_metrics)
+        for key in _metrics:
+            _metrics[key] = 0
+        _metrics_since = now
+
+    summary = ', '.join(f"{key}={counts[key]}" for key in METRIC_KINDS)
+    logger.info(f"404 negli ultimi {elapsed:.0f}s (pid {os.getpid()}): {summary}, totale={sum(counts.values())}")
+
+
+def get_404_stats():
+    """Conteggi del processo corrente dall'ultimo riepilogo, con la chiave 'total'."""
+    with _metrics_lock:
+        stats = dict(_metrics)
+    stats['total'] = sum(stats.values())
+    return stats
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# MIDDLEWARE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class NotFoundFastPathMiddleware:
+    """
+    Risponde subito 404 ai percorsi degli scanner.
+
+    Interviene solo se nessuna URL Django specifica gestisce il percorso
+    (non risolve, oppure finirebbe nella view catch-all di Wagtail), così
+    /documents/<id>/<file>.pdf, robots.txt, sitemap ecc. non sono toccati.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        path = request.path_info
+        if (
+            is_obvious_non_page(path)
+            and not self._has_specific_route(path)
+            and not self._has_redirect(request)
+        ):
+            record_404('fast')
+            return minimal_not_found()
+        return self.get_response(request)
+
+    @staticmethod
+    def _has_redirect(request):
+        """Vecchi URL con estensione (es. /chi-siamo.php) possono avere un redirect."""
+        from wagtail.contrib.redirects.models import Redirect
+        from .redirects import get_redirect_index
+
+        index = get_redirect_index()
+        full_path = Redirect.normalise_path(request.get_full_path())
+        return full_path in index or urlparse(full_path).path in index
+
+    @staticmethod
+    def _has_specific_route(path):
+        try:
+            match = resolve(path)
+        except Resolver404:
+            return False
+        return match.url_name != WAGTAIL_SERVE_URL_NAME
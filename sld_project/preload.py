@@ -0,0 +1,135 @@
+"""
+Header Link di preload/preconnect per gli asset critici delle pagine.
+
+Le pagine dipendono sempre da Tailwind (CDN), Google Fonts, lo shim delle
+icone, js/sld_project.js e il logo, e da css/sld_project.css quando è
+caricato dopo il CSS critico (altrimenti è inline). Annunciandoli
+nell'header Link il browser li scarica mentre l'HTML è ancora in arrivo.
+
+103 Early Hints: gunicorn (WSGI, worker sync) non può inviare risposte
+intermedie. Le CDN/proxy che supportano Early Hints (es. Cloudflare)
+generano il 103 proprio a partire dagli header Link di preload/preconnect
+delle risposte precedenti, quindi basta emetterli qui.
+
+La lista degli asset viene calcolata una volta per template (e per
+versione di SiteSettings, da cui dipende il logo) e tenuta in memoria.
+Si disattiva con PRELOAD_HINTS = False.
+"""
+import logging
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.utils.deprecation import MiddlewareMixin
+
+from .cache_policy import SCOPE_SETTINGS, get_version
+from .critical_css import get_critical_css
+
+logger = logging.getLogger(__name__)
+
+# Tenere allineato con base.html
+GOOGLE_FONTS_CSS = "https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800;900&display=swap"
+TAILWIND_CDN = "https://cdn.tailwindcss.com"
+
+PRECONNECT_ORIGINS = [
+    ("https://fonts.googleapis.com", False),
+    ("https://fonts.gstatic.com", True),  # i font sono richiesti in CORS
+]
+
+# Asset statici usati da base.html (percorsi per {% static %})
+BASE_STATIC_SCRIPTS = ['js/lucide-sprite.js', 'js/sld_project.js']
+BASE_STATIC_STYLES = ['css/sld_project.css']
+
+# Asset aggiuntivi per template specifici
+TEMPLATE_STATIC_SCRIPTS = {
+    'contact/contact_page.html': ['js/lazy-map.js'],
+}
+
+EXCLUDED_PREFIXES = ('/admin/', '/django-admin/')
+
+# Cache di processo: {(template, versione settings, CSS critico): valore header}
+_hints_cache = {}
+
+
+def _logo_url():
+    """URL del logo caricato in SiteSettings (None se si usa quello statico di default)."""
+    from .models import SiteSettings
+
+    site_settings = SiteSettings.get_current()
+    if site_settings.pk and site_settings.logo:
+        return site_settings.logo.file.url
+    return None
+
+
+def build_link_header(template_name=None, critical_css=False):
+    """
+    Valore dell'header Link per il template indicato.
+
+    Il foglio di stile si annuncia solo se la pagina lo carica (critical_css):
+    senza CSS critico è scritto inline ({% stylesheet %}).
+    """
+    links = []
+    for origin, crossorigin in PRECONNECT_ORIGINS:
+        links.append(f"<{origin}>; rel=preconnect" + ("; crossorigin" if crossorigin else ""))
+
+    links.append(f"<{GOOGLE_FONTS_CSS}>; rel=preload; as=style")
+    links.append(f"<{TAILWIND_CDN}>; rel=preload; as=script")
+
+    assets = [(path, 'style') for path in BASE_STATIC_STYLES] if critical_css else []
+    assets += [
+        (path, 'script')
+        for path in BASE_STATIC_SCRIPTS + TEMPLATE_STATIC_SCRIPTS.get(template_name, [])
+    ]
+    for path, kind in assets:
+        try:
+            links.append(f"<{staticfiles_storage.url(path)}>; rel=preload; as={kind}")
+        except ValueError as e:
+            # Manifest senza il file (collectstatic non eseguito)
+            logger.warning(f"Preload: asset non trovato {path}: {e}")
+
+    logo_url = _logo_url()
+    if logo_url:
+        links.append(f"<{logo_url}>; rel=preload; as=image")
+
+    return ", ".join(links)
+
+
+def get_link_header(template_name=None):
+    """Header Link dalla cache di processo (calcolato al primo uso)."""
+    critical_css = get_critical_css(template_name) is not None
+    key = (template_name, get_version(SCOPE_SETTINGS), critical_css)
+    header = _hints_cache.get(key)
+    if header is None:
+        if len(_hints_cache) > 100:
+            _hints_cache.clear()
+        header = _hints_cache[key] = build_link_header(template_name, critical_css)
+    return header
+
+
+def _template_key(template_name):
+    """Nome del template da usare come chiave (il primo, se è una lista)."""
+    if isinstance(template_name, (list, tuple)):
+        return template_name[0] if template_name else None
+    return template_name
+
+
+class PreloadHintsMiddleware(MiddlewareMixin):
+    """Aggiunge l'header Link alle pagine HTML."""
+
+    def process_template_response(self, request, response):
+        request._preload_template = _template_key(response.template_name)
+        return response
+
+    def process_response(self, request, response):
+        if not getattr(settings, 'PRELOAD_HINTS', True):
+            return response
+        if (
+            request.method != 'GET'
+            or response.status_code != 200
+            or response.has_header('Link')
+            or not response.get('Content-Type', '').startswith('text/html')
+            or request.path_info.startswith(EXCLUDED_PREFIXES)
+        ):
+            return response
+
+        response['Link'] = get_link_header(getattr(request, '_preload_template', None))
+        return response
@@ -0,0 +1,98 @@
+"""
+Allegati privati: URL firmati a scadenza e download delegato a nginx.
+
+Gli allegati delle prenotazioni e delle domiciliazioni contengono atti e
+documenti dei clienti: non devono essere raggiungibili da /media/ (nginx
+risponde 404 per quelle directory, vedi nginx.conf).
+
+I FileField interessati usano ProtectedFileSystemStorage, il cui url()
+restituisce un indirizzo /allegati/<scadenza>/<firma>/<percorso>. La view
+verifica la firma HMAC di percorso + scadenza senza toccare il database
+e poi delega il trasferimento a nginx con X-Accel-Redirect (stesso
+backend sendfile dei documenti Wagtail, vedi sld_project/sendfile.py).
+"""
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied, SuspiciousFileOperation
+from django.core.files.storage import FileSystemStorage
+from django.core.signing import Signer
+from django.http import Http404
+from django.urls import reverse
+from django.utils.crypto import constant_time_compare
+from django.utils.deconstruct import deconstructible
+from wagtail.utils import sendfile_streaming_backend
+from wagtail.utils.sendfile import sendfile
+
+logger = logging.getLogger(__name__)
+
+SIGNING_SALT = 'sld_project.protected_media'
+
+# Validità predefinita di un link (secondi)
+DEFAULT_URL_TTL = 60 * 60
+
+
+def get_url_ttl():
+    return getattr(settings, 'PROTECTED_MEDIA_URL_TTL', DEFAULT_URL_TTL)
+
+
+def _signature(name, expires):
+    return Signer(salt=SIGNING_SALT).signature(f'{name}:{expires}')
+
+
+def signed_url(name, ttl=None, now=None):
+    """URL di download del file, valido per `ttl` secondi."""
+    expires = int((now if now is not None else time.time()) + (ttl or get_url_ttl()))
+    return reverse('protected_media', kwargs={
+        'expires': expires,
+        'signature': _signature(name, expires),
+        'name': name,
+    })
+
+
+def verify_signature(name, expires, signature, now=None):
+    """True se la firma corrisponde e il link non è scaduto."""
+    if expires < (now if now is not None else time.time()):
+        return False
+    return constant_time_compare(signature, _signature(name, expires))
+
+
+@deconstructible
+class ProtectedFileSystemStorage(FileSystemStorage):
+    """Storage su MEDIA_ROOT i cui URL sono firmati e a scadenza."""
+
+    def url(self, name):
+        return signed_url(name)
+
+
+_protected_storage = ProtectedFileSystemStorage()
+
+
+def protected_storage():
+    """Storage per i FileField degli allegati (callable, per le migrazioni)."""
+    return _protected_storage
+
+
+def protected_media_view(request, expires, signature, name):
+    """Verifica il link firmato e invia il file (tramite nginx in produzione)."""
+    if not verify_signature(name, expires, signature):
+        logger.info(f"Link allegato non valido o scaduto: {name}")
+        raise PermissionDenied("Link non valido o scaduto")
+
+    try:
+        path = _protected_storage.path(name)
+    except SuspiciousFileOperation:
+        raise Http404("File non trovato")
+
+    options = {'attachment': True, 'attachment_filename': os.path.basename(name)}
+    if not hasattr(settings, 'SENDFILE_BACKEND'):
+        options['backend'] = sendfile_streaming_backend.sendfile
+    response = sendfile(request, path, **options)
+
+    response['Cache-Control'] = 'private, no-store'
+    response['X-Robots-Tag'] = 'noindex, nofollow'
+    response['X-Content-Type-Options'] = 'nosniff'
+    response['Content-Security-Policy'] = "default-src 'none'"
+    return response
@@ -0,0 +1,99 @@
+"""
+Indice in memoria dei redirect Wagtail.
+
+Il RedirectMiddleware di Wagtail interroga la tabella dei redirect a ogni
+404 (fino a quattro query tra percorso, variante decodificata e percorso
+senza query string), moltiplicando il costo del traffico dei bot.
+
+Qui i percorsi di origine vengono caricati una volta per processo in un
+dizionario; il database viene toccato solo quando il percorso corrisponde
+davvero a un redirect. Il salvataggio o l'eliminazione di un Redirect, il
+cambio di slug e lo spostamento di una pagina (i redirect automatici sono
+creati con bulk_create, senza signal) incrementano una generazione in
+cache condivisa, così ogni worker ricarica l'indice alla richiesta
+successiva (vedi sld_project/signals.py).
+"""
+import logging
+from urllib.parse import urlparse
+
+from django import http
+from django.core.cache import cache
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.encoding import uri_to_iri
+from wagtail.contrib.redirects.models import Redirect
+from wagtail.models import Site
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = 'redirects:generation'
+
+# Indice di processo: {old_path: [(site_id, redirect_id), ...]}
+_index = {'generation': None, 'paths': {}}
+
+
+def invalidate_redirect_index():
+    """Segnala a tutti i worker che i redirect sono cambiati."""
+    cache.add(GENERATION_KEY, 0, None)
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 1, None)
+
+
+def get_redirect_index():
+    """Restituisce l'indice dei redirect, ricaricandolo se è cambiata la generazione."""
+    generation = cache.get(GENERATION_KEY, 0)
+    if _index['generation'] != generation:
+        paths = {}
+        for redirect_id, site_id, old_path in Redirect.objects.values_list('id', 'site_id', 'old_path'):
+            paths.setdefault(old_path, []).append((site_id, redirect_id))
+        _index.update({'generation': generation, 'paths': paths})
+        logger.info(f"Indice redirect caricato: {len(paths)} percorsi")
+    return _index['paths']
+
+
+def find_redirect(request, path):
+    """
+    Cerca il redirect per il percorso (già normalizzato).
+    Come in Wagtail, un redirect specifico del sito prevale su uno generico.
+    """
+    if "\0" in path:
+        return None
+
+    index = get_redirect_index()
+    candidates = index.get(path) or index.get(uri_to_iri(path))
+    if not candidates:
+        return None
+
+    site = Site.find_for_request(request)
+    site_id = site.pk if site else None
+    by_site = dict(candidates)
+    redirect_id = by_site.get(site_id) or by_site.get(None)
+    if redirect_id is None:
+        return None
+    return Redirect.objects.filter(pk=redirect_id).select_related('redirect_page').first()
+
+
+class CachedRedirectMiddleware(MiddlewareMixin):
+    """Equivalente di wagtail.contrib.redirects.middleware.RedirectMiddleware basato sull'indice."""
+
+    def process_response(self, request, response):
+        if response.status_code != 404:
+            return response
+
+        path = Redirect.normalise_path(request.get_full_path())
+        redirect = find_redirect(request, path)
+        if redirect is None:
+            path_without_query = urlparse(path).path
+            if path == path_without_query:
+                return response
+            redirect = find_redirect(request, path_without_query)
+            if redirect is None:
+                return response
+
+        if redirect.link is None:
+            return response
+
+        if redirect.is_permanent:
+            return http.HttpResponsePermanentRedirect(redirect.link)
+        return http.HttpResponseRedirect(redirect.link)
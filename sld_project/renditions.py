@@ -0,0 +1,307 @@
+"""
+Rendition delle immagini: formati dichiarati e pre-generazione.
+
+Ogni uso di un'immagine nel sito ha un insieme dichiarato di filtri
+(RENDITION_SETS): i template li usano tramite {% responsive_picture %}
+e gli stessi filtri vengono generati in anticipo, così il primo
+visitatore non paga l'elaborazione con Pillow. Si generano solo gli
+insiemi degli usi effettivi dell'immagine (un caricamento in blocco di
+immagini non ancora usate non costa nulla):
+- al salvataggio di un'immagine già usata (file o punto focale cambiati);
+- alla pubblicazione di un articolo (copertina);
+- al salvataggio di SiteSettings (immagine social predefinita);
+- con `manage.py backfill_renditions` per le immagini già esistenti.
+
+Per le immagini in <picture> vengono prodotte anche le varianti AVIF
+(se Pillow ha l'encoder, dalla 11.3) e WebP; JPEG (o PNG per le immagini
+con trasparenza) resta come fallback per i browser che non le supportano.
+
+Le rendition già trovate restano in una cache di processo indicizzata
+per (id immagine, filtro, chiave del punto focale), riempita all'avvio
+del worker (gunicorn.conf.py): i tag immagine di base.html non fanno
+query. La modifica o l'eliminazione di un'immagine incrementa una
+generazione in cache condivisa e ogni worker svuota la propria copia
+alla lettura successiva (vedi sld_project/signals.py).
+"""
+import logging
+from functools import lru_cache
+
+from django.core.cache import cache
+from wagtail.images import get_image_model
+from wagtail.images.models import Filter, SourceImageIOError
+from wagtail.images.shortcuts import get_renditions_or_not_found
+from wagtail.images.utils import to_svg_safe_spec
+
+logger = logging.getLogger(__name__)
+
+# Filtro per og:image, twitter:image e JSON-LD (i crawler social non leggono AVIF/WebP)
+SOCIAL_SPEC = 'fill-1200x630'
+
+SET_SOCIAL = 'social'
+SET_COVER = 'cover'
+SET_CARD = 'card'
+
+# Insiemi dichiarati: dimensioni e, per <picture>, formati alternativi
+RENDITION_SETS = {
+    SET_SOCIAL: {'sizes': [SOCIAL_SPEC], 'picture': False},
+    # Copertina dell'articolo (colonna max-w-4xl)
+    SET_COVER: {'sizes': ['fill-800x450', 'fill-1200x675'], 'picture': True},
+    # Anteprima nella griglia degli articoli
+    SET_CARD: {'sizes': ['fill-400x225', 'fill-800x450'], 'picture': True},
+}
+
+# Insiemi generati per ogni immagine in base al suo uso
+ARTICLE_COVER_SETS = (SET_COVER, SET_CARD, SET_SOCIAL)
+SOCIAL_IMAGE_SETS = (SET_SOCIAL,)
+
+
+@lru_cache(maxsize=None)
+def avif_supported():
+    """True se Pillow sa scrivere AVIF (encoder nativo da Pillow 11.3)."""
+    from PIL import Image as PILImage
+
+    PILImage.init()
+    return 'AVIF' in PILImage.SAVE
+
+
+def picture_formats():
+    """Formati alternativi per <picture>, dal più leggero."""
+    return ['avif', 'webp'] if avif_supported() else ['webp']
+
+
+def fallback_format(image):
+    """Formato dell'<img> di fallback: PNG per le immagini che possono avere trasparenza."""
+    extension = image.file.name.rsplit('.', 1)[-1].lower()
+    return 'png' if extension in ('png', 'gif', 'webp', 'avif') else 'jpeg'
+
+
+def _set_specs(set_name, fallback):
+    config = RENDITION_SETS[set_name]
+    if not config['picture']:
+        return list(config['sizes'])
+
+    specs = []
+    for fmt in picture_formats() + [fallback]:
+        specs += [f'{spec}|format-{fmt}' for spec in config['sizes']]
+    return specs
+
+
+def specs_for(image, set_name):
+    """Filtri dell'insieme per l'immagine (solo ridimensionamento per gli SVG)."""
+    if image.is_svg():
+        return [to_svg_safe_spec(spec) for spec in RENDITION_SETS[set_name]['sizes']]
+    return _set_specs(set_name, fallback_format(image))
+
+
+def all_specs(set_names=None):
+    """Tutti i filtri raster degli insiemi indicati, per ogni formato di fallback (per il prefetch)."""
+    specs = []
+    for set_name in set_names or RENDITION_SETS:
+        for fallback in ('jpeg', 'png'):
+            specs += _set_specs(set_name, fallback)
+    return list(dict.fromkeys(specs))
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# PRE-GENERAZIONE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def pregenerate(image, set_names):
+    """
+    Genera le rendition mancanti degli insiemi indicati.
+
+    Returns:
+        Numero di rendition create (0 se esistevano già o in caso di errore)
+    """
+    specs = []
+    for set_name in set_names:
+        specs += specs_for(image, set_name)
+    filters = [Filter(spec) for spec in dict.fromkeys(specs)]
+
+    try:
+        existing = image.find_existing_renditions(*filters)
+        missing = [f for f in filters if f not in existing]
+        if missing:
+            image.create_renditions(*missing)
+    except SourceImageIOError as e:
+        logger.warning(f"Rendition: file originale mancante per l'immagine {image.pk}: {e}")
+        return 0
+    except Exception as e:
+        # Mai bloccare il salvataggio in admin per una rendition
+        logger.error(f"Rendition: errore generazione per l'immagine {image.pk}: {e}")
+        return 0
+
+    if missing:
+        logger.info(f"Rendition: {len(missing)} generate per l'immagine {image.pk}")
+    return len(missing)
+
+
+def image_usages(image_ids=None):
+    """
+    Immagini usate dal sito con gli insiemi di rendition che servono.
+
+    Args:
+        image_ids: limita la ricerca a queste immagini (None: tutte)
+
+    Returns:
+        dict {image_id: set di nomi insieme}
+    """
+    from articles.models import ArticlePage
+    from .models import SiteSettings
+
+    covers = ArticlePage.objects.live().exclude(cover_image=None)
+    social = SiteSettings.objects.exclude(default_social_image=None)
+    if image_ids is not None:
+        covers = covers.filter(cover_image_id__in=image_ids)
+        social = social.filter(default_social_image_id__in=image_ids)
+
+    usages = {}
+    for image_id in covers.values_list('cover_image_id', flat=True):
+        usages.setdefault(image_id, set()).update(ARTICLE_COVER_SETS)
+    for image_id in social.values_list('default_social_image_id', flat=True):
+        usages.setdefault(image_id, set()).update(SOCIAL_IMAGE_SETS)
+    return usages
+
+
+def pregenerate_for_image(image):
+    """Insiemi degli usi attuali dell'immagine (nessuno per un nuovo caricamento)."""
+    set_names = image_usages([image.pk]).get(image.pk)
+    if set_names:
+        return pregenerate(image, set_names)
+    return 0
+
+
+def pregenerate_for_article(page):
+    """Copertina di un articolo appena pubblicato."""
+    if page.cover_image_id:
+        return pregenerate(page.cover_image, ARTICLE_COVER_SETS)
+    return 0
+
+
+def pregenerate_for_settings(site_settings):
+    """Immagine social predefinita di SiteSettings."""
+    if site_settings.default_social_image_id:
+        return pregenerate(site_settings.default_social_image, SOCIAL_IMAGE_SETS)
+    return 0
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CACHE DI PROCESSO
+# ═══════════════════════════════════════════════════════════════════════════════
+
+GENERATION_KEY = 'renditions:generation'
+
+# Oltre questo numero di voci la cache viene svuotata (ricostruita all'uso)
+CACHE_MAX_ENTRIES = 5000
+
+# {(image_id, filtro, chiave punto focale): Rendition} e {(image_id, filtro): chiave}
+_rendition_cache = {'generation': None, 'renditions': {}, 'by_id': {}}
+
+
+def invalidate_rendition_cache():
+    """Segnala a tutti i worker che un'immagine è cambiata."""
+    cache.add(GENERATION_KEY, 0, None)
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 1, None)
+
+
+def _entries():
+    """Cache di processo, svuotata se è cambiata la generazione o è troppo grande."""
+    generation = cache.get(GENERATION_KEY, 0)
+    if (
+        _rendition_cache['generation'] != generation
+        or len(_rendition_cache['renditions']) > CACHE_MAX_ENTRIES
+    ):
+        _rendition_cache.update({'generation': generation, 'renditions': {}, 'by_id': {}})
+    return _rendition_cache
+
+
+def _cache_key(image, spec):
+    return (image.pk, spec, Filter(spec).get_cache_key(image))
+
+
+def _store(entries, image, spec, rendition):
+    key = _cache_key(image, spec)
+    entries['renditions'][key] = rendition
+    entries['by_id'][(image.pk, spec)] = key
+
+
+def get_cached_renditions(image, specs):
+    """
+    Rendition dell'immagine per i filtri indicati, dalla cache di processo.
+
+    Args:
+        image: istanza Image oppure il suo id (con l'id, se tutte le
+            rendition sono in cache, l'immagine non viene caricata)
+        specs: lista di filtri
+
+    Returns:
+        dict {filtro: Rendition}, None se l'immagine non esiste
+    """
+    entries = _entries()
+
+    if not hasattr(image, 'pk'):
+        found = {}
+        for spec in specs:
+            key = entries['by_id'].get((image, spec))
+            if key is None or key not in entries['renditions']:
+                break
+            found[spec] = entries['renditions'][key]
+        else:
+            return found
+        image = get_image_model().objects.filter(pk=image).first()
+        if image is None:
+            return None
+
+    found = {}
+    missing = []
+    for spec in specs:
+        rendition = entries['renditions'].get(_cache_key(image, spec))
+        if rendition is None:
+            missing.append(spec)
+        else:
+            found[spec] = rendition
+
+    if missing:
+        for spec, rendition in get_renditions_or_not_found(image, missing).items():
+            # Le rendition "not-found" (file originale mancante) non vanno in cache
+            if rendition.pk:
+                _store(entries, image, spec, rendition)
+            found[spec] = rendition
+
+    return {spec: found[spec] for spec in specs}
+
+
+def get_cached_rendition(image, spec):
+    """Singola rendition dalla cache di processo (None se l'immagine non esiste)."""
+    renditions = get_cached_renditions(image, [spec])
+    return renditions[spec] if renditions else None
+
+
+def warm_rendition_cache():
+    """
+    Carica in cache le rendition esistenti delle immagini usate dal sito.
+    Da chiamare all'avvio del worker: non genera nulla.
+
+    Returns:
+        Numero di rendition caricate
+    """
+    entries = _entries()
+    usages = image_usages()
+    images = get_image_model().objects.filter(pk__in=usages).prefetch_renditions()
+
+    count = 0
+    for image in images:
+        wanted = set()
+        for set_name in usages[image.pk]:
+            wanted.update(specs_for(image, set_name))
+        for rendition in image.prefetched_renditions:
+            spec = rendition.filter_spec
+            if spec in wanted and rendition.focal_point_key == Filter(spec).get_cache_key(image):
+                _store(entries, image, spec, rendition)
+                count += 1
+
+    logger.info(f"Cache rendition: {count} rendition caricate per {len(usages)} immagini")
+    return count
@@ -0,0 +1,47 @@
+"""
+Backend sendfile per nginx (X-Accel-Redirect).
+
+La view dei documenti di Wagtail controlla permessi e restrizioni e poi
+chiama il backend indicato da SENDFILE_BACKEND. Con questo backend Django
+non legge il file: risponde con un header X-Accel-Redirect verso la
+location interna SENDFILE_URL e nginx trasferisce i byte, così un PDF
+grande non occupa un worker gunicorn per tutto il download.
+
+Usato in produzione (vedi settings/production.py e nginx.conf); senza
+SENDFILE_BACKEND Wagtail torna allo streaming attraverso Django.
+"""
+import logging
+import os
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import HttpResponse
+from wagtail.utils import sendfile_streaming_backend
+
+logger = logging.getLogger(__name__)
+
+
+def accel_redirect_path(filename):
+    """
+    Percorso interno nginx per il file (None se il file è fuori da SENDFILE_ROOT).
+    """
+    root = os.path.realpath(getattr(settings, 'SENDFILE_ROOT', settings.MEDIA_ROOT))
+    path = os.path.realpath(filename)
+    if os.path.commonpath([root, path]) != root:
+        return None
+
+    relative = os.path.relpath(path, root).replace(os.sep, '/')
+    base_url = getattr(settings, 'SENDFILE_URL', '/internal-media/').rstrip('/')
+    return quote(f'{base_url}/{relative}')
+
+
+def sendfile(request, filename, **kwargs):
+    """Risposta vuota con X-Accel-Redirect: il file lo invia nginx."""
+    location = accel_redirect_path(filename)
+    if location is None:
+        logger.warning(f"Sendfile: {filename} fuori da SENDFILE_ROOT, invio tramite Django")
+        return sendfile_streaming_backend.sendfile(request, filename, **kwargs)
+
+    response = HttpResponse()
+    response['X-Accel-Redirect'] = location
+    return response
@@ -67,9 +67,20 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    # Lookup trigram per la ricerca delle domiciliazioni (domiciliazioni/search.py)
+    "django.contrib.postgres",
 ]
 
 MIDDLEWARE = [
+    # WhiteNoise serve gli statici (con le varianti .br/.gz precompresse)
+    # prima di qualunque altro middleware: indispensabile senza nginx (USE_TCP_SOCKET)
+    "whitenoise.middleware.WhiteNoiseMiddleware",
+    # 404 immediato per i percorsi degli scanner, senza sessione né DB
+    "sld_project.notfound.NotFoundFastPathMiddleware",
+    # Cache-Control/ETag per le risposte anonime (vedi sld_project/cache_policy.py)
+    "sld_project.cache_policy.CachePolicyMiddleware",
+    # Header Link di preload per gli asset critici (sld_project/preload.py)
+    "sld_project.preload.PreloadHintsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -77,7 +88,8 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "wagtail.contrib.redirects.middleware.RedirectMiddleware",
+    # Come il RedirectMiddleware di Wagtail, ma con indice in memoria (sld_project/redirects.py)
+    "sld_project.redirects.CachedRedirectMiddleware",
 ]
 
 ROOT_URLCONF = "sld_project.urls"
@@ -162,6 +174,21 @@ STATICFILES_DIRS = [
 STATIC_ROOT = os.path.join(BASE_DIR, "static")
 STATIC_URL = "/static/"
 
+# Sprite SVG delle icone Lucide (generato da `manage.py build_icon_sprite`
+# e rigenerato quando l'admin sceglie un'icona nuova): fuori da STATIC_ROOT,
+# servito da nginx o da sld_project.icons.icon_sprite_view
+ICON_SPRITE_DIR = os.path.join(BASE_DIR, "icon_sprite")
+
+# Header Link (preload/preconnect) sulle pagine HTML, usati dalle CDN per i 103 Early Hints
+PRELOAD_HINTS = os.environ.get('PRELOAD_HINTS', 'True') == 'True'
+
+# robots.txt, security.txt e favicon per host, serviti da nginx
+# (generati da `manage.py build_wellknown`)
+WELLKNOWN_ROOT = os.path.join(BASE_DIR, "wellknown")
+
+# CSS critico inline per template (generato da `manage.py build_critical_css`)
+CRITICAL_CSS_ROOT = os.path.join(BASE_DIR, "critical_css")
+
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 MEDIA_URL = "/media/"
 
@@ -175,15 +202,34 @@ STORAGES = {
     # outdated JavaScript / CSS assets being served from cache
     # (e.g. after a Wagtail upgrade).
     # See https://docs.djangoproject.com/en/5.2/ref/contrib/staticfiles/#manifeststaticfilesstorage
+    # La variante WhiteNoise aggiunge, durante collectstatic, i file .gz e
+    # .br (se è installato Brotli) accanto a CSS/JS/SVG.
     "staticfiles": {
-        "BACKEND": "django.contrib.staticfiles.storage.ManifestStaticFilesStorage",
+        "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
     },
 }
 
+# File con hash nel nome dal manifest di Django: cache immutabile.
+# WhiteNoise indicizza STATIC_ROOT all'avvio: i file scritti dopo (come lo
+# sprite icone, che infatti sta in ICON_SPRITE_DIR) richiedono un riavvio
+WHITENOISE_IMMUTABLE_FILE_TEST = r"^.+\.[0-9a-f]{12}\.[A-Za-z0-9]+$"
+
 # Django sets a maximum of 1000 fields per form by default, but particularly complex page models
 # can exceed this limit within Wagtail's page editor.
 DATA_UPLOAD_MAX_NUMBER_FIELDS = 10_000
 
+# Allegati di prenotazioni e domiciliazioni validati durante lo streaming
+# (sld_project/uploads.py); gli altri upload usano gli handler di Django
+FILE_UPLOAD_HANDLERS = [
+    "sld_project.uploads.StreamingValidationUploadHandler",
+    "django.core.files.uploadhandler.MemoryFileUploadHandler",
+    "django.core.files.uploadhandler.TemporaryFileUploadHandler",
+]
+
+# Thread per la verifica degli allegati (sld_project/attachments.py);
+# con i soli primi 8KB da controllare il pool non conviene
+ATTACHMENT_VALIDATION_WORKERS = int(os.environ.get("ATTACHMENT_VALIDATION_WORKERS", 1))
+
 
 # Wagtail settings
 
@@ -215,7 +261,20 @@ WAGTAILDOCS_EXTENSIONS = ['csv', 'docx', 'key', 'odt', 'pdf', 'pptx', 'rtf', 'tx
 # Options: 'redirect', 'serve_view', 'direct'
 # - 'serve_view': Serves through Django, allows permission checks (more secure)
 # - 'direct': Bypasses Django, faster but no access control
+# Con SENDFILE_BACKEND (produzione) il controllo resta in Django ma i byte
+# li invia nginx tramite X-Accel-Redirect (vedi sld_project/sendfile.py)
 WAGTAILDOCS_SERVE_METHOD = 'serve_view'
+SENDFILE_ROOT = MEDIA_ROOT
+SENDFILE_URL = "/internal-media/"
+
+# Durata (secondi) dei link firmati agli allegati privati (sld_project/protected_media.py)
+PROTECTED_MEDIA_URL_TTL = int(os.environ.get("PROTECTED_MEDIA_URL_TTL", 3600))
+
+# Email con documenti: oltre queste soglie il file va come link firmato
+# (validità PROTECTED_MEDIA_EMAIL_URL_TTL), vedi sld_project/attachments.py
+EMAIL_ATTACHMENT_INLINE_MAX_SIZE = int(os.environ.get("EMAIL_ATTACHMENT_INLINE_MAX_SIZE", 2 * 1024 * 1024))
+EMAIL_ATTACHMENT_INLINE_TOTAL_SIZE = int(os.environ.get("EMAIL_ATTACHMENT_INLINE_TOTAL_SIZE", 5 * 1024 * 1024))
+PROTECTED_MEDIA_EMAIL_URL_TTL = int(os.environ.get("PROTECTED_MEDIA_EMAIL_URL_TTL", 7 * 24 * 3600))
 
 # Payment Mode: demo | sandbox | live
 # - demo: Simula il pagamento (sempre successo, per test senza chiavi API)
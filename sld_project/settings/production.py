@@ -48,8 +48,8 @@ if _matomo_url:
 
 CSP_POLICY = {
     "default-src": "'self'",
-    "script-src": f"'self' 'unsafe-inline' 'unsafe-eval' https://cdn.tailwindcss.com https://unpkg.com https://js.stripe.com https://www.paypal.com https://www.google.com https://www.gstatic.com https://www.googletagmanager.com{' https://' + _matomo_domain if _matomo_domain else ''}",
-    "style-src": "'self' 'unsafe-inline' https://fonts.googleapis.com https://cdn.tailwindcss.com https://unpkg.com",
+    "script-src": f"'self' 'unsafe-inline' 'unsafe-eval' https://cdn.tailwindcss.com https://js.stripe.com https://www.paypal.com https://www.google.com https://www.gstatic.com https://www.googletagmanager.com{' https://' + _matomo_domain if _matomo_domain else ''}",
+    "style-src": "'self' 'unsafe-inline' https://fonts.googleapis.com https://cdn.tailwindcss.com",
     "font-src": "'self' https://fonts.gstatic.com",
     "img-src": f"'self' data: https: blob:{' https://' + _matomo_domain if _matomo_domain else ''}",
     "connect-src": f"'self' https://api.stripe.com https://www.paypal.com https://www.google-analytics.com https://www.googletagmanager.com{' https://' + _matomo_domain if _matomo_domain else ''}",
@@ -93,6 +93,42 @@ if os.environ.get('DATABASE_URL'):
         'default': dj_database_url.config(conn_max_age=600)
     }
 
+# ═══════════════════════════════════════════════════════════════════════════════
+# CACHE - condivisa tra i worker gunicorn
+# ═══════════════════════════════════════════════════════════════════════════════
+# La LocMemCache di default è per-processo: le versioni del contenuto usate per
+# ETag/304 (sld_project/cache_policy.py) e le generazioni di sitemap, redirect e
+# rendition devono essere uguali in tutti i worker e non vanno mai scartate.
+# Con REDIS_URL si usa Redis (consigliato). Senza, la cache su file è
+# dimensionata perché non arrivi al culling: con il default di 300 voci
+# eliminerebbe a caso anche versioni e generazioni.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('DJANGO_CACHE_DIR', os.path.join(BASE_DIR, 'cache')),
+            'OPTIONS': {
+                'MAX_ENTRIES': int(os.environ.get('DJANGO_CACHE_MAX_ENTRIES', 20000)),
+            },
+        }
+    }
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# DOWNLOAD DOCUMENTI - trasferimento delegato a nginx
+# ═══════════════════════════════════════════════════════════════════════════════
+# Dopo il controllo dei permessi Django risponde con X-Accel-Redirect verso la
+# location interna SENDFILE_URL (vedi nginx.conf e sld_project/sendfile.py).
+# X_ACCEL_REDIRECT=False se gunicorn non è dietro nginx.
+if os.environ.get('X_ACCEL_REDIRECT', 'True') == 'True':
+    SENDFILE_BACKEND = 'sld_project.sendfile'
+
 try:
     from .local import *
 except ImportError:
@@ -3,6 +3,10 @@ Settings for running tests.
 Uses StaticFilesStorage instead of ManifestStaticFilesStorage
 to avoid needing collectstatic before running tests.
 """
+import atexit
+import shutil
+import tempfile
+
 from .dev import *
 
 # Override STORAGES to use simple storage without manifest
@@ -23,3 +27,14 @@ PASSWORD_HASHERS = [
 
 # Disable rate limiting in tests
 RATELIMIT_ENABLE = False
+
+# File generati dai test in una directory temporanea, non nel working tree
+TEST_FILES_ROOT = tempfile.mkdtemp(prefix="sld-test-")
+atexit.register(shutil.rmtree, TEST_FILES_ROOT, ignore_errors=True)
+
+STATIC_ROOT = os.path.join(TEST_FILES_ROOT, "static")
+MEDIA_ROOT = os.path.join(TEST_FILES_ROOT, "media")
+SENDFILE_ROOT = MEDIA_ROOT
+ICON_SPRITE_DIR = os.path.join(TEST_FILES_ROOT, "icon_sprite")
+CRITICAL_CSS_ROOT = os.path.join(TEST_FILES_ROOT, "critical_css")
+WELLKNOWN_ROOT = os.path.join(TEST_FILES_ROOT, "wellknown")
@@ -0,0 +1,220 @@
+"""
+Signal di invalidazione delle cache dei contenuti pubblici.
+
+Qualunque modifica a pagine, snippet, immagini o impostazioni aggiorna la
+versione del contenuto usata da CachePolicyMiddleware per ETag e
+Last-Modified (vedi sld_project/cache_policy.py).
+
+Pubblicazione, ritiro, spostamento ed eliminazione di pagine invalidano
+solo la sezione della sitemap interessata (vedi sld_project/sitemaps.py).
+
+Le modifiche ai Redirect, compresi quelli creati automaticamente da
+Wagtail quando una pagina cambia slug o viene spostata, fanno ricaricare
+l'indice in memoria di ogni worker (vedi sld_project/redirects.py);
+quelle a SiteSettings e Site rigenerano robots.txt e favicon per host
+(sld_project/wellknown.py).
+
+Modifica di immagini già usate, pubblicazione di articoli e salvataggio
+di SiteSettings generano in anticipo le rendition degli usi effettivi
+(sld_project/renditions.py), dopo il commit della transazione; la
+modifica di un'immagine o l'eliminazione di rendition svuota la cache
+di processo delle rendition in ogni worker.
+
+Appuntamenti, eventi Google e udienze aggiornano la versione del feed
+del calendario admin (booking/calendar_feed.py).
+
+L'eliminazione di un allegato rilascia il suo riferimento nello storage
+deduplicato (sld_project/dedup_storage.py) dopo il commit, insieme alla
+sua miniatura; un file sostituito dall'admin rimette in coda l'anteprima
+(sld_project/document_previews.py).
+"""
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from wagtail.signals import page_published, page_slug_changed, page_unpublished, post_page_move
+
+from .cache_policy import SCOPE_CALENDAR, SCOPE_CONTENT, SCOPE_SETTINGS, bump_version
+from .redirects import invalidate_redirect_index
+from . import renditions
+from .wellknown import refresh_wellknown_files
+from .sitemaps import invalidate_section, sections_for_page
+
+logger = logging.getLogger(__name__)
+
+# App i cui modelli finiscono nelle pagine pubbliche
+CONTENT_APP_LABELS = {'home', 'services', 'articles', 'contact', 'sld_project', 'wagtailimages', 'wagtailredirects'}
+
+# Modelli Wagtail che influenzano le pagine pubbliche
+CONTENT_CORE_MODELS = {'wagtailcore.page', 'wagtailcore.site', 'wagtailcore.pageviewrestriction'}
+
+# Modelli salvati durante il rendering o il lavoro in admin: non cambiano il sito
+IGNORED_MODELS = {'wagtailimages.rendition', 'sld_project.storedblob', 'sld_project.blobreference'}
+
+# Modelli mostrati nel calendario dell'admin
+CALENDAR_MODELS = {'booking.appointment', 'booking.googlecalendarevent', 'domiciliazioni.domiciliazionisubmission'}
+
+# Allegati su storage deduplicato: il file va rilasciato con la riga
+ATTACHMENT_MODELS = {'booking.appointmentattachment', 'domiciliazioni.domiciliazionidocument'}
+
+
+def is_content_model(model):
+    """True se le modifiche al modello cambiano il contenuto pubblico."""
+    from wagtail.models import Page
+
+    label = model._meta.label_lower
+    if label in IGNORED_MODELS:
+        return False
+    return (
+        issubclass(model, Page)
+        or model._meta.app_label in CONTENT_APP_LABELS
+        or label in CONTENT_CORE_MODELS
+    )
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def content_changed(sender, **kwargs):
+    """Aggiorna la versione del contenuto dopo una modifica."""
+    if kwargs.get('raw') or not is_content_model(sender):
+        return
+    bump_version(SCOPE_CONTENT)
+
+    label = sender._meta.label_lower
+    if label == 'sld_project.sitesettings':
+        bump_version(SCOPE_SETTINGS)
+        refresh_wellknown_files()
+    elif label == 'wagtailcore.site':
+        refresh_wellknown_files()
+    elif label == 'wagtailredirects.redirect':
+        invalidate_redirect_index()
+
+
+def _invalidate_sitemap(page):
+    for section in sections_for_page(page):
+        invalidate_section(section)
+
+
+@receiver(page_published)
+@receiver(page_unpublished)
+def page_visibility_changed(sender, instance, **kwargs):
+    """Una pagina è comparsa, cambiata o sparita dal sito pubblico."""
+    _invalidate_sitemap(instance)
+
+
+@receiver(post_page_move)
+def page_moved(sender, instance, **kwargs):
+    """Lo spostamento cambia l'URL della pagina e dei suoi discendenti."""
+    _invalidate_sitemap(instance)
+    transaction.on_commit(invalidate_redirect_index)
+
+
+@receiver(page_slug_changed)
+def page_slug_renamed(sender, instance, **kwargs):
+    """
+    Wagtail crea i redirect automatici con bulk_create, senza signal del
+    modello: l'indice si ricarica dopo il commit, quando esistono già.
+    """
+    transaction.on_commit(invalidate_redirect_index)
+
+
+@receiver(post_delete)
+def page_deleted(sender, instance, **kwargs):
+    """Pagina eliminata: la si rimuove dalla sitemap."""
+    from wagtail.models import Page
+
+    if isinstance(instance, Page) and instance.live:
+        _invalidate_sitemap(instance)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# PRE-GENERAZIONE RENDITION
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@receiver(post_save)
+def pregenerate_renditions(sender, instance, created, raw=False, **kwargs):
+    """Genera le rendition usate dal sito prima che le chieda un visitatore."""
+    if raw:
+        return
+
+    label = sender._meta.label_lower
+    if label == 'wagtailimages.image' and not created:
+        # Un'immagine appena caricata non è ancora usata da nessuna parte
+        transaction.on_commit(lambda: renditions.pregenerate_for_image(instance))
+    elif label == 'sld_project.sitesettings':
+        transaction.on_commit(lambda: renditions.pregenerate_for_settings(instance))
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def image_changed(sender, raw=False, **kwargs):
+    """File o punto focale cambiati, immagine o rendition eliminate."""
+    if raw:
+        return
+    label = sender._meta.label_lower
+    if label == 'wagtailimages.image' or (label == 'wagtailimages.rendition' and 'created' not in kwargs):
+        renditions.invalidate_rendition_cache()
+
+
+@receiver(page_published)
+def pregenerate_article_renditions(sender, instance, **kwargs):
+    """Copertina dell'articolo pubblicato."""
+    from articles.models import ArticlePage
+
+    if isinstance(instance, ArticlePage):
+        transaction.on_commit(lambda: renditions.pregenerate_for_article(instance))
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CALENDARIO ADMIN
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@receiver(post_save)
+@receiver(post_delete)
+def calendar_changed(sender, raw=False, **kwargs):
+    """Invalida le risposte in cache del feed del calendario."""
+    if not raw and sender._meta.label_lower in CALENDAR_MODELS:
+        bump_version(SCOPE_CALENDAR)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ALLEGATI DEDUPLICATI
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@receiver(post_delete)
+def attachment_deleted(sender, instance, **kwargs):
+    """Rilascia il riferimento al contenuto; l'ultimo rimuove il blob."""
+    if sender._meta.label_lower not in ATTACHMENT_MODELS or not instance.file:
+        return
+    storage, name = instance.file.storage, instance.file.name
+    transaction.on_commit(lambda: storage.delete(name))
+
+
+@receiver(post_delete)
+def attachment_thumbnail_deleted(sender, instance, **kwargs):
+    """La miniatura dell'anteprima segue l'allegato."""
+    if sender._meta.label_lower not in ATTACHMENT_MODELS or not instance.thumbnail:
+        return
+    storage, name = instance.thumbnail.storage, instance.thumbnail.name
+    transaction.on_commit(lambda: storage.delete(name))
+
+
+@receiver(pre_save)
+def attachment_file_replaced(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Un file sostituito torna in coda per una nuova anteprima."""
+    if raw or sender._meta.label_lower not in ATTACHMENT_MODELS or instance.pk is None:
+        return
+    if update_fields is not None and 'file' not in update_fields:
+        # Salvataggio dei soli campi di anteprima (worker)
+        return
+
+    previous = sender.objects.filter(pk=instance.pk).values_list('file', flat=True).first()
+    if previous is None or previous == instance.file.name:
+        return
+    if instance.thumbnail:
+        storage, name = instance.thumbnail.storage, instance.thumbnail.name
+        transaction.on_commit(lambda: storage.delete(name))
+    instance.thumbnail = ''
+    instance.preview_status = sender.PREVIEW_PENDING
+    instance.page_count, instance.extracted_text, instance.preview_error = None, '', ''
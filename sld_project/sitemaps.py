@@ -0,0 +1,214 @@
+"""
+Sitemap XML con cache e rigenerazione per sezione.
+
+La sitemap di Wagtail percorre l'intero albero delle pagine a ogni
+richiesta. Qui la dividiamo in sezioni (pagine istituzionali e articoli);
+quando gli articoli superano ARTICLES_PER_FILE, /sitemap.xml diventa un
+indice che rimanda a sitemap-pages.xml e sitemap-articles.xml?p=N.
+
+Ogni sezione viene generata una sola volta e messa in cache; alla
+pubblicazione/ritiro di una pagina viene invalidata solo la sezione
+interessata (vedi sld_project/signals.py). Le risposte hanno
+Last-Modified, quindi i crawler che rivalidano ricevono un 304.
+"""
+import logging
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.sitemaps import views as sitemap_views
+from django.core.cache import cache
+from django.db.models import Max
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from wagtail.contrib.sitemaps import Sitemap
+
+logger = logging.getLogger(__name__)
+
+SECTION_PAGES = 'pages'
+SECTION_ARTICLES = 'articles'
+
+GENERATION_KEY = 'sitemap:generation:{section}'
+CONTENT_KEY = 'sitemap:{host}:{scheme}:{name}:{generation}:{page}'
+
+# Numero massimo di articoli per file (oltre si passa a sitemap-articles.xml?p=2, ...)
+ARTICLES_PER_FILE = getattr(settings, 'SITEMAP_ARTICLES_PER_FILE', 1000)
+
+# Durata in cache dei file generati (l'invalidazione avviene con la generazione)
+CACHE_TIMEOUT = getattr(settings, 'SITEMAP_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+class _SectionSitemap(Sitemap):
+    """
+    Sitemap Wagtail limitata a un sottoinsieme delle pagine del sito.
+
+    La sezione è dichiarata da page_type_filter: ('type', modello) tiene
+    solo le pagine di quel tipo, ('not_type', modello) le esclude.
+    """
+
+    page_type_filter = ('type', 'wagtailcore.Page')
+
+    def base_queryset(self):
+        return (
+            self.get_wagtail_site()
+            .root_page.get_descendants(inclusive=True)
+            .live()
+            .public()
+        )
+
+    def filter_section(self, queryset):
+        method, model = self.page_type_filter
+        return getattr(queryset, method)(apps.get_model(model))
+
+    def items(self):
+        return (
+            self.filter_section(self.base_queryset())
+            .order_by('path')
+            .defer_streamfields()
+            .specific()
+        )
+
+    def get_latest_lastmod(self):
+        # Una sola query invece di iterare tutte le pagine
+        return self.filter_section(self.base_queryset()).aggregate(
+            latest=Max('last_published_at')
+        )['latest']
+
+
+class PagesSitemap(_SectionSitemap):
+    """Pagine istituzionali (home, servizi, contatti, ...)."""
+
+    page_type_filter = ('not_type', 'articles.ArticlePage')
+
+
+class ArticlesSitemap(_SectionSitemap):
+    """Articoli del blog, suddivisi in file da ARTICLES_PER_FILE."""
+
+    limit = ARTICLES_PER_FILE
+    page_type_filter = ('type', 'articles.ArticlePage')
+
+
+SITEMAPS = {
+    SECTION_PAGES: PagesSitemap,
+    SECTION_ARTICLES: ArticlesSitemap,
+}
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# INVALIDAZIONE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _generation(section):
+    return cache.get(GENERATION_KEY.format(section=section), 0)
+
+
+def invalidate_section(section):
+    """Forza la rigenerazione di una sezione (e quindi dell'indice)."""
+    key = GENERATION_KEY.format(section=section)
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+    logger.info(f"Sitemap: sezione '{section}' da rigenerare")
+
+
+def sections_for_page(page):
+    """Sezioni della sitemap che contengono la pagina (o i suoi discendenti)."""
+    from articles.models import ArticlePage
+
+    if isinstance(page.specific_deferred, ArticlePage):
+        return {SECTION_ARTICLES}
+
+    sections = {SECTION_PAGES}
+    # Cambiare slug o spostare un indice cambia gli URL degli articoli sotto di esso
+    if ArticlePage.objects.descendant_of(page).exists():
+        sections.add(SECTION_ARTICLES)
+    return sections
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# VIEW
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _page_number(request):
+    """Numero di pagina da ?p= (404 se non è un intero positivo)."""
+    try:
+        page = int(request.GET.get('p', '1'))
+    except ValueError:
+        page = 0
+    if page < 1:
+        raise Http404("Pagina della sitemap non valida")
+    return page
+
+
+def _cached_response(request, name, generation, render):
+    """
+    Serve il contenuto dalla cache (generandolo se manca) con Last-Modified/304.
+
+    Args:
+        name: nome della sezione o 'index'
+        generation: generazione corrente delle sezioni coinvolte
+        render: funzione che produce la TemplateResponse di Django
+    """
+    key = CONTENT_KEY.format(
+        host=request.get_host(),
+        scheme=request.scheme,
+        name=name,
+        generation=generation,
+        page=_page_number(request),
+    )
+    cached = cache.get(key)
+
+    if cached is None:
+        response = render()
+        response.render()
+        if response.status_code != 200:
+            return response
+        cached = {
+            'content': response.content,
+            'last_modified': response.get('Last-Modified'),
+        }
+        cache.set(key, cached, CACHE_TIMEOUT)
+
+    response = HttpResponse(cached['content'], content_type='application/xml')
+    response['X-Robots-Tag'] = 'noindex, noodp, noarchive'
+    if cached['last_modified']:
+        response['Last-Modified'] = cached['last_modified']
+        return get_conditional_response(
+            request,
+            last_modified=parse_http_date_safe(cached['last_modified']),
+            response=response,
+        )
+    return response
+
+
+def sitemap_index(request):
+    """
+    /sitemap.xml: finché gli articoli stanno in un solo file è un'unica
+    sitemap con tutte le pagine, oltre diventa un indice delle sezioni.
+    """
+    generation = '-'.join(str(_generation(section)) for section in SITEMAPS)
+
+    def render():
+        sitemaps = {name: cls(request) for name, cls in SITEMAPS.items()}
+        if sitemaps[SECTION_ARTICLES].paginator.num_pages > 1:
+            return sitemap_views.index(request, sitemaps, sitemap_url_name='sitemap_section')
+        return sitemap_views.sitemap(request, sitemaps)
+
+    return _cached_response(request, 'index', generation, render)
+
+
+def sitemap_section(request, section):
+    """Singola sezione /sitemap-<section>.xml (con ?p=N per le successive)."""
+    if section not in SITEMAPS:
+        raise Http404(f"Sezione sitemap inesistente: {section}")
+
+    return _cached_response(
+        request, section, _generation(section),
+        lambda: sitemap_views.sitemap(
+            request,
+            {section: SITEMAPS[section](request)},
+            section=section,
+        ),
+    )
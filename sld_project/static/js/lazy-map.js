@@ -0,0 +1,122 @@
+/**
+ * Mappa Leaflet con caricamento differito
+ * Leaflet (CSS + JS self-hosted) viene scaricato solo quando un elemento
+ * [data-lazy-map] entra nel viewport o viene cliccato.
+ * Le pagine senza mappa non scaricano nulla.
+ */
+(function() {
+    let leafletPromise = null;
+
+    function loadLeaflet(el) {
+        if (leafletPromise) return leafletPromise;
+
+        leafletPromise = new Promise(function(resolve, reject) {
+            if (typeof L !== 'undefined') {
+                resolve();
+                return;
+            }
+
+            const css = document.createElement('link');
+            css.rel = 'stylesheet';
+            css.href = el.dataset.leafletCss;
+            document.head.appendChild(css);
+
+            const script = document.createElement('script');
+            script.src = el.dataset.leafletJs;
+            script.onload = resolve;
+            script.onerror = function(error) {
+                // Al prossimo tentativo lo script viene richiesto di nuovo
+                script.remove();
+                reject(error);
+            };
+            document.head.appendChild(script);
+        });
+        return leafletPromise;
+    }
+
+    function escapeHtml(text) {
+        const div = document.createElement('div');
+        div.textContent = text || '';
+        return div.innerHTML;
+    }
+
+    function initMap(el) {
+        if (el.dataset.loaded) return;
+        el.dataset.loaded = 'true';
+
+        loadLeaflet(el).then(function() {
+            const lat = parseFloat(el.dataset.lat);
+            const lng = parseFloat(el.dataset.lng);
+            if (isNaN(lat) || isNaN(lng)) return;
+
+            const placeholder = el.querySelector('.lazy-map-placeholder');
+            if (placeholder) placeholder.remove();
+
+            const map = L.map(el).setView([lat, lng], parseInt(el.dataset.zoom, 10) || 17);
+
+            L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {
+                attribution: '&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a>'
+            }).addTo(map);
+
+            // Icone marker esplicite: con ManifestStaticFilesStorage i nomi sono hashati
+            // e Leaflet non riesce a ricavare il percorso dal CSS
+            const icon = L.icon({
+                iconUrl: el.dataset.markerIcon,
+                iconRetinaUrl: el.dataset.markerIcon2x,
+                shadowUrl: el.dataset.markerShadow,
+                iconSize: [25, 41],
+                iconAnchor: [12, 41],
+                popupAnchor: [1, -34],
+                shadowSize: [41, 41]
+            });
+
+            L.marker([lat, lng], { icon: icon }).addTo(map)
+                .bindPopup('<strong>' + escapeHtml(el.dataset.title) + '</strong><br>' + escapeHtml(el.dataset.address))
+                .openPopup();
+
+            // Forza resize per risolvere problemi di rendering
+            setTimeout(function() {
+                map.invalidateSize();
+            }, 100);
+        }).catch(function() {
+            delete el.dataset.loaded;
+            leafletPromise = null;
+            console.error('Leaflet non caricato');
+            // L'elemento non è più osservato: un clic permette di riprovare
+            armClick(el);
+        });
+    }
+
+    function armClick(el) {
+        el.addEventListener('click', function() { initMap(el); }, { once: true });
+    }
+
+    function setup() {
+        const maps = document.querySelectorAll('[data-lazy-map]');
+        if (!maps.length) return;
+
+        const observer = 'IntersectionObserver' in window
+            ? new IntersectionObserver(function(entries) {
+                entries.forEach(function(entry) {
+                    if (entry.isIntersecting) {
+                        observer.unobserve(entry.target);
+                        initMap(entry.target);
+                    }
+                });
+            }, { rootMargin: '200px' })
+            : null;
+
+        maps.forEach(function(el) {
+            armClick(el);
+            if (observer) {
+                observer.observe(el);
+            }
+        });
+    }
+
+    if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', setup);
+    } else {
+        setup();
+    }
+})();
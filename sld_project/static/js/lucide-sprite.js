@@ -0,0 +1,42 @@
+/**
+ * Icone Lucide da sprite SVG self-hosted
+ * Sostituisce la libreria Lucide da CDN: trasforma ogni <i data-lucide="nome">
+ * in un <svg><use href="sprite.svg#nome"></use></svg>.
+ * Espone la stessa API (lucide.createIcons) usata dai template esistenti.
+ */
+(function() {
+    const script = document.currentScript;
+    const spriteUrl = script ? script.dataset.sprite : '';
+    const SVG_NS = 'http://www.w3.org/2000/svg';
+
+    function createIcons() {
+        if (!spriteUrl) return;
+
+        document.querySelectorAll('i[data-lucide]').forEach(function(el) {
+            const name = el.getAttribute('data-lucide');
+            const svg = document.createElementNS(SVG_NS, 'svg');
+
+            // Copia gli attributi (class, aria-*, style...) come fa Lucide
+            Array.from(el.attributes).forEach(function(attr) {
+                if (attr.name !== 'data-lucide') {
+                    svg.setAttribute(attr.name, attr.value);
+                }
+            });
+            svg.setAttribute('class', ('lucide lucide-' + name + ' ' + (el.getAttribute('class') || '')).trim());
+            svg.setAttribute('width', '24');
+            svg.setAttribute('height', '24');
+            svg.setAttribute('data-lucide', name);
+            if (!svg.hasAttribute('aria-hidden')) {
+                svg.setAttribute('aria-hidden', 'true');
+            }
+
+            const use = document.createElementNS(SVG_NS, 'use');
+            use.setAttribute('href', spriteUrl + '#' + name);
+            svg.appendChild(use);
+
+            el.replaceWith(svg);
+        });
+    }
+
+    window.lucide = { createIcons: createIcons };
+})();
@@ -0,0 +1,176 @@
+"""
+Upload handler con validazione durante lo streaming.
+
+Con gli handler predefiniti Django salva l'intero corpo multipart (in
+memoria o in /tmp) prima che la view possa controllare dimensioni e tipo
+degli allegati. Per i campi dichiarati in UPLOAD_FIELDS questo handler:
+
+- rifiuta estensioni non permesse e dimensioni dichiarate troppo grandi
+  appena arriva l'intestazione della parte;
+- verifica i magic bytes sul primo chunk, prima di scrivere su disco;
+- conta i byte ricevuti e si ferma al superamento del limite per file
+  o, per gli allegati della prenotazione, del totale della richiesta;
+- scrive i file accettati in una directory di appoggio dentro lo storage
+  degli allegati, così il salvataggio del modello è un rename sullo
+  stesso filesystem e non una seconda copia;
+- calcola lo SHA-256 mentre scrive, per la deduplicazione
+  (sld_project/dedup_storage.py).
+
+Al primo errore l'upload viene interrotto (StopUpload) e il messaggio
+resta in request.upload_error, che le view controllano prima di usare i
+dati del form. Gli altri campi file passano agli handler successivi.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+
+from .dedup_storage import attachment_storage
+from .validators import SNIFF_SIZE, validate_attachment_file, validate_document_file
+
+logger = logging.getLogger(__name__)
+
+# Limite complessivo per richiesta (somma degli allegati)
+MAX_ATTACHMENTS_TOTAL_SIZE = 20 * 1024 * 1024
+
+# Campi file validati in streaming: nome campo -> validatore e limite totale
+# (None: solo il limite per file del validatore)
+UPLOAD_FIELDS = {
+    # Allegati della prenotazione (booking.views.CreateCheckoutSession)
+    'attachments': {
+        'validator': validate_attachment_file,
+        'max_total_size': MAX_ATTACHMENTS_TOTAL_SIZE,
+    },
+    # Documenti della domiciliazione (domiciliazioni.views.process_domiciliazione_form)
+    'documents': {
+        'validator': validate_document_file,
+        'max_total_size': None,
+    },
+}
+
+# Directory di appoggio (relativa allo storage degli allegati)
+STAGING_DIR = '.uploads'
+
+
+class StagedUploadedFile(UploadedFile):
+    """
+    Come TemporaryUploadedFile, ma nella directory di appoggio dello
+    storage di destinazione: FileSystemStorage lo sposta con un rename.
+    """
+
+    def __init__(self, name, content_type, size, charset, content_type_extra=None):
+        staging_dir = attachment_storage().path(STAGING_DIR)
+        os.makedirs(staging_dir, exist_ok=True)
+        _, ext = os.path.splitext(name)
+        file = tempfile.NamedTemporaryFile(suffix='.upload' + ext, dir=staging_dir)
+        super().__init__(file, name, content_type, size, charset, content_type_extra)
+
+    def temporary_file_path(self):
+        return self.file.name
+
+    def close(self):
+        try:
+            return self.file.close()
+        except FileNotFoundError:
+            # Già spostato nella destinazione finale
+            pass
+
+
+class StreamingValidationUploadHandler(FileUploadHandler):
+    """Valida i campi di UPLOAD_FIELDS mentre i dati arrivano."""
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.policy = None
+        self.total_size = 0
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None,
+                 content_type_extra=None):
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+        self.policy = UPLOAD_FIELDS.get(field_name)
+        # MultiPartParser chiude `handler.file` se esiste: solo dopo la verifica
+        if hasattr(self, 'file'):
+            del self.file
+        self.head = b''
+        self.extension = None
+        self.hasher = hashlib.sha256()
+        if self.policy is None:
+            return
+
+        validator = self.policy['validator']
+        try:
+            self.extension = validator.check_extension(file_name)
+            if content_length is not None:
+                validator.check_size(content_length)
+        except ValidationError as e:
+            self._reject(e.message)
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.policy is None:
+            return raw_data
+
+        self.total_size += len(raw_data)
+        try:
+            self.policy['validator'].check_size(start + len(raw_data))
+        except ValidationError as e:
+            self._reject(e.message)
+        max_total_size = self.policy['max_total_size']
+        if max_total_size is not None and self.total_size > max_total_size:
+            max_mb = max_total_size / (1024 * 1024)
+            self._reject(f"La dimensione totale degli allegati supera i {max_mb:.0f}MB", prefix=False)
+
+        if hasattr(self, 'file'):
+            self.file.write(raw_data)
+            self.hasher.update(raw_data)
+            return None
+
+        # Nulla su disco finché i primi byte non sono stati verificati
+        self.head += raw_data
+        if len(self.head) >= SNIFF_SIZE:
+            self._accept_head()
+        return None
+
+    def file_complete(self, file_size):
+        if self.policy is None:
+            return None
+        if not hasattr(self, 'file'):
+            self._accept_head()
+        self.file.seek(0)
+        self.file.size = file_size
+        self.file.sha256 = self.hasher.hexdigest()
+        return self.file
+
+    def upload_interrupted(self):
+        if hasattr(self, 'file'):
+            temp_location = self.file.temporary_file_path()
+            try:
+                self.file.close()
+                os.remove(temp_location)
+            except FileNotFoundError:
+                pass
+
+    def _accept_head(self):
+        try:
+            self.policy['validator'].check_content(self.extension, self.head[:SNIFF_SIZE])
+        except ValidationError as e:
+            self._reject(e.message)
+
+        self.file = StagedUploadedFile(
+            self.file_name, self.content_type, 0, self.charset, self.content_type_extra
+        )
+        self.file.write(self.head)
+        self.hasher.update(self.head)
+        self.head = b''
+
+    def _reject(self, message, prefix=True):
+        if prefix:
+            message = f'File "{self.file_name}": {message}'
+        logger.info(f"Upload rifiutato ({self.field_name}): {message}")
+        if self.request is not None:
+            self.request.upload_error = message
+        # Consuma il resto del corpo senza salvarlo, così la view può rispondere
+        raise StopUpload(connection_reset=False)
@@ -1,16 +1,18 @@
 from django.conf import settings
 from django.urls import include, path
 from django.contrib import admin
-from django.http import HttpResponse
 
 from wagtail.admin import urls as wagtailadmin_urls
 from wagtail import urls as wagtail_urls
 from wagtail.documents import urls as wagtaildocs_urls
-from wagtail.contrib.sitemaps.views import sitemap
 
 from search import views as search_views
 from django.views.generic import TemplateView
 from .views import privacy_view, terms_view, custom_404_view, custom_403_view, custom_500_view
+from .sitemaps import sitemap_index, sitemap_section
+from .wellknown import favicon_ico, robots_txt, security_txt
+from .protected_media import protected_media_view
+from .icons import icon_sprite_view
 
 # Custom error handlers
 handler403 = custom_403_view
@@ -18,35 +20,24 @@ handler404 = custom_404_view
 handler500 = custom_500_view
 
 
-def robots_txt(request):
-    """Genera robots.txt dinamicamente."""
-    # Ottieni il dominio corrente
-    protocol = 'https' if request.is_secure() else 'http'
-    host = request.get_host()
-    sitemap_url = f"{protocol}://{host}/sitemap.xml"
-    
-    lines = [
-        "User-agent: *",
-        "Allow: /",
-        "Disallow: /admin/",
-        "Disallow: /django-admin/",
-        "Disallow: /prenota/checkout/",
-        "",
-        f"Sitemap: {sitemap_url}",
-    ]
-    return HttpResponse("\n".join(lines), content_type="text/plain")
-
-
 urlpatterns = [
     path("django-admin/", admin.site.urls),
     path("admin/", include(wagtailadmin_urls)),
     path("documents/", include(wagtaildocs_urls)),
     path("search/", search_views.search, name="search"),
     path("prenota/", include("booking.urls")),
+    # Allegati privati: link firmati a scadenza (sld_project/protected_media.py)
+    path("allegati/<int:expires>/<str:signature>/<path:name>", protected_media_view, name="protected_media"),
     path("termini/", terms_view, name="terms"),
     path("privacy/", privacy_view, name="privacy"),
-    path("sitemap.xml", sitemap, name="sitemap"),
+    path("sitemap.xml", sitemap_index, name="sitemap"),
+    path("sitemap-<str:section>.xml", sitemap_section, name="sitemap_section"),
+    # Fallback Django: nginx serve i file generati per host (manage.py build_wellknown)
     path("robots.txt", robots_txt, name="robots_txt"),
+    path(".well-known/security.txt", security_txt, name="security_txt"),
+    path("favicon.ico", favicon_ico, name="favicon_ico"),
+    # Fallback Django: nginx serve lo sprite da ICON_SPRITE_DIR
+    path("icons/<str:filename>", icon_sprite_view, name="icon_sprite"),
 ]
 
 
@@ -1,6 +1,10 @@
 """
 Validatori condivisi per il progetto.
 """
+import os
+import struct
+import threading
+
 try:
     import magic
     MAGIC_AVAILABLE = True
@@ -45,6 +49,9 @@ MIME_TYPE_ALIASES = {
 # Dimensione massima file singolo (10MB)
 MAX_FILE_SIZE = 10 * 1024 * 1024
 
+# Byte letti all'inizio del file per la verifica del contenuto
+SNIFF_SIZE = 8192
+
 # Magic bytes per doppia verifica
 MAGIC_BYTES = {
     b'%PDF': 'application/pdf',
@@ -56,6 +63,117 @@ MAGIC_BYTES = {
 }
 
 
+# ═══════════════════════════════════════════════════════════════════════════
+# ARCHIVI ZIP
+# ═══════════════════════════════════════════════════════════════════════════
+
+# Formati basati su ZIP: per .zip si controllano anche le estensioni interne
+ZIP_EXTENSIONS = {'.zip', '.docx', '.xlsx', '.odt'}
+
+# Archivi che non possono comparire dentro un .zip (DOCX/ODT invece sì)
+NESTED_ARCHIVE_EXTENSIONS = {'.zip'}
+
+# Limiti sull'indice centrale (contro zip bomb e archivi anomali)
+ZIP_MAX_ENTRIES = 1000
+ZIP_MAX_UNCOMPRESSED_SIZE = 200 * 1024 * 1024
+ZIP_MAX_RATIO = 100
+# Sotto questa dimensione il rapporto di compressione non conta
+ZIP_RATIO_MIN_SIZE = 1024 * 1024
+
+_EOCD = struct.Struct('<4s4H2LH')
+_EOCD_SIGNATURE = b'PK\x05\x06'
+_CENTRAL_HEADER = struct.Struct('<4s6H3L5H2L')
+_CENTRAL_SIGNATURE = b'PK\x01\x02'
+_ZIP64_LIMIT = 0xFFFFFFFF
+
+
+def inspect_zip(file, allowed_extensions=None):
+    """
+    Controlla un archivio ZIP leggendo solo l'indice centrale.
+    
+    Cerca il record finale (End of Central Directory) negli ultimi 64KB,
+    poi scorre una voce alla volta: memoria costante, nessuna
+    decompressione. Verifica numero di voci, dimensione totale
+    decompressa, rapporto di compressione e, se `allowed_extensions` è
+    indicato, le estensioni dei file contenuti (archivi .zip annidati
+    esclusi; documenti DOCX/ODT ammessi).
+    """
+    size = file.size
+    tail_size = min(size, _EOCD.size + 0xFFFF)
+    file.seek(size - tail_size)
+    tail = file.read(tail_size)
+    position = tail.rfind(_EOCD_SIGNATURE)
+    if position < 0 or len(tail) - position < _EOCD.size:
+        raise ValidationError("Archivio ZIP non valido o danneggiato.")
+    
+    (_sig, disk, cd_disk, _disk_entries, entries, cd_size, cd_offset,
+     _comment) = _EOCD.unpack_from(tail, position)
+    if disk or cd_disk:
+        raise ValidationError("Gli archivi ZIP divisi in più parti non sono ammessi.")
+    if entries == 0xFFFF or cd_size == _ZIP64_LIMIT or cd_offset == _ZIP64_LIMIT:
+        raise ValidationError("Archivio ZIP troppo grande (formato ZIP64).")
+    if entries > ZIP_MAX_ENTRIES:
+        raise ValidationError(f"L'archivio contiene troppi file (massimo {ZIP_MAX_ENTRIES}).")
+    if cd_offset + cd_size > size - tail_size + position:
+        raise ValidationError("Archivio ZIP non valido o danneggiato.")
+    
+    total_uncompressed = 0
+    total_compressed = 0
+    file.seek(cd_offset)
+    for _ in range(entries):
+        header = file.read(_CENTRAL_HEADER.size)
+        if len(header) < _CENTRAL_HEADER.size:
+            raise ValidationError("Archivio ZIP non valido o danneggiato.")
+        fields = _CENTRAL_HEADER.unpack(header)
+        (signature, _made, _needed, flags, _method, _time, _date, _crc,
+         compressed, uncompressed, name_len, extra_len, comment_len) = fields[:13]
+        if signature != _CENTRAL_SIGNATURE:
+            raise ValidationError("Archivio ZIP non valido o danneggiato.")
+        name = file.read(name_len).decode('utf-8' if flags & 0x800 else 'cp437', errors='replace')
+        file.seek(extra_len + comment_len, os.SEEK_CUR)
+        
+        if compressed == _ZIP64_LIMIT or uncompressed == _ZIP64_LIMIT:
+            raise ValidationError("Archivio ZIP troppo grande (formato ZIP64).")
+        total_compressed += compressed
+        total_uncompressed += uncompressed
+        if total_uncompressed > ZIP_MAX_UNCOMPRESSED_SIZE:
+            max_mb = ZIP_MAX_UNCOMPRESSED_SIZE / (1024 * 1024)
+            raise ValidationError(
+                f"Il contenuto dell'archivio supera i {max_mb:.0f}MB una volta estratto."
+            )
+        if uncompressed > ZIP_RATIO_MIN_SIZE and uncompressed > compressed * ZIP_MAX_RATIO:
+            raise ValidationError(f"Rapporto di compressione sospetto per \"{name}\".")
+        
+        if allowed_extensions is not None and not name.endswith('/'):
+            inner = name.lower()
+            if (name.startswith('/') or '..' in name.replace('\\', '/').split('/')
+                    or not any(inner.endswith(e) for e in allowed_extensions if e not in NESTED_ARCHIVE_EXTENSIONS)):
+                raise ValidationError(f"File non permesso nell'archivio: \"{name}\".")
+    
+    # Voci sovrapposte (zip bomb senza ricorsione): i dati compressi
+    # dichiarati non possono superare lo spazio prima dell'indice
+    if total_compressed > cd_offset:
+        raise ValidationError("Archivio ZIP non valido o danneggiato.")
+    file.seek(0)
+
+
+_magic_local = threading.local()
+
+
+def detect_mime(file_head):
+    """
+    MIME type rilevato da libmagic.
+    
+    magic.from_buffer usa un'istanza condivisa protetta da un lock: con
+    un'istanza per thread le verifiche in parallelo (sld_project/attachments.py)
+    non si serializzano, e libmagic rilascia il GIL durante l'analisi.
+    """
+    detector = getattr(_magic_local, 'detector', None)
+    if detector is None:
+        detector = _magic_local.detector = magic.Magic(mime=True)
+    return detector.from_buffer(file_head)
+
+
 @deconstructible
 class FileValidator:
     """
@@ -64,6 +182,7 @@ class FileValidator:
     2. MIME type reale tramite libmagic
     3. Dimensione massima
     4. Magic bytes per doppia verifica
+    5. Indice centrale degli archivi ZIP (vedi inspect_zip)
     """
     
     def __init__(self, allowed_extensions=None, max_size=None):
@@ -72,26 +191,48 @@ class FileValidator:
     
     def __call__(self, file):
         # 1. Verifica dimensione
-        if file.size > self.max_size:
+        self.check_size(file.size)
+        
+        # 2. Verifica estensione
+        ext = self.check_extension(file.name)
+        
+        # 3-4. Verifica contenuto sui primi 8KB
+        file.seek(0)
+        file_head = file.read(SNIFF_SIZE)
+        file.seek(0)  # Reset posizione
+        self.check_content(ext, file_head)
+        
+        # 5. Archivi ZIP (anche DOCX/ODT): indice centrale, senza estrarre
+        if ext in ZIP_EXTENSIONS:
+            inspect_zip(file, self.allowed_extensions if ext == '.zip' else None)
+    
+    def check_size(self, size):
+        """Errore se `size` supera la dimensione massima."""
+        if size > self.max_size:
             max_mb = self.max_size / (1024 * 1024)
             raise ValidationError(
                 f"Il file è troppo grande. Dimensione massima: {max_mb:.0f}MB"
             )
-        
-        # 2. Verifica estensione
-        filename = file.name.lower()
-        ext = None
+    
+    def check_extension(self, name):
+        """Estensione permessa del file (errore se non è in whitelist)."""
+        filename = name.lower()
         for allowed_ext in self.allowed_extensions.keys():
             if filename.endswith(allowed_ext):
-                ext = allowed_ext
-                break
+                return allowed_ext
         
-        if not ext:
-            allowed_list = ', '.join(self.allowed_extensions.keys())
-            raise ValidationError(
-                f"Tipo di file non permesso. Estensioni consentite: {allowed_list}"
-            )
+        allowed_list = ', '.join(self.allowed_extensions.keys())
+        raise ValidationError(
+            f"Tipo di file non permesso. Estensioni consentite: {allowed_list}"
+        )
+    
+    def check_content(self, ext, file_head):
+        """
+        Verifica i primi byte del file rispetto all'estensione.
         
+        Usata anche durante lo streaming dell'upload (sld_project/uploads.py),
+        dove è disponibile solo il primo chunk.
+        """
         # 3. Verifica MIME type reale con libmagic (se disponibile)
         if not MAGIC_AVAILABLE:
             # Se magic non è installato, verifica solo estensione
@@ -100,14 +241,9 @@ class FileValidator:
         
         expected_mime = self.allowed_extensions[ext]
         
-        # Leggi i primi byte per la verifica
-        file.seek(0)
-        file_head = file.read(8192)  # Leggi i primi 8KB per magic
-        file.seek(0)  # Reset posizione
-        
         try:
             # Usa python-magic per rilevare il tipo reale
-            detected_mime = magic.from_buffer(file_head, mime=True)
+            detected_mime = detect_mime(file_head)
         except Exception:
             # Se magic fallisce, usa solo verifica estensione
             return
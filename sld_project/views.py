@@ -3,8 +3,23 @@ Views per le pagine legali (Privacy Policy e Termini e Condizioni).
 Il contenuto viene caricato dal database (SiteSettings).
 """
 import re
+from django.core.cache import cache
+from django.http import HttpResponseNotFound
 from django.shortcuts import render
+from django.views.decorators.http import condition
+from .cache_policy import SCOPE_CONTENT, SCOPE_SETTINGS, get_version, make_etag
 from .models import SiteSettings
+from .notfound import is_obvious_non_page, minimal_not_found, record_404
+
+# Variabili sostituibili nei testi legali, riconosciute in un solo passaggio
+LEGAL_VARIABLE_RE = re.compile(r"\{\{(studio_name|lawyer_name|address|city|email|email_pec|phone)\}\}")
+
+LEGAL_CONTENT_KEY = "legal_page:{field}:{version}"
+LEGAL_CONTENT_TIMEOUT = 60 * 60 * 24
+
+# Pagina 404 renderizzata, per host e versione del contenuto
+NOT_FOUND_KEY = "notfound_page:{scheme}:{host}:{version}"
+NOT_FOUND_TIMEOUT = 60 * 60 * 24
 
 
 def _substitute_variables(content: str, settings: SiteSettings) -> str:
@@ -23,25 +38,48 @@ def _substitute_variables(content: str, settings: SiteSettings) -> str:
         return ""
     
     substitutions = {
-        "{{studio_name}}": settings.studio_name or "Studio Legale",
-        "{{lawyer_name}}": settings.lawyer_name or "",
-        "{{address}}": settings.address or "",
-        "{{city}}": settings.city or "",
-        "{{email}}": settings.email or "",
-        "{{email_pec}}": settings.email_pec or "",
-        "{{phone}}": settings.phone or "",
+        "studio_name": settings.studio_name or "Studio Legale",
+        "lawyer_name": settings.lawyer_name or "",
+        "address": settings.address or "",
+        "city": settings.city or "",
+        "email": settings.email or "",
+        "email_pec": settings.email_pec or "",
+        "phone": settings.phone or "",
     }
     
-    for var, value in substitutions.items():
-        content = content.replace(var, value)
-    
+    return LEGAL_VARIABLE_RE.sub(lambda match: substitutions[match.group(1)], content)
+
+
+def _legal_content(field: str) -> str:
+    """
+    Testo legale con le variabili già sostituite.
+    Calcolato una sola volta per versione di SiteSettings e tenuto in cache.
+    """
+    key = LEGAL_CONTENT_KEY.format(field=field, version=get_version(SCOPE_SETTINGS))
+    content = cache.get(key)
+    if content is None:
+        settings = SiteSettings.get_current()
+        content = _substitute_variables(getattr(settings, field), settings)
+        cache.set(key, content, LEGAL_CONTENT_TIMEOUT)
     return content
 
 
+def _legal_etag(request, *args, **kwargs):
+    """
+    ETag delle pagine legali: cambia con SiteSettings, con il resto del sito
+    (menu, footer) e, come in CachePolicyMiddleware, con host e deploy.
+
+    Con sessione (userbar Wagtail) la pagina dipende dall'utente: nessun ETag.
+    """
+    if getattr(request, 'has_session_cookie', True):
+        return None
+    return make_etag(request, f"{get_version(SCOPE_SETTINGS)}-{get_version(SCOPE_CONTENT)}")
+
+
+@condition(etag_func=_legal_etag)
 def privacy_view(request):
     """View per la Privacy Policy."""
-    settings = SiteSettings.get_current()
-    content = _substitute_variables(settings.privacy_policy, settings)
+    content = _legal_content("privacy_policy")
     
     return render(request, "pages/legal_page.html", {
         "page_title": "Privacy Policy",
@@ -50,10 +88,10 @@ def privacy_view(request):
     })
 
 
+@condition(etag_func=_legal_etag)
 def terms_view(request):
     """View per i Termini e Condizioni."""
-    settings = SiteSettings.get_current()
-    content = _substitute_variables(settings.terms_conditions, settings)
+    content = _legal_content("terms_conditions")
     
     return render(request, "pages/legal_page.html", {
         "page_title": "Condizioni Generali di Contratto",
@@ -66,7 +104,36 @@ def custom_404_view(request, exception=None):
     """
     View personalizzata per la pagina 404.
     Include le aree di attività e gli articoli recenti.
+
+    I percorsi che non possono essere pagine ricevono una risposta minima;
+    per gli altri la pagina viene renderizzata una volta per versione del
+    contenuto (aree di attività, articoli, ...) e servita dalla cache.
     """
+    if is_obvious_non_page(request.path_info):
+        record_404('fast')
+        return minimal_not_found()
+
+    # Con sessione (userbar Wagtail) la pagina dipende dall'utente
+    use_cache = not getattr(request, 'has_session_cookie', True)
+    key = NOT_FOUND_KEY.format(
+        scheme=request.scheme,
+        host=request.get_host(),
+        version=get_version(SCOPE_CONTENT),
+    )
+    if use_cache:
+        content = cache.get(key)
+        if content is not None:
+            record_404('cached')
+            return HttpResponseNotFound(content)
+
+    record_404('rendered')
+    response = _render_404(request)
+    if use_cache:
+        cache.set(key, response.content, NOT_FOUND_TIMEOUT)
+    return response
+
+
+def _render_404(request):
     from services.models import ServiceArea
     
     # Recupera le aree di attività
@@ -0,0 +1,25 @@
+"""
+Wagtail hooks a livello di progetto.
+"""
+from wagtail import hooks
+
+from .icons import ensure_icon
+
+
+def _refresh_icon_sprite(request, instance):
+    """Rigenera lo sprite icone se l'admin ha scelto un'icona non ancora inclusa."""
+    from services.models import ServiceArea
+    from articles.models import ArticleCategory
+
+    if isinstance(instance, (ServiceArea, ArticleCategory)):
+        ensure_icon(instance.icon)
+
+
+@hooks.register('after_create_snippet')
+def refresh_icon_sprite_after_create(request, instance):
+    _refresh_icon_sprite(request, instance)
+
+
+@hooks.register('after_edit_snippet')
+def refresh_icon_sprite_after_edit(request, instance):
+    _refresh_icon_sprite(request, instance)
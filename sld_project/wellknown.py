@@ -0,0 +1,190 @@
+"""
+robots.txt, security.txt e favicon per host.
+
+Per ogni host configurato (hostname dei Site Wagtail e ALLOWED_HOSTS
+espliciti) vengono scritti in WELLKNOWN_ROOT/<host>/:
+- robots.txt
+- favicon.ico (copia della favicon di SiteSettings, se non è SVG)
+
+nginx li serve direttamente con header di cache (vedi nginx.conf) e passa
+a Django solo per gli host sconosciuti o i file mancanti: le view qui sotto
+restano come fallback e generano lo stesso contenuto al volo.
+
+security.txt invece è sempre generato da Django: il campo Expires
+(RFC 9116) deve restare nel futuro anche se il sito non viene toccato
+per mesi, cosa che un file scritto al deploy non garantisce.
+
+I file vengono generati al deploy (`manage.py build_wellknown`) e
+rigenerati al salvataggio di SiteSettings o dei Site, se la directory
+esiste già (vedi sld_project/signals.py).
+"""
+import logging
+import os
+import re
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponsePermanentRedirect
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Solo hostname validi: il nome diventa una directory
+HOSTNAME_RE = re.compile(r'^[a-z0-9]([a-z0-9-]*[a-z0-9])?(\.[a-z0-9]([a-z0-9-]*[a-z0-9])?)*$')
+
+ROBOTS_DISALLOW = [
+    "/admin/",
+    "/django-admin/",
+    "/prenota/checkout/",
+]
+
+# Validità dichiarata in security.txt (RFC 9116 raccomanda meno di un anno)
+SECURITY_TXT_VALIDITY = timedelta(days=180)
+
+FAVICON_MAX_AGE = 60 * 60 * 24
+
+
+def get_wellknown_root():
+    return getattr(settings, 'WELLKNOWN_ROOT', os.path.join(settings.BASE_DIR, 'wellknown'))
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CONTENUTI
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def build_robots_txt(base_url):
+    """Contenuto di robots.txt per l'URL base indicato (es. https://example.com)."""
+    lines = ["User-agent: *", "Allow: /"]
+    lines += [f"Disallow: {path}" for path in ROBOTS_DISALLOW]
+    lines += ["", f"Sitemap: {base_url}/sitemap.xml"]
+    return "\n".join(lines)
+
+
+def build_security_txt(base_url, site_settings, now=None):
+    """Contenuto di security.txt (RFC 9116) con i contatti dello studio."""
+    # Arrotondato al giorno: il contenuto (e il suo ETag) cambia una volta al giorno
+    today = (now or timezone.now()).astimezone(dt_timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    expires = today + SECURITY_TXT_VALIDITY
+    lines = []
+    if site_settings.email:
+        lines.append(f"Contact: mailto:{site_settings.email}")
+    if site_settings.email_pec:
+        lines.append(f"Contact: mailto:{site_settings.email_pec}")
+    lines += [
+        f"Expires: {expires.strftime('%Y-%m-%dT%H:%M:%SZ')}",
+        "Preferred-Languages: it, en",
+        f"Canonical: {base_url}/.well-known/security.txt",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def _default_scheme():
+    return 'https' if getattr(settings, 'SECURE_SSL_REDIRECT', False) else 'http'
+
+
+def configured_hosts():
+    """Hostname per cui generare i file: Site Wagtail + ALLOWED_HOSTS espliciti."""
+    from wagtail.models import Site
+
+    hosts = set(Site.objects.values_list('hostname', flat=True))
+    hosts.update(settings.ALLOWED_HOSTS)
+    return sorted(host.lower() for host in hosts if host and HOSTNAME_RE.match(host.lower()))
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# GENERAZIONE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _write(path, data):
+    """Scrittura atomica: nginx non legge mai un file a metà."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as fh:
+        fh.write(data)
+    os.replace(tmp_path, path)
+
+
+def _favicon_bytes(site_settings):
+    """Contenuto della favicon da copiare come favicon.ico (None se assente o SVG)."""
+    image = site_settings.favicon
+    if not image or image.file.name.lower().endswith('.svg'):
+        return None
+    try:
+        with image.file.open('rb') as fh:
+            return fh.read()
+    except OSError as e:
+        logger.warning(f"Favicon non leggibile: {e}")
+        return None
+
+
+def write_wellknown_files(hosts=None):
+    """
+    Genera i file per gli host indicati (default: tutti quelli configurati).
+
+    Returns:
+        Lista degli host generati
+    """
+    from .models import SiteSettings
+
+    hosts = configured_hosts() if hosts is None else hosts
+    site_settings = SiteSettings.get_current()
+    favicon = _favicon_bytes(site_settings)
+    scheme = _default_scheme()
+    root = get_wellknown_root()
+
+    for host in hosts:
+        host_dir = os.path.join(root, host)
+        base_url = f"{scheme}://{host}"
+        _write(os.path.join(host_dir, 'robots.txt'), build_robots_txt(base_url).encode('utf-8'))
+        favicon_path = os.path.join(host_dir, 'favicon.ico')
+        if favicon:
+            _write(favicon_path, favicon)
+        elif os.path.exists(favicon_path):
+            os.remove(favicon_path)
+
+    logger.info(f"File well-known generati per: {', '.join(hosts) or 'nessun host'}")
+    return hosts
+
+
+def refresh_wellknown_files():
+    """Rigenera i file solo se sono già stati generati al deploy."""
+    if not os.path.isdir(get_wellknown_root()):
+        return
+    try:
+        write_wellknown_files()
+    except Exception as e:
+        logger.error(f"Errore rigenerazione file well-known: {e}")
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# VIEW DI FALLBACK
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _request_base_url(request):
+    protocol = 'https' if request.is_secure() else 'http'
+    return f"{protocol}://{request.get_host()}"
+
+
+def robots_txt(request):
+    """Genera robots.txt dinamicamente (host non generati al deploy)."""
+    return HttpResponse(build_robots_txt(_request_base_url(request)), content_type="text/plain")
+
+
+def security_txt(request):
+    """Genera security.txt (sempre dinamico, vedi docstring del modulo)."""
+    from .models import SiteSettings
+
+    content = build_security_txt(_request_base_url(request), SiteSettings.get_current())
+    return HttpResponse(content, content_type="text/plain; charset=utf-8")
+
+
+def favicon_ico(request):
+    """Reindirizza /favicon.ico alla favicon configurata in SiteSettings."""
+    from .models import SiteSettings
+
+    image = SiteSettings.get_current().favicon
+    if not image:
+        raise Http404("Favicon non configurata")
+    response = HttpResponsePermanentRedirect(image.file.url)
+    response['Cache-Control'] = f'public, max-age={FAVICON_MAX_AGE}'
+    return response
@@ -0,0 +1,66 @@
+"""
+Test sul numero di query degli elenchi appuntamenti in admin.
+"""
+from datetime import date, time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from booking.models import Appointment, AppointmentAttachment
+
+
+class AppointmentListQueriesTest(TestCase):
+
+    def setUp(self):
+        user = get_user_model().objects.create_superuser(username='admin', email='admin@example.com', password='x')
+        self.client.force_login(user)
+
+    def _create(self, count):
+        start = Appointment.objects.count()
+        appointments = Appointment.objects.bulk_create([
+            Appointment(
+                first_name="Cliente", last_name=f"N{start + i}", email="cliente@example.com",
+                phone="+39 333 1234567", notes="",
+                date=date(2026, 1, 1) + timedelta(days=start + i), time=time(10, 0),
+            )
+            for i in range(count)
+        ])
+        AppointmentAttachment.objects.bulk_create([
+            AppointmentAttachment(
+                appointment=appointment, file=f'appointments/{appointment.pk}/doc_{n}.pdf',
+                original_filename=f'doc_{n}.pdf', preview_status='unsupported',
+            )
+            for appointment in appointments for n in range(2)
+        ])
+
+    def _queries(self, url):
+        # La prima richiesta crea SiteSettings e riempie le cache
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def test_wagtail_list_constant_queries(self):
+        url = reverse('wagtailsnippets_booking_appointment:list')
+        self._create(5)
+        few, _ = self._queries(url)
+        self._create(95)
+        many, response = self._queries(url)
+
+        self.assertEqual(many, few)
+        self.assertContains(response, '✓ 2')
+
+    def test_django_admin_constant_queries(self):
+        url = reverse('admin:booking_appointment_changelist')
+        self._create(5)
+        few, _ = self._queries(url)
+        self._create(95)
+        many, response = self._queries(url)
+
+        self.assertEqual(many, few)
+        self.assertEqual(len(response.context['cl'].result_list), 100)
+        self.assertContains(response, '✓ 2', count=100)
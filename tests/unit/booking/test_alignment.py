@@ -0,0 +1,170 @@
+"""
+Test per la verifica di allineamento con Google Calendar.
+"""
+from datetime import date, datetime, time, timedelta
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from booking.alignment import (
+    REFRESH_TIMEOUT, align_appointments, process_pending_refresh, refresh_state, start_refresh,
+)
+from booking.models import Appointment, GoogleCalendarEvent, GoogleCalendarRefresh
+
+
+def aware(day, hour):
+    return timezone.make_aware(datetime.combine(day, hour))
+
+
+def event(day, hour):
+    return SimpleNamespace(start_datetime=aware(day, hour))
+
+
+class AlignAppointmentsTest(TestCase):
+    day = date(2026, 11, 10)
+
+    def _align(self, appointment_times, events):
+        appointments = [(f'appt-{hour}', aware(self.day, hour)) for hour in appointment_times]
+        return [item['google_event'] for item in align_appointments(appointments, events)]
+
+    def test_tolerance_edges(self):
+        inside = event(self.day, time(10, 4, 59))
+        outside = event(self.day, time(11, 5))
+        self.assertEqual(self._align([time(10, 0), time(11, 0)], [inside, outside]), [inside, None])
+        self.assertEqual(self._align([time(10, 0)], [event(self.day, time(9, 55))]), [None])
+
+    def test_first_event_in_window(self):
+        early, late = event(self.day, time(9, 57)), event(self.day, time(10, 3))
+        self.assertEqual(self._align([time(10, 0)], [early, late]), [early])
+
+    def test_same_event_for_overlapping_appointments(self):
+        shared = event(self.day, time(10, 0))
+        self.assertEqual(self._align([time(10, 0), time(10, 0)], [shared]), [shared, shared])
+
+    def test_matches_naive_scan(self):
+        events = [event(self.day, time(hour, minute)) for hour in range(8, 18) for minute in (0, 7, 33)]
+        appointment_times = [time(hour, minute) for hour in range(7, 19) for minute in (0, 5, 30, 55)]
+
+        def naive(appt_time):
+            appt_datetime = aware(self.day, appt_time)
+            return next(
+                (e for e in events if abs((e.start_datetime - appt_datetime).total_seconds()) < 300), None
+            )
+
+        self.assertEqual(self._align(appointment_times, events), [naive(t) for t in appointment_times])
+
+    def test_empty(self):
+        self.assertEqual(self._align([time(10, 0)], []), [None])
+        self.assertEqual(self._align([], [event(self.day, time(10, 0))]), [])
+
+
+class RefreshTest(TestCase):
+
+    def test_start_queues_once(self):
+        self.assertIsNone(refresh_state())
+        self.assertTrue(start_refresh())
+        self.assertFalse(start_refresh())
+        self.assertEqual(GoogleCalendarRefresh.objects.count(), 1)
+        self.assertEqual(refresh_state()['status'], 'running')
+        self.assertEqual(refresh_state()['phase'], 'queued')
+
+    def test_single_pending_enforced_by_database(self):
+        GoogleCalendarRefresh.objects.create()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            GoogleCalendarRefresh.objects.create()
+
+    def test_worker_reports_progress(self):
+        phases = []
+
+        def sync(force, progress):
+            self.assertTrue(force)
+            progress('save', 1, 2)
+            phases.append(refresh_state()['phase'])
+
+        start_refresh()
+        with mock.patch('booking.google_calendar.sync_google_calendar_events', side_effect=sync):
+            self.assertTrue(process_pending_refresh())
+        self.assertEqual(phases, ['save'])
+        self.assertEqual(refresh_state()['status'], 'done')
+        self.assertFalse(process_pending_refresh())
+        # Terminato: se ne può richiedere un altro
+        self.assertTrue(start_refresh())
+
+    def test_refresh_error(self):
+        start_refresh()
+        with mock.patch('booking.google_calendar.sync_google_calendar_events', side_effect=RuntimeError('timeout')):
+            process_pending_refresh()
+        self.assertEqual(refresh_state()['status'], 'error')
+        self.assertEqual(refresh_state()['error'], 'timeout')
+
+    def test_interrupted_worker_expires(self):
+        start_refresh()
+        GoogleCalendarRefresh.objects.update(
+            status=GoogleCalendarRefresh.STATUS_RUNNING,
+            updated_at=timezone.now() - timedelta(seconds=REFRESH_TIMEOUT + 1),
+        )
+        self.assertEqual(refresh_state()['status'], 'error')
+        self.assertTrue(start_refresh())
+
+    def test_worker_command_runs_refresh(self):
+        start_refresh()
+        out = StringIO()
+        with mock.patch('booking.google_calendar.sync_google_calendar_events') as sync:
+            call_command('process_document_previews', stdout=out)
+        sync.assert_called_once()
+        self.assertIn('Aggiornamento da Google Calendar eseguito', out.getvalue())
+        self.assertEqual(refresh_state()['status'], 'done')
+
+
+class AlignmentViewsTest(TestCase):
+
+    def setUp(self):
+        user = get_user_model().objects.create_superuser(username='admin', email='admin@example.com', password='x')
+        self.client.force_login(user)
+
+        day = timezone.localdate() + timedelta(days=3)
+        self.aligned = Appointment.objects.create(
+            first_name="Mario", last_name="Rossi", email="mario@example.com", phone="+39 333 1234567",
+            notes="", date=day, time=time(10, 0), status='confirmed',
+        )
+        Appointment.objects.create(
+            first_name="Anna", last_name="Verdi", email="anna@example.com", phone="+39 333 7654321",
+            notes="", date=day, time=time(12, 0), status='confirmed',
+        )
+        GoogleCalendarEvent.objects.create(
+            google_uid='evento-1', summary="App Rossi",
+            start_datetime=aware(day, time(10, 2)), end_datetime=aware(day, time(10, 30)),
+            synced_at=timezone.now(),
+        )
+
+    def test_page_does_not_sync(self):
+        with mock.patch('booking.google_calendar.sync_google_calendar_events') as sync:
+            response = self.client.get(reverse('booking_alignment_check'))
+        sync.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['aligned_count'], 1)
+        self.assertEqual(response.context['orphan_count'], 1)
+        self.assertEqual(response.context['total_google'], 1)
+        self.assertEqual(response.context['alignment_info'][0]['appointment'], self.aligned)
+        self.assertContains(response, reverse('booking_alignment_refresh'))
+
+    def test_refresh_endpoints(self):
+        url = reverse('booking_alignment_refresh')
+        self.assertEqual(self.client.get(url).json(), {'status': 'idle'})
+
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(self.client.post(url).status_code, 409)
+        self.assertEqual(self.client.get(url).json()['status'], 'running')
+
+        # Il worker esegue l'aggiornamento in coda
+        with mock.patch('booking.google_calendar.sync_google_calendar_events'):
+            process_pending_refresh()
+        self.assertEqual(self.client.get(url).json()['status'], 'done')
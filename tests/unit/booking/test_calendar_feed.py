@@ -0,0 +1,135 @@
+"""
+Test per il feed JSON del calendario admin.
+"""
+from datetime import date, datetime, time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from booking.calendar_feed import cached_calendar_events, calendar_events
+from booking.models import Appointment, GoogleCalendarEvent
+from domiciliazioni.models import DomiciliazioniSubmission, get_tribunale_choices
+
+
+def aware(day, hour):
+    return timezone.make_aware(datetime.combine(day, hour))
+
+
+class CalendarFeedTestBase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        # Crea SiteSettings (la creazione cambia la versione delle impostazioni)
+        get_tribunale_choices()
+        self.start = aware(date(2026, 3, 1), time(0, 0))
+        self.end = aware(date(2026, 4, 1), time(0, 0))
+
+        self.appointment = Appointment.objects.create(
+            first_name="Mario", last_name="Rossi", email="mario@example.com", phone="+39 333 1234567",
+            notes="", date=date(2026, 3, 10), time=time(10, 0), slot_count=3, status='confirmed',
+        )
+        Appointment.objects.create(
+            first_name="Anna", last_name="Verdi", email="anna@example.com", phone="+39 333 7654321",
+            notes="", date=date(2026, 3, 11), time=time(9, 0), status='cancelled',
+        )
+        Appointment.objects.create(
+            first_name="Luca", last_name="Neri", email="luca@example.com", phone="+39 333 0000000",
+            notes="", date=date(2026, 4, 1), time=time(9, 0), status='pending',
+        )
+        GoogleCalendarEvent.objects.create(
+            google_uid='evento-1', summary="App Bianchi",
+            start_datetime=aware(date(2026, 3, 12), time(15, 0)),
+            end_datetime=aware(date(2026, 3, 12), time(15, 30)),
+            synced_at=timezone.now(),
+        )
+        self.hearing = DomiciliazioniSubmission.objects.create(
+            nome_avvocato="Avv. Gialli", email="gialli@example.com", tribunale="roma",
+            numero_rg="1234/2026", data_udienza=date(2026, 3, 20), ora_udienza=time(9, 30),
+        )
+        DomiciliazioniSubmission.objects.create(
+            nome_avvocato="Avv. Gialli", email="gialli@example.com", tribunale="tar",
+            numero_rg="55/2026", data_udienza=date(2026, 3, 21),
+        )
+
+
+class CalendarEventsTest(CalendarFeedTestBase):
+
+    def _events(self):
+        return {event['id']: event for event in calendar_events(self.start, self.end)}
+
+    def test_events_in_range(self):
+        events = self._events()
+        self.assertEqual(len(events), 4)
+        self.assertEqual(
+            {event['eventType'] for event in events.values()},
+            {'booking', 'google', 'hearing'},
+        )
+
+    def test_duration_from_slot_count(self):
+        event = self._events()[f'booking-{self.appointment.pk}']
+        self.assertEqual(event['start'], aware(date(2026, 3, 10), time(10, 0)).isoformat())
+        self.assertEqual(event['end'], aware(date(2026, 3, 10), time(11, 30)).isoformat())
+        self.assertEqual(event['url'], reverse('wagtailsnippets_booking_appointment:edit', args=[self.appointment.pk]))
+
+    def test_hearings(self):
+        hearings = [event for event in self._events().values() if event['eventType'] == 'hearing']
+        timed, all_day = sorted(hearings, key=lambda event: event['start'])
+        self.assertEqual(timed['title'], "Udienza 1234/2026 - Tribunale di Roma")
+        self.assertEqual(timed['end'], aware(date(2026, 3, 20), time(10, 30)).isoformat())
+        self.assertTrue(all_day['allDay'])
+        self.assertEqual(all_day['start'], '2026-03-21')
+
+    def test_cached_until_data_changes(self):
+        first = cached_calendar_events(self.start, self.end)
+        with self.assertNumQueries(0):
+            self.assertEqual(cached_calendar_events(self.start, self.end), first)
+
+        self.appointment.slot_count = 1
+        self.appointment.save()
+        event = next(e for e in cached_calendar_events(self.start, self.end) if e['id'] == f'booking-{self.appointment.pk}')
+        self.assertEqual(event['end'], aware(date(2026, 3, 10), time(10, 30)).isoformat())
+
+    def test_hearing_change_invalidates(self):
+        cached_calendar_events(self.start, self.end)
+        self.hearing.status = 'cancelled'
+        self.hearing.save()
+        self.assertEqual(len(cached_calendar_events(self.start, self.end)), 3)
+
+
+class CalendarViewsTest(CalendarFeedTestBase):
+
+    def setUp(self):
+        super().setUp()
+        user = get_user_model().objects.create_superuser(username='admin', email='admin@example.com', password='x')
+        self.client.force_login(user)
+        self.url = reverse('booking_calendar_events')
+
+    def test_feed(self):
+        response = self.client.get(self.url, {
+            'start': '2026-03-01T00:00:00+01:00', 'end': '2026-04-01T00:00:00+02:00',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 4)
+
+    def test_invalid_range(self):
+        for params in ({}, {'start': 'ieri', 'end': '2026-04-01'}, {'start': '2026-04-01', 'end': '2026-03-01'}):
+            self.assertEqual(self.client.get(self.url, params).status_code, 400)
+
+    def test_range_too_large(self):
+        response = self.client.get(self.url, {'start': '2026-01-01', 'end': '2026-12-31'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_requires_admin(self):
+        self.client.logout()
+        response = self.client.get(self.url, {'start': '2026-03-01', 'end': '2026-04-01'})
+        self.assertNotEqual(response.status_code, 200)
+
+    def test_calendar_page_uses_feed(self):
+        response = self.client.get(reverse('booking_calendar'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, self.url)
+        self.assertNotIn('calendar_events_json', response.context)
@@ -0,0 +1,39 @@
+"""
+Test per la mappa Leaflet con caricamento differito.
+"""
+from django.test import TestCase, Client
+
+from sld_project.tests import setup_wagtail_home
+
+
+class LazyMapTest(TestCase):
+    """Leaflet deve essere self-hosted e caricato solo dalle pagine con mappa."""
+
+    def setUp(self):
+        from contact.models import ContactPage
+
+        self.client = Client()
+        self.home = setup_wagtail_home()
+        self.home.add_child(instance=ContactPage(title="Contatti", slug="contatti"))
+
+    def test_leaflet_not_loaded_on_pages_without_map(self):
+        response = self.client.get('/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'leaflet')
+        self.assertNotContains(response, 'unpkg.com')
+
+    def test_contact_page_renders_lazy_placeholder(self):
+        response = self.client.get('/contatti/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'data-lazy-map')
+        self.assertContains(response, 'js/lazy-map.js')
+        self.assertContains(response, 'data-leaflet-js="/static/vendor/leaflet/leaflet.js"')
+        # Nessun caricamento immediato di Leaflet
+        self.assertNotContains(response, '<script src="/static/vendor/leaflet/leaflet.js"')
+        self.assertNotContains(response, 'unpkg.com')
+
+    def test_placeholder_uses_default_coordinates(self):
+        """Senza coordinate in SiteSettings viene usato il fallback (Roma)."""
+        response = self.client.get('/contatti/')
+        self.assertContains(response, 'data-lat="41.902782"')
+        self.assertContains(response, 'data-lng="12.496366"')
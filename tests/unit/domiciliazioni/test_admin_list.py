@@ -0,0 +1,65 @@
+"""
+Test sul numero di query degli elenchi richieste in admin.
+"""
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from domiciliazioni.models import DomiciliazioniDocument, DomiciliazioniSubmission
+
+
+class SubmissionListQueriesTest(TestCase):
+
+    def setUp(self):
+        user = get_user_model().objects.create_superuser(username='admin', email='admin@example.com', password='x')
+        self.client.force_login(user)
+
+    def _create(self, count):
+        start = DomiciliazioniSubmission.objects.count()
+        submissions = DomiciliazioniSubmission.objects.bulk_create([
+            DomiciliazioniSubmission(
+                nome_avvocato=f"Avv. N{start + i}", email="avvocato@example.com", tribunale="roma",
+                numero_rg=f"{start + i}/2026", data_udienza=date(2026, 1, 1) + timedelta(days=start + i),
+            )
+            for i in range(count)
+        ])
+        DomiciliazioniDocument.objects.bulk_create([
+            DomiciliazioniDocument(
+                submission=submission, file=f'domiciliazioni/2026/01/doc_{submission.pk}_{n}.pdf',
+                original_filename=f'doc_{n}.pdf', preview_status='unsupported',
+            )
+            for submission in submissions for n in range(3)
+        ])
+
+    def _queries(self, url):
+        # La prima richiesta crea SiteSettings e riempie le cache
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def test_wagtail_list_constant_queries(self):
+        url = reverse('wagtailsnippets_domiciliazioni_domiciliazionisubmission:list')
+        self._create(5)
+        few, _ = self._queries(url)
+        self._create(95)
+        many, response = self._queries(url)
+
+        self.assertEqual(many, few)
+        self.assertContains(response, '✓ 3')
+
+    def test_django_admin_constant_queries(self):
+        url = reverse('admin:domiciliazioni_domiciliazionisubmission_changelist')
+        self._create(5)
+        few, _ = self._queries(url)
+        self._create(95)
+        many, response = self._queries(url)
+
+        self.assertEqual(many, few)
+        self.assertEqual(len(response.context['cl'].result_list), 100)
+        self.assertContains(response, '✓ 3', count=100)
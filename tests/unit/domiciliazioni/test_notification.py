@@ -0,0 +1,84 @@
+"""
+Test per l'email di notifica delle domiciliazioni con documenti allegati.
+"""
+from datetime import date
+
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory, TestCase, override_settings
+
+from domiciliazioni.models import DomiciliazioniDocument, DomiciliazioniSubmission
+from domiciliazioni.views import send_domiciliazione_notification
+from tests.unit.utils import TemporaryMediaMixin
+
+SMALL = b'%PDF-1.4\n' + b'0' * 1000
+LARGE = b'%PDF-1.4\n' + b'0' * 5000
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    EMAIL_ATTACHMENT_INLINE_MAX_SIZE=2048,
+    EMAIL_ATTACHMENT_INLINE_TOTAL_SIZE=4096,
+    PROTECTED_MEDIA_EMAIL_URL_TTL=7 * 24 * 3600,
+)
+class NotificationAttachmentsTest(TemporaryMediaMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+
+        self.submission = DomiciliazioniSubmission.objects.create(
+            nome_avvocato="Avv. Bianchi",
+            email="bianchi@example.com",
+            tribunale="roma",
+            tipo_udienza="civile",
+            numero_rg="1234/2026",
+            data_udienza=date(2026, 11, 20),
+        )
+
+    def _document(self, filename, content):
+        return DomiciliazioniDocument.objects.create(
+            submission=self.submission,
+            file=SimpleUploadedFile(filename, content),
+            original_filename=filename,
+        )
+
+    def test_small_inline_large_as_link(self):
+        self._document('delega.pdf', SMALL)
+        self._document('fascicolo.pdf', LARGE)
+
+        request = RequestFactory().get('/', HTTP_HOST='studio.example.com')
+        send_domiciliazione_notification(self.submission, request)
+
+        studio_email = mail.outbox[0]
+        names = [attachment[0] for attachment in studio_email.attachments]
+        self.assertIn('delega.pdf', names)
+        self.assertNotIn('fascicolo.pdf', names)
+        self.assertEqual(dict((a[0], a[2]) for a in studio_email.attachments)['delega.pdf'], 'application/pdf')
+
+        self.assertIn('Documenti allegati: 1', studio_email.body)
+        self.assertIn('link validi 7 giorni', studio_email.body)
+        self.assertIn('fascicolo.pdf (application/pdf, 4,9 KB)', studio_email.body)
+        self.assertIn('http://studio.example.com/allegati/', studio_email.body)
+
+    def test_inline_total_budget(self):
+        for i in range(5):
+            self._document(f'doc_{i}.pdf', SMALL)
+
+        send_domiciliazione_notification(self.submission)
+
+        studio_email = mail.outbox[0]
+        pdfs = [a for a in studio_email.attachments if a[0].endswith('.pdf')]
+        # 4096 byte di budget: quattro file da ~1KB inline, il quinto come link
+        self.assertEqual(len(pdfs), 4)
+        self.assertIn('doc_4.pdf', studio_email.body)
+        self.assertIn('http://example.com/allegati/', studio_email.body)
+
+    def test_signed_link_downloads(self):
+        self._document('fascicolo.pdf', LARGE)
+        send_domiciliazione_notification(self.submission)
+
+        body = mail.outbox[0].body
+        url = body[body.index('http://example.com/allegati/'):].split()[0]
+        response = self.client.get(url.removeprefix('http://example.com'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), LARGE)
@@ -0,0 +1,88 @@
+"""
+Test per la ricerca delle richieste di domiciliazione.
+
+Gli indici GIN e il search_vector esistono solo su PostgreSQL: qui si
+verifica la ricerca di ripiego (icontains) e il collegamento con l'admin.
+"""
+from datetime import date
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from domiciliazioni.models import DomiciliazioniDocument, DomiciliazioniSubmission
+from domiciliazioni.search import search_submissions, update_search_vector
+
+
+class SubmissionSearchTestBase(TestCase):
+
+    def setUp(self):
+        self.sfratto = DomiciliazioniSubmission.objects.create(
+            nome_avvocato="Avv. Bianchi", email="bianchi@example.com", tribunale="roma",
+            numero_rg="1234/2026", data_udienza=date(2026, 11, 20),
+            attivita_richieste="Mera comparizione", note="Chiedere rinvio",
+        )
+        self.lavoro = DomiciliazioniSubmission.objects.create(
+            nome_avvocato="Avv. Verdi", email="verdi@example.com", tribunale="milano",
+            numero_rg="987/2025", data_udienza=date(2026, 12, 1),
+        )
+        DomiciliazioniDocument.objects.create(
+            submission=self.lavoro, file='domiciliazioni/2026/10/ricorso.pdf', original_filename='ricorso.pdf',
+            extracted_text="Ricorso ex art. 414 c.p.c. contro licenziamento",
+        )
+
+    def _search(self, query):
+        return set(search_submissions(DomiciliazioniSubmission.objects.all(), query))
+
+
+class FallbackSearchTest(SubmissionSearchTestBase):
+
+    def test_submission_fields(self):
+        self.assertEqual(self._search('1234/2026'), {self.sfratto})
+        self.assertEqual(self._search('verdi@'), {self.lavoro})
+        self.assertEqual(self._search('comparizione'), {self.sfratto})
+        self.assertEqual(self._search('rinvio'), {self.sfratto})
+
+    def test_attachment_text(self):
+        self.assertEqual(self._search('licenziamento'), {self.lavoro})
+
+    def test_no_match_and_empty_query(self):
+        self.assertEqual(self._search('usucapione'), set())
+        self.assertEqual(self._search('  '), {self.sfratto, self.lavoro})
+
+    def test_vector_not_maintained_without_postgres(self):
+        self.assertEqual(update_search_vector([self.sfratto.pk]), 0)
+        self.sfratto.refresh_from_db()
+        self.assertIsNone(self.sfratto.search_vector)
+
+    def test_signals_schedule_update_on_postgres(self):
+        with mock.patch('domiciliazioni.signals.is_supported', return_value=True), \
+                mock.patch('domiciliazioni.signals.update_search_vector') as update, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.sfratto.note = "Nuova nota"
+            self.sfratto.save()
+            self.lavoro.documents.get().delete()
+        self.assertEqual(update.call_args_list, [mock.call([self.sfratto.pk]), mock.call([self.lavoro.pk])])
+
+
+class AdminSearchTest(SubmissionSearchTestBase):
+
+    def setUp(self):
+        super().setUp()
+        user = get_user_model().objects.create_superuser(username='admin', email='admin@example.com', password='x')
+        self.client.force_login(user)
+
+    def test_wagtail_list_search(self):
+        url = reverse('wagtailsnippets_domiciliazioni_domiciliazionisubmission:list')
+        response = self.client.get(url, {'q': 'licenziamento'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '987/2025')
+        self.assertNotContains(response, '1234/2026')
+
+    def test_django_admin_search(self):
+        response = self.client.get(
+            reverse('admin:domiciliazioni_domiciliazionisubmission_changelist'), {'q': 'comparizione'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['cl'].result_list), [self.sfratto])
@@ -0,0 +1,90 @@
+"""
+Test per la validazione e il salvataggio in blocco degli allegati.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time
+from io import StringIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from booking.models import Appointment, AppointmentAttachment
+from sld_project.attachments import save_uploads, validate_uploads
+from sld_project.validators import detect_mime, validate_attachment_file
+from tests.unit.utils import TemporaryMediaMixin
+
+PDF = b'%PDF-1.4\n' + b'0' * 1000
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 100
+
+
+def _files():
+    return [
+        SimpleUploadedFile('uno.pdf', PDF),
+        SimpleUploadedFile('finto.pdf', PNG),
+        SimpleUploadedFile('due.pdf', PDF),
+        SimpleUploadedFile('script.exe', b'MZ'),
+    ]
+
+
+class ValidateUploadsTest(TestCase):
+
+    def test_first_error_in_file_order(self):
+        error = validate_uploads(_files(), validate_attachment_file, max_workers=1)
+        self.assertTrue(error.startswith('File "finto.pdf"'))
+
+    def test_parallel_matches_sequential(self):
+        sequential = validate_uploads(_files(), validate_attachment_file, max_workers=1)
+        parallel = validate_uploads(_files(), validate_attachment_file, max_workers=4)
+        self.assertEqual(parallel, sequential)
+
+    def test_valid_files(self):
+        files = [SimpleUploadedFile(f'doc_{i}.pdf', PDF) for i in range(5)]
+        self.assertIsNone(validate_uploads(files, validate_attachment_file, max_workers=4))
+
+    def test_detect_mime_per_thread(self):
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            mimes = set(executor.map(detect_mime, [PDF, b'Testo semplice\n'] * 4))
+        self.assertEqual(mimes, {'application/pdf', 'text/plain'})
+
+
+class SaveUploadsTest(TemporaryMediaMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+
+        self.appointment = Appointment.objects.create(
+            first_name="Mario", last_name="Rossi", email="mario@example.com",
+            phone="+39 333 1234567", notes="", date=date(2026, 2, 16), time=time(10, 0),
+        )
+
+    def test_single_insert(self):
+        files = [SimpleUploadedFile(f'doc_{i}.pdf', PDF) for i in range(3)]
+        with CaptureQueriesContext(connection) as queries:
+            created = save_uploads(AppointmentAttachment, files, appointment=self.appointment)
+
+        # Le altre query sono i riferimenti dello storage deduplicato
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "booking_appointmentattachment"')]
+        self.assertEqual(len(inserts), 1)
+
+        self.assertEqual(len(created), 3)
+        attachments = list(self.appointment.attachments.order_by('original_filename'))
+        self.assertEqual([a.original_filename for a in attachments], ['doc_0.pdf', 'doc_1.pdf', 'doc_2.pdf'])
+        self.assertIn(f'appointments/{self.appointment.id}/', attachments[0].file.name)
+        with attachments[0].file.open() as f:
+            self.assertEqual(f.read(), PDF)
+
+    def test_no_files(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(save_uploads(AppointmentAttachment, [], appointment=self.appointment), [])
+
+
+class BenchmarkCommandTest(TestCase):
+
+    def test_reports_both_modes(self):
+        out = StringIO()
+        call_command('benchmark_attachments', files=2, size_mb=1, rounds=1, stdout=out)
+        self.assertIn('Sequenziale', out.getvalue())
+        self.assertIn('Parallela (4 thread)', out.getvalue())
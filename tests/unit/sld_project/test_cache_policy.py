@@ -0,0 +1,91 @@
+"""
+Test per la politica Cache-Control/ETag delle risposte anonime.
+"""
+from django.core.cache import cache
+from django.test import Client, TestCase
+
+from sld_project.cache_policy import SCOPE_CONTENT, get_version, match_rule
+from sld_project.tests import setup_wagtail_home
+
+
+class CacheRuleTableTest(TestCase):
+    """Corrispondenza percorso → regola."""
+
+    def test_private_areas_excluded(self):
+        for path in ['/admin/', '/django-admin/', '/prenota/', '/prenota/checkout/', '/search/']:
+            self.assertIsNone(match_rule(path), path)
+
+    def test_public_routes(self):
+        self.assertEqual(match_rule('/robots.txt').max_age, 86400)
+        self.assertEqual(match_rule('/sitemap.xml').max_age, 3600)
+        self.assertEqual(match_rule('/privacy/').max_age, 3600)
+        self.assertIsNone(match_rule('/prenota/slots/2030-01-02/').scope)
+        self.assertEqual(match_rule('/chi-siamo/').scope, SCOPE_CONTENT)
+
+
+class CachePolicyMiddlewareTest(TestCase):
+    """Header di caching sulle pagine pubbliche."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.home = setup_wagtail_home()
+        # Il primo rendering crea SiteSettings (e aggiorna la versione)
+        self.client.get('/')
+
+    def test_anonymous_page_is_public_without_vary_cookie(self):
+        response = self.client.get('/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('s-maxage=600', response['Cache-Control'])
+        self.assertTrue(response.has_header('ETag'))
+        self.assertTrue(response.has_header('Last-Modified'))
+        self.assertNotIn('Cookie', response.get('Vary', ''))
+
+    def test_revalidation_returns_304(self):
+        etag = self.client.get('/')['ETag']
+        response = self.client.get('/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertIn('public', response['Cache-Control'])
+
+    def test_content_change_invalidates_etag(self):
+        etag = self.client.get('/')['ETag']
+        version = get_version(SCOPE_CONTENT)
+
+        self.home.title = "Home aggiornata"
+        self.home.save_revision().publish()
+
+        self.assertNotEqual(get_version(SCOPE_CONTENT), version)
+        response = self.client.get('/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_no_etag_when_content_changes_during_render(self):
+        from sld_project.models import SiteSettings
+        SiteSettings.objects.all().delete()
+        response = self.client.get('/')
+        self.assertFalse(response.has_header('ETag'))
+        self.assertIn('public', response['Cache-Control'])
+
+    def test_session_cookie_disables_policy(self):
+        self.client.cookies['sessionid'] = 'abc'
+        response = self.client.get('/')
+        self.assertFalse(response.has_header('ETag'))
+        self.assertNotIn('public', response.get('Cache-Control', ''))
+
+    def test_robots_txt_cached_for_a_day(self):
+        response = self.client.get('/robots.txt')
+        self.assertIn('max-age=86400', response['Cache-Control'])
+
+    def test_slots_api_uses_content_etag(self):
+        response = self.client.get('/prenota/slots/2030-01-06/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('max-age=60', response['Cache-Control'])
+        self.assertFalse(response.has_header('Last-Modified'))
+
+        again = self.client.get('/prenota/slots/2030-01-06/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+    def test_booking_page_not_public(self):
+        response = self.client.get('/prenota/')
+        self.assertNotIn('public', response.get('Cache-Control', ''))
@@ -0,0 +1,170 @@
+"""
+Test per l'estrazione e l'inserimento del CSS critico.
+"""
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+
+from sld_project import critical_css
+from sld_project.tests import setup_wagtail_home
+
+
+CSS = """
+/* commento */
+:root { --x: 1; }
+.nav { color: red; }
+.nav a:hover { color: blue; }
+.hero { padding: 2rem; }
+.below { margin: 0; }
+.never { display: none; }
+@media (min-width: 768px) {
+    .hero { padding: 4rem; }
+    .below { margin: 1rem; }
+}
+@font-face { font-family: Inter; src: url(inter.woff2); }
+@keyframes spin { from { transform: rotate(0); } to { transform: rotate(360deg); } }
+"""
+
+HTML = """
+<html><body>
+<nav class="nav"><a href="/">Home</a></nav>
+<main>
+    <section class="hero">Titolo</section>
+    <section class="intro">Intro</section>
+    <section class="below">Sotto la piega</section>
+</main>
+<footer class="below"></footer>
+</body></html>
+"""
+
+
+class ExtractCriticalCssTest(SimpleTestCase):
+    """Selezione delle regole above-the-fold."""
+
+    def setUp(self):
+        self.critical = critical_css.extract_critical_css(HTML, CSS)
+
+    def test_keeps_rules_for_visible_elements(self):
+        self.assertIn('.nav{color: red;}', self.critical)
+        self.assertIn('.nav a:hover{color: blue;}', self.critical)
+        self.assertIn('.hero{padding: 2rem;}', self.critical)
+        self.assertIn(':root{--x: 1;}', self.critical)
+
+    def test_drops_rules_below_the_fold(self):
+        self.assertNotIn('.below', self.critical)
+        self.assertNotIn('.never', self.critical)
+        self.assertNotIn('commento', self.critical)
+
+    def test_media_queries_filtered_recursively(self):
+        self.assertIn('@media (min-width: 768px){.hero{padding: 4rem;}}', self.critical)
+
+    def test_at_rules(self):
+        self.assertIn('@font-face', self.critical)
+        self.assertNotIn('@keyframes', self.critical)
+
+    def test_site_stylesheet_parses(self):
+        css = critical_css.read_stylesheet()
+        self.assertIn('.prose', css)
+        html = '<html><body><main><article class="prose"><p>Testo</p></article></main></body></html>'
+        critical = critical_css.extract_critical_css(html, css)
+        self.assertIn('.prose p', critical)
+        self.assertNotIn('.prose blockquote', critical)
+
+
+class CriticalCssStorageTest(SimpleTestCase):
+    """File generati per template + hash del foglio di stile."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.settings_override = override_settings(CRITICAL_CSS_ROOT=self.root)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        critical_css.clear_cache()
+        self.addCleanup(critical_css.clear_cache)
+
+    def test_written_once_per_stylesheet_hash(self):
+        path, created = critical_css.write_critical_css('home', HTML, CSS)
+        self.assertTrue(created)
+        self.assertTrue(path.endswith(f'home.{critical_css.css_hash(CSS)}.css'))
+
+        _path, created = critical_css.write_critical_css('home', HTML, CSS)
+        self.assertFalse(created)
+
+    def test_stale_files_removed(self):
+        old_path, _created = critical_css.write_critical_css('home', HTML, CSS)
+        new_path, _created = critical_css.write_critical_css('home', HTML, CSS + '.x{}')
+        self.assertFalse(os.path.exists(old_path))
+        self.assertTrue(os.path.exists(new_path))
+
+    def test_lookup_requires_current_stylesheet(self):
+        critical_css.write_critical_css('home', HTML, CSS)
+        self.assertIsNone(critical_css.get_critical_css('home/home_page.html'))
+
+        # Generato con il sito attivo: letto senza riavviare il processo
+        critical_css.write_critical_css('home', HTML, critical_css.read_stylesheet())
+        self.assertIsNotNone(critical_css.get_critical_css('home/home_page.html'))
+        self.assertIsNone(critical_css.get_critical_css('contact/contact_page.html'))
+
+
+class CriticalCssPageTest(TestCase):
+    """Inserimento nel <head> e comando di generazione."""
+
+    def setUp(self):
+        cache.clear()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.settings_override = override_settings(CRITICAL_CSS_ROOT=self.root)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        critical_css.clear_cache()
+        self.addCleanup(critical_css.clear_cache)
+        self.client = Client()
+        self.home = setup_wagtail_home()
+
+    def test_inline_stylesheet_without_critical_css(self):
+        response = self.client.get('/')
+        self.assertContains(response, '.prose p {')
+        self.assertNotContains(response, '/static/css/sld_project.css')
+        self.assertNotContains(response, 'data-critical')
+        self.assertNotIn('sld_project.css', response['Link'])
+
+    def test_command_generates_and_page_inlines(self):
+        call_command('build_critical_css', '--template', 'home', stdout=StringIO())
+        self.assertTrue(os.path.exists(critical_css.snapshot_path('home')))
+
+        response = self.client.get('/')
+        self.assertContains(response, '<style data-critical>')
+        self.assertIn('</static/css/sld_project.css>; rel=preload; as=style', response['Link'])
+        self.assertContains(response, 'rel="preload" href="/static/css/sld_project.css" as="style"')
+        self.assertContains(response, '<noscript><link rel="stylesheet" href="/static/css/sld_project.css"></noscript>')
+
+    def test_command_from_snapshots(self):
+        os.makedirs(os.path.dirname(critical_css.snapshot_path('service')))
+        with open(critical_css.snapshot_path('service'), 'w') as fh:
+            fh.write('<html><body><main><div class="prose"><p>x</p></div></main></body></html>')
+
+        call_command('build_critical_css', '--template', 'service', '--from-snapshots', stdout=StringIO())
+        critical = critical_css.get_critical_css('services/service_page.html')
+        self.assertIn('.prose p', critical)
+
+    @override_settings(SECURE_SSL_REDIRECT=True)
+    def test_command_with_ssl_redirect(self):
+        call_command('build_critical_css', '--template', 'home', stdout=StringIO())
+        self.assertTrue(os.path.exists(critical_css.snapshot_path('home')))
+
+    def test_command_fails_on_error_response(self):
+        from django.http import HttpResponseServerError
+
+        client = mock.Mock()
+        client.return_value.get.return_value = HttpResponseServerError()
+        with mock.patch('django.test.Client', client), self.assertRaises(CommandError):
+            call_command('build_critical_css', '--template', 'home', stdout=StringIO(), stderr=StringIO())
+        self.assertFalse(os.path.exists(critical_css.snapshot_path('home')))
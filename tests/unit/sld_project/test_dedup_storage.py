@@ -0,0 +1,127 @@
+"""
+Test per lo storage deduplicato degli allegati.
+"""
+import errno
+import hashlib
+import os
+from datetime import date, time
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase
+
+from booking.models import Appointment, AppointmentAttachment
+from sld_project.dedup_storage import attachment_storage, blob_name
+from sld_project.models import BlobReference, StoredBlob
+from tests.unit.utils import TemporaryMediaMixin
+
+CONTRACT = b'%PDF-1.4\ncontratto'
+ID_CARD = b'%PDF-1.4\ncarta di identita'
+
+
+class DeduplicatedStorageTest(TemporaryMediaMixin, TestCase):
+
+    def _appointment(self, hour):
+        return Appointment.objects.create(
+            first_name="Mario", last_name="Rossi", email="mario@example.com",
+            phone="+39 333 1234567", notes="", date=date(2026, 2, 16), time=time(hour, 0),
+        )
+
+    def _attach(self, appointment, content, filename='contratto.pdf'):
+        return AppointmentAttachment.objects.create(
+            appointment=appointment,
+            file=SimpleUploadedFile(filename, content),
+            original_filename=filename,
+        )
+
+    def test_duplicate_content_stored_once(self):
+        first = self._attach(self._appointment(10), CONTRACT)
+        second = self._attach(self._appointment(11), CONTRACT)
+
+        digest = hashlib.sha256(CONTRACT).hexdigest()
+        blob = StoredBlob.objects.get()
+        self.assertEqual(blob.sha256, digest)
+        self.assertEqual(blob.refcount, 2)
+        self.assertEqual(blob.name, blob_name(digest, '.pdf'))
+
+        # I percorsi del FileField restano quelli di upload_to, stesso inode del blob
+        self.assertNotEqual(first.file.name, second.file.name)
+        inode = os.stat(attachment_storage().path(blob.name)).st_ino
+        self.assertEqual(os.stat(first.file.path).st_ino, inode)
+        self.assertEqual(os.stat(second.file.path).st_ino, inode)
+
+    def test_different_content(self):
+        appointment = self._appointment(10)
+        self._attach(appointment, CONTRACT)
+        self._attach(appointment, ID_CARD, 'documento.pdf')
+
+        self.assertEqual(StoredBlob.objects.count(), 2)
+        self.assertEqual(BlobReference.objects.count(), 2)
+
+    def test_last_reference_collects_blob(self):
+        first = self._attach(self._appointment(10), CONTRACT)
+        second = self._attach(self._appointment(11), CONTRACT)
+        blob_path = attachment_storage().path(StoredBlob.objects.get().name)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.appointment.delete()
+        self.assertEqual(StoredBlob.objects.get().refcount, 1)
+        self.assertFalse(os.path.exists(first.file.path))
+        self.assertTrue(os.path.exists(blob_path))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(StoredBlob.objects.exists())
+        self.assertFalse(BlobReference.objects.exists())
+        self.assertFalse(os.path.exists(second.file.path))
+        self.assertFalse(os.path.exists(blob_path))
+
+    def test_missing_blob_rewritten(self):
+        first = self._attach(self._appointment(10), CONTRACT)
+        blob_path = attachment_storage().path(StoredBlob.objects.get().name)
+        # Blob cancellato dall'eliminazione dell'ultimo riferimento in contemporanea
+        os.remove(blob_path)
+
+        second = self._attach(self._appointment(11), CONTRACT)
+        self.assertEqual(StoredBlob.objects.get().refcount, 2)
+        self.assertEqual(os.stat(second.file.path).st_ino, os.stat(blob_path).st_ino)
+        with second.file.open('rb') as f:
+            self.assertEqual(f.read(), CONTRACT)
+        self.assertTrue(os.path.exists(first.file.path))
+
+    def test_link_errors(self):
+        appointment = self._appointment(10)
+        with mock.patch('sld_project.dedup_storage.os.link', side_effect=OSError(errno.EXDEV, 'cross-device')):
+            attachment = self._attach(appointment, CONTRACT)
+        # Filesystem senza hard link: copia
+        with attachment.file.open('rb') as f:
+            self.assertEqual(f.read(), CONTRACT)
+
+        with mock.patch('sld_project.dedup_storage.os.link', side_effect=OSError(errno.EACCES, 'denied')):
+            with self.assertRaises(PermissionError):
+                self._attach(appointment, ID_CARD, 'documento.pdf')
+
+    def test_streamed_hash_reused(self):
+        upload = ContentFile(CONTRACT, name='contratto.pdf')
+        upload.sha256 = 'a' * 64
+
+        name = attachment_storage().save('appointments/1/contratto.pdf', upload)
+        self.assertEqual(BlobReference.objects.get(name=name).blob_id, 'a' * 64)
+
+    def test_file_without_reference_deleted(self):
+        path = os.path.join(self.media_root, 'appointments', '1')
+        os.makedirs(path)
+        with open(os.path.join(path, 'vecchio.pdf'), 'wb') as f:
+            f.write(CONTRACT)
+
+        attachment_storage().delete('appointments/1/vecchio.pdf')
+        self.assertFalse(os.path.exists(os.path.join(path, 'vecchio.pdf')))
+
+    def test_download_serves_logical_path(self):
+        attachment = self._attach(self._appointment(10), CONTRACT, 'parere.pdf')
+
+        response = Client().get(attachment.file.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTRACT)
+        self.assertIn('parere.pdf', response['Content-Disposition'])
@@ -0,0 +1,272 @@
+"""
+Test per le anteprime degli allegati elaborate in background.
+"""
+import io
+import os
+import zipfile
+from datetime import date, time, timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from booking.models import Appointment, AppointmentAttachment
+from domiciliazioni.models import DomiciliazioniDocument, DomiciliazioniSubmission
+from sld_project import document_previews
+from sld_project.document_previews import process_pending, requeue_stale
+from tests.unit.utils import TemporaryMediaMixin
+
+
+def make_pdf(pages):
+    """PDF minimale con una riga di testo per pagina."""
+    objects = ['<< /Type /Catalog /Pages 2 0 R >>', None, '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    kids = []
+    for text in pages:
+        stream = f'BT /F1 24 Tf 72 700 Td ({text}) Tj ET'
+        objects.append(f'<< /Length {len(stream)} >>\nstream\n{stream}\nendstream')
+        objects.append(
+            f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+            f'/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>'
+        )
+        kids.append(f'{len(objects)} 0 R')
+    objects[1] = f'<< /Type /Pages /Kids [{" ".join(kids)}] /Count {len(pages)} >>'
+
+    out = io.BytesIO()
+    out.write(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(f'{number} 0 obj\n{body}\nendobj\n'.encode())
+    xref = out.tell()
+    out.write(f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode())
+    for offset in offsets:
+        out.write(f'{offset:010d} 00000 n \n'.encode())
+    out.write(f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode())
+    return out.getvalue()
+
+
+def make_png(size=(1200, 800)):
+    buffer = io.BytesIO()
+    Image.new('RGBA', size, (200, 30, 30, 128)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def make_docx(paragraphs):
+    body = ''.join(f'<w:p><w:r><w:t>{text}</w:t></w:r></w:p>' for text in paragraphs)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr('[Content_Types].xml', '<Types/>')
+        archive.writestr('word/document.xml', f'<w:document><w:body>{body}</w:body></w:document>')
+    return buffer.getvalue()
+
+
+class DocumentPreviewTestBase(TemporaryMediaMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+
+        self.appointment = Appointment.objects.create(
+            first_name="Mario", last_name="Rossi", email="mario@example.com",
+            phone="+39 333 1234567", notes="", date=date(2026, 2, 16), time=time(10, 0),
+        )
+
+    def _attach(self, filename, content):
+        return AppointmentAttachment.objects.create(
+            appointment=self.appointment,
+            file=SimpleUploadedFile(filename, content),
+            original_filename=filename,
+        )
+
+
+class ProcessDocumentTest(DocumentPreviewTestBase):
+
+    def test_new_attachment_is_queued(self):
+        attachment = self._attach('parere.pdf', make_pdf(['Parere']))
+        self.assertEqual(attachment.preview_status, AppointmentAttachment.PREVIEW_PENDING)
+        self.assertFalse(attachment.thumbnail)
+
+    def test_pdf(self):
+        attachment = self._attach('parere.pdf', make_pdf(['Parere legale', 'Seconda pagina']))
+        self.assertEqual(process_pending(), {'done': 1})
+
+        attachment.refresh_from_db()
+        self.assertEqual(attachment.page_count, 2)
+        self.assertIn('Parere legale', attachment.extracted_text)
+        self.assertIn('Seconda pagina', attachment.extracted_text)
+        self.assertTrue(attachment.thumbnail.name.startswith('previews/'))
+        self.assertTrue(attachment.thumbnail.name.endswith('.jpg'))
+        with Image.open(attachment.thumbnail.path) as thumbnail:
+            self.assertEqual(thumbnail.format, 'JPEG')
+            self.assertLessEqual(max(thumbnail.size), document_previews.DEFAULT_THUMBNAIL_SIZE)
+        self.assertIsNotNone(attachment.preview_updated_at)
+
+    def test_image(self):
+        attachment = self._attach('scansione.png', make_png())
+        process_pending()
+
+        attachment.refresh_from_db()
+        self.assertEqual(attachment.preview_status, 'done')
+        self.assertEqual(attachment.page_count, 1)
+        with Image.open(attachment.thumbnail.path) as thumbnail:
+            self.assertEqual(thumbnail.size, (320, 213))
+            self.assertEqual(thumbnail.mode, 'RGB')
+
+    def test_docx_text(self):
+        attachment = self._attach('contratto.docx', make_docx(['Contratto di locazione', 'Art. 1 &amp; 2']))
+        process_pending()
+
+        attachment.refresh_from_db()
+        self.assertEqual(attachment.preview_status, 'done')
+        self.assertEqual(attachment.extracted_text, 'Contratto di locazione\nArt. 1 & 2')
+        self.assertFalse(attachment.thumbnail)
+
+    def test_unsupported_format(self):
+        attachment = self._attach('atto.rtf', b'{\\rtf1 atto}')
+        self.assertEqual(process_pending(), {'unsupported': 1})
+        attachment.refresh_from_db()
+        self.assertEqual(attachment.preview_status, 'unsupported')
+
+    def test_damaged_file(self):
+        attachment = self._attach('rotto.pdf', b'%PDF-1.4 non un vero pdf')
+        self.assertEqual(process_pending(), {'failed': 1})
+
+        attachment.refresh_from_db()
+        self.assertEqual(attachment.preview_status, 'failed')
+        self.assertTrue(attachment.preview_error)
+
+    def test_processed_once(self):
+        self._attach('parere.pdf', make_pdf(['Parere']))
+        process_pending()
+        self.assertEqual(process_pending(), {})
+
+    def test_both_models(self):
+        self._attach('parere.pdf', make_pdf(['Parere']))
+        submission = DomiciliazioniSubmission.objects.create(
+            nome_avvocato="Avv. Bianchi", email="bianchi@example.com", telefono="+39 333 7654321",
+            tribunale="Milano", numero_rg="123/2026", tipo_udienza="prima",
+            data_udienza=date(2026, 3, 1), attivita_richieste="Comparizione",
+        )
+        document = DomiciliazioniDocument.objects.create(
+            submission=submission, file=SimpleUploadedFile('delega.txt', b'Delega'), original_filename='delega.txt',
+        )
+
+        self.assertEqual(process_pending(), {'done': 2})
+        document.refresh_from_db()
+        self.assertEqual(document.extracted_text, 'Delega')
+
+
+class PreviewLifecycleTest(DocumentPreviewTestBase):
+
+    def test_stale_processing_requeued(self):
+        attachment = self._attach('parere.pdf', make_pdf(['Parere']))
+        AppointmentAttachment.objects.filter(pk=attachment.pk).update(
+            preview_status='processing', preview_updated_at=timezone.now() - timedelta(hours=1),
+        )
+        self.assertEqual(requeue_stale(), 1)
+        self.assertEqual(process_pending(), {'done': 1})
+
+    def test_recent_processing_not_requeued(self):
+        attachment = self._attach('parere.pdf', make_pdf(['Parere']))
+        AppointmentAttachment.objects.filter(pk=attachment.pk).update(
+            preview_status='processing', preview_updated_at=timezone.now(),
+        )
+        self.assertEqual(requeue_stale(), 0)
+
+    def test_thumbnail_deleted_with_attachment(self):
+        attachment = self._attach('parere.pdf', make_pdf(['Parere']))
+        process_pending()
+        attachment.refresh_from_db()
+        path = attachment.thumbnail.path
+
+        with self.captureOnCommitCallbacks(execute=True):
+            attachment.delete()
+        self.assertFalse(os.path.exists(path))
+
+    def test_replaced_file_requeued(self):
+        attachment = self._attach('parere.pdf', make_pdf(['Parere']))
+        process_pending()
+        attachment.refresh_from_db()
+        old_thumbnail = attachment.thumbnail.path
+
+        attachment.file = SimpleUploadedFile('nuovo.txt', b'Nuovo parere')
+        with self.captureOnCommitCallbacks(execute=True):
+            attachment.save()
+        attachment.refresh_from_db()
+        self.assertEqual(attachment.preview_status, 'pending')
+        self.assertIsNone(attachment.page_count)
+        self.assertFalse(os.path.exists(old_thumbnail))
+
+        process_pending()
+        attachment.refresh_from_db()
+        self.assertEqual(attachment.extracted_text, 'Nuovo parere')
+
+    def test_attachment_deleted_during_processing(self):
+        deleted = self._attach('parere.pdf', make_pdf(['Parere']))
+        other = self._attach('scansione.png', make_png())
+        extract_preview = document_previews.extract_preview
+
+        def delete_first(file, extension):
+            # Lo staff elimina l'allegato mentre il worker lo sta elaborando
+            AppointmentAttachment.objects.filter(pk=deleted.pk).delete()
+            return extract_preview(file, extension)
+
+        with mock.patch.object(document_previews, 'extract_preview', side_effect=delete_first):
+            self.assertEqual(process_pending(), {document_previews.PREVIEW_DELETED: 1, 'done': 1})
+
+        self.assertFalse(AppointmentAttachment.objects.filter(pk=deleted.pk).exists())
+        # Resta solo la miniatura dell'allegato ancora presente
+        thumbnail = AppointmentAttachment.objects.get(pk=other.pk).thumbnail
+        self.assertEqual(os.listdir(os.path.dirname(thumbnail.path)), [os.path.basename(thumbnail.path)])
+
+    def test_command(self):
+        self._attach('parere.pdf', make_pdf(['Parere']))
+        failed = self._attach('rotto.pdf', b'%PDF-1.4 rotto')
+        out = StringIO()
+        call_command('process_document_previews', stdout=out)
+        self.assertIn('2 anteprime elaborate', out.getvalue())
+
+        failed.refresh_from_db()
+        self.assertEqual(failed.preview_status, 'failed')
+        out = StringIO()
+        call_command('process_document_previews', retry_failed=True, stdout=out)
+        self.assertIn('1 rimessi in coda', out.getvalue())
+        self.assertIn('1 anteprime elaborate', out.getvalue())
+
+
+class PreviewAdminTest(DocumentPreviewTestBase):
+
+    def setUp(self):
+        super().setUp()
+        user = get_user_model().objects.create_superuser(username='admin', email='admin@example.com', password='x')
+        self.client.force_login(user)
+        self.attachment = self._attach('parere.pdf', make_pdf(['Parere legale']))
+        process_pending()
+        self.attachment.refresh_from_db()
+
+    def test_list_shows_thumbnails(self):
+        for hour in (11, 12):
+            appointment = Appointment.objects.create(
+                first_name="Anna", last_name="Verdi", email="anna@example.com",
+                phone="+39 333 1111111", notes="", date=date(2026, 2, 17), time=time(hour, 0),
+            )
+            AppointmentAttachment.objects.create(
+                appointment=appointment, file=SimpleUploadedFile('nota.txt', b'Nota'), original_filename='nota.txt',
+            )
+
+        response = self.client.get(reverse('wagtailsnippets_booking_appointment:list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, self.attachment.thumbnail.url.split('?')[0].rsplit('/', 1)[-1])
+        self.assertContains(response, '📄', count=2)
+
+    def test_edit_shows_preview(self):
+        response = self.client.get(reverse('wagtailsnippets_booking_appointment:edit', args=[self.appointment.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Anteprima di parere.pdf')
+        self.assertContains(response, '1 pagina')
+        self.assertContains(response, 'Parere legale')
@@ -0,0 +1,112 @@
+"""
+Test per lo sprite SVG self-hosted delle icone Lucide.
+"""
+import json
+import os
+import shutil
+import tempfile
+
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+
+from sld_project import icons
+from services.models import ServiceArea
+
+
+class IconSpriteTest(TestCase):
+    """Test per generazione sprite e manifest."""
+
+    def setUp(self):
+        self.sprite_dir = tempfile.mkdtemp()
+        self.override = override_settings(ICON_SPRITE_DIR=self.sprite_dir)
+        self.override.enable()
+        icons._manifest_cache.update({'mtime': None, 'data': None})
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.sprite_dir, ignore_errors=True)
+        icons._manifest_cache.update({'mtime': None, 'data': None})
+
+    def test_template_icons_collected(self):
+        """Le icone scritte nei template vengono trovate, le variabili ignorate."""
+        names = icons.collect_template_icons()
+        self.assertIn('arrow-right', names)
+        self.assertIn('mail', names)
+        self.assertFalse(any('{' in name for name in names))
+
+    def test_model_icons_collected(self):
+        """Le icone scelte dall'admin vengono incluse."""
+        ServiceArea.objects.create(name="Penale", slug="penale", icon="gavel", short_description="x")
+        self.assertIn('gavel', icons.collect_model_icons())
+
+    def test_sprite_contains_only_requested_icons(self):
+        """Lo sprite contiene un <symbol> per ogni icona richiesta."""
+        svg_text, missing = icons.build_sprite({'scale', 'mail'})
+        self.assertEqual(missing, [])
+        self.assertEqual(svg_text.count('<symbol'), 2)
+        self.assertIn('id="scale"', svg_text)
+        self.assertIn('id="mail"', svg_text)
+
+    def test_legacy_alias_keeps_template_name(self):
+        """I nomi storici (alert-triangle) restano l'id del symbol."""
+        svg_text, missing = icons.build_sprite({'alert-triangle'})
+        self.assertEqual(missing, [])
+        self.assertIn('id="alert-triangle"', svg_text)
+
+    def test_unknown_icon_reported_missing(self):
+        svg_text, missing = icons.build_sprite({'icona-inesistente'})
+        self.assertEqual(missing, ['icona-inesistente'])
+        self.assertNotIn('<symbol', svg_text)
+
+    def test_write_sprite_hashed_filename(self):
+        """Il nome file contiene l'hash del contenuto e il manifest punta ad esso."""
+        manifest = icons.write_sprite({'scale'})
+        self.assertRegex(manifest['file'], r'^sprite\.[0-9a-f]{12}\.svg$')
+        self.assertTrue(os.path.exists(os.path.join(self.sprite_dir, manifest['file'])))
+        # Variante precompressa per WhiteNoise / nginx gzip_static
+        self.assertTrue(os.path.exists(os.path.join(self.sprite_dir, manifest['file'] + '.gz')))
+
+        with open(os.path.join(self.sprite_dir, icons.MANIFEST_NAME)) as fh:
+            self.assertEqual(json.load(fh)['file'], manifest['file'])
+
+        # Stesso contenuto → stesso nome
+        self.assertEqual(icons.write_sprite({'scale'})['file'], manifest['file'])
+        self.assertNotEqual(icons.write_sprite({'scale', 'mail'})['file'], manifest['file'])
+
+    def test_ensure_icon_regenerates_only_when_needed(self):
+        icons.write_sprite({'scale'})
+        self.assertFalse(icons.ensure_icon('scale'))
+
+        ServiceArea.objects.create(name="Famiglia", slug="famiglia", icon="users", short_description="x")
+        self.assertTrue(icons.ensure_icon('users'))
+        self.assertIn('users', icons.read_manifest()['icons'])
+
+    def test_ensure_icon_ignores_invalid_names(self):
+        self.assertFalse(icons.ensure_icon('../../etc/passwd'))
+        self.assertFalse(icons.ensure_icon(''))
+
+    def test_template_tag_returns_sprite_url(self):
+        manifest = icons.write_sprite({'scale'})
+        rendered = Template("{% load icon_tags %}{% icon_sprite_url %}").render(Context())
+        self.assertEqual(rendered, f"/icons/{manifest['file']}")
+
+    def test_regenerated_sprite_served_without_restart(self):
+        self.assertEqual(self.client.get(icons.get_sprite_url()).status_code, 200)
+        # Nuova icona scelta dall'admin dopo l'avvio
+        icons.write_sprite({'scale', 'users'})
+        url = icons.get_sprite_url()
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/svg+xml')
+        self.assertEqual(response['Cache-Control'], icons.SPRITE_CACHE_CONTROL)
+        self.assertIn(b'id="users"', b''.join(response.streaming_content))
+
+        gzipped = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(gzipped['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', gzipped['Vary'])
+
+    def test_sprite_view_rejects_other_files(self):
+        icons.write_sprite({'scale'})
+        self.assertEqual(self.client.get('/icons/sprite.json').status_code, 404)
+        self.assertEqual(self.client.get('/icons/sprite.000000000000.svg').status_code, 404)
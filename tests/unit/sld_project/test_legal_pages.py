@@ -0,0 +1,93 @@
+"""
+Test per le pagine legali in cache (Privacy Policy, Termini).
+"""
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+
+from sld_project.models import SiteSettings
+from sld_project.tests import setup_wagtail_home
+from sld_project.views import _legal_content, _substitute_variables
+
+
+class SubstituteVariablesTest(TestCase):
+    """Sostituzione delle variabili in un solo passaggio."""
+
+    def test_all_variables_replaced(self):
+        settings = SiteSettings(
+            studio_name="Studio Rossi", lawyer_name="Avv. Rossi", address="Via Roma 1",
+            city="Milano", email="info@example.com", email_pec="pec@example.com", phone="02 123",
+        )
+        content = _substitute_variables(
+            "{{studio_name}} {{lawyer_name}} {{address}} {{city}} {{email}} {{email_pec}} {{phone}}",
+            settings,
+        )
+        self.assertEqual(
+            content,
+            "Studio Rossi Avv. Rossi Via Roma 1 Milano info@example.com pec@example.com 02 123",
+        )
+
+    def test_values_are_not_substituted_again(self):
+        """Un valore che contiene una variabile resta letterale."""
+        settings = SiteSettings(studio_name="{{city}}", city="Milano")
+        self.assertEqual(_substitute_variables("{{studio_name}}", settings), "{{city}}")
+
+    def test_unknown_variables_untouched(self):
+        settings = SiteSettings(studio_name="Studio")
+        self.assertEqual(_substitute_variables("{{foo}} {{studio_name}}", settings), "{{foo}} Studio")
+
+    def test_empty_content(self):
+        self.assertEqual(_substitute_variables("", SiteSettings()), "")
+
+
+class CachedLegalPageTest(TestCase):
+    """Testo calcolato una volta per versione di SiteSettings."""
+
+    def setUp(self):
+        cache.clear()
+        self.home = setup_wagtail_home()
+        self.settings = SiteSettings.for_site(self.home.get_site())
+        self.settings.studio_name = "Studio Bianchi"
+        self.settings.privacy_policy = "<p>Titolare: {{studio_name}}</p>"
+        self.settings.save()
+
+    def test_content_cached_until_settings_change(self):
+        self.assertEqual(_legal_content("privacy_policy"), "<p>Titolare: Studio Bianchi</p>")
+        with self.assertNumQueries(0):
+            _legal_content("privacy_policy")
+
+        self.settings.studio_name = "Studio Verdi"
+        self.settings.save()
+        self.assertEqual(_legal_content("privacy_policy"), "<p>Titolare: Studio Verdi</p>")
+
+    def test_repeated_visit_returns_304(self):
+        client = Client()
+        response = client.get('/privacy/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Titolare: Studio Bianchi")
+
+        again = client.get('/privacy/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+    def test_logged_in_visit_not_conditional(self):
+        from django.contrib.auth.models import User
+
+        etag = Client().get('/privacy/')['ETag']
+        user = User.objects.create_user('redattore', password='x')
+        client = Client()
+        client.force_login(user)
+        response = client.get('/privacy/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('public', response.get('Cache-Control', ''))
+        self.assertFalse(response.has_header('ETag'))
+
+    def test_etag_changes_with_deploy_and_host(self):
+        client = Client()
+        etag = client.get('/privacy/')['ETag']
+        self.assertNotEqual(client.get('/privacy/', HTTP_HOST='altro.example.com')['ETag'], etag)
+
+        with mock.patch('sld_project.cache_policy._deploy_id', return_value='nuovo-deploy'):
+            response = client.get('/privacy/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
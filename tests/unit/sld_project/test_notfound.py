@@ -0,0 +1,93 @@
+"""
+Test per la gestione economica dei 404.
+"""
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+
+from sld_project import notfound
+from sld_project.notfound import get_404_stats, is_obvious_non_page
+from sld_project.tests import setup_wagtail_home
+
+
+class ObviousNonPageTest(TestCase):
+    """Riconoscimento dei percorsi che non possono essere pagine."""
+
+    def test_scanner_paths(self):
+        for path in ['/wp-admin/', '/wp-login.php', '/.env', '/.git/config', '/xmlrpc.php',
+                     '/cgi-bin/test', '/phpmyadmin/', '/blog/wp-includes/x']:
+            self.assertTrue(is_obvious_non_page(path), path)
+
+    def test_file_extensions(self):
+        for path in ['/index.php', '/backup.sql', '/old/site.zip', '/favicon.png']:
+            self.assertTrue(is_obvious_non_page(path), path)
+
+    def test_page_paths(self):
+        for path in ['/', '/contatti/', '/articoli/diritto-di-famiglia/', '/servizi/penale/']:
+            self.assertFalse(is_obvious_non_page(path), path)
+
+
+class NotFoundResponseTest(TestCase):
+    """Risposte 404 minime e pagina 404 in cache."""
+
+    def setUp(self):
+        from sld_project.models import SiteSettings
+
+        cache.clear()
+        self.client = Client()
+        self.home = setup_wagtail_home()
+        SiteSettings.for_site(self.home.get_site())
+
+    def test_scanner_path_minimal_without_queries(self):
+        from sld_project.redirects import get_redirect_index
+        get_redirect_index()
+        with self.assertNumQueries(0):
+            response = self.client.get('/wp-login.php')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.content, b'Not Found')
+        self.assertIn('max-age=3600', response['Cache-Control'])
+
+    def test_slug_like_scanner_path_minimal(self):
+        """/wp-admin/ finirebbe nella catch-all di Wagtail: risposta minima."""
+        from sld_project.redirects import get_redirect_index
+        get_redirect_index()
+        with self.assertNumQueries(0):
+            response = self.client.get('/wp-admin/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_specific_routes_untouched(self):
+        self.assertEqual(self.client.get('/robots.txt').status_code, 200)
+        self.assertEqual(self.client.get('/sitemap.xml').status_code, 200)
+
+    def test_missing_page_served_from_cache(self):
+        first = self.client.get('/pagina-inesistente/')
+        self.assertEqual(first.status_code, 404)
+        self.assertContains(first, 'PAGINA NON TROVATA', status_code=404)
+        self.assertContains(first, 'noindex', status_code=404)
+        # Nessun riferimento all'URL richiesto nel corpo messo in cache
+        self.assertNotContains(first, 'pagina-inesistente', status_code=404)
+
+        before = get_404_stats()
+        second = self.client.get('/altra-pagina-inesistente/')
+        self.assertEqual(second.status_code, 404)
+        self.assertEqual(second.content, first.content)
+        stats = get_404_stats()
+        self.assertEqual(stats['cached'], before['cached'] + 1)
+        self.assertEqual(stats['rendered'], before['rendered'])
+
+    def test_service_area_change_invalidates_cached_page(self):
+        from services.models import ServiceArea
+
+        self.client.get('/pagina-inesistente/')
+        ServiceArea.objects.create(name="Diritto Tributario", slug="tributario", icon="scale", short_description="x")
+        response = self.client.get('/pagina-inesistente/')
+        self.assertContains(response, 'Diritto Tributario', status_code=404)
+
+    def test_metrics_logged_without_cache(self):
+        self.client.get('/.env')
+        with self.assertLogs('sld_project.notfound', 'INFO') as logs:
+            with mock.patch.object(notfound, 'METRIC_LOG_INTERVAL', 0):
+                self.client.get('/.env')
+        self.assertRegex(logs.output[0], r'404 negli ultimi \d+s \(pid \d+\): fast=\d+, cached=\d+, rendered=\d+')
+        self.assertEqual(get_404_stats()['total'], 0)
@@ -0,0 +1,63 @@
+"""
+Test per gli header Link di preload degli asset critici.
+"""
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+
+from sld_project import preload
+from sld_project.tests import setup_wagtail_home
+
+
+class PreloadHintsTest(TestCase):
+    """Header Link sulle pagine HTML."""
+
+    def setUp(self):
+        cache.clear()
+        preload._hints_cache.clear()
+        self.client = Client()
+        self.home = setup_wagtail_home()
+
+    def test_page_has_preload_headers(self):
+        response = self.client.get('/')
+        self.assertEqual(response.status_code, 200)
+        link = response['Link']
+        self.assertIn('<https://fonts.gstatic.com>; rel=preconnect; crossorigin', link)
+        self.assertIn(f'<{preload.GOOGLE_FONTS_CSS}>; rel=preload; as=style', link)
+        self.assertIn('</static/js/sld_project.js>; rel=preload; as=script', link)
+        self.assertIn('</static/js/lucide-sprite.js>; rel=preload; as=script', link)
+        self.assertNotIn('lazy-map.js', link)
+
+    def test_template_specific_assets(self):
+        from contact.models import ContactPage
+
+        self.home.add_child(instance=ContactPage(title="Contatti", slug="contatti"))
+        response = self.client.get('/contatti/')
+        self.assertIn('</static/js/lazy-map.js>; rel=preload; as=script', response['Link'])
+
+    def test_header_computed_once_per_template(self):
+        self.client.get('/')
+        with self.assertNumQueries(0):
+            preload.get_link_header('home/home_page.html')
+        self.assertIn(('home/home_page.html', preload.get_version(preload.SCOPE_SETTINGS), False), preload._hints_cache)
+
+    def test_logo_preloaded_when_configured(self):
+        from wagtail.images.tests.utils import get_test_image_file
+        from wagtail.images.models import Image
+        from sld_project.models import SiteSettings
+
+        logo = Image.objects.create(title="Logo", file=get_test_image_file())
+        site_settings = SiteSettings.for_site(self.home.get_site())
+        site_settings.logo = logo
+        site_settings.save()
+
+        response = self.client.get('/')
+        self.assertIn(f'<{logo.file.url}>; rel=preload; as=image', response['Link'])
+
+    @override_settings(PRELOAD_HINTS=False)
+    def test_switch_disables_headers(self):
+        response = self.client.get('/')
+        self.assertFalse(response.has_header('Link'))
+
+    def test_non_html_responses_untouched(self):
+        self.assertFalse(self.client.get('/robots.txt').has_header('Link'))
+        self.assertFalse(self.client.get('/sitemap.xml').has_header('Link'))
@@ -0,0 +1,81 @@
+"""
+Test per gli allegati privati con link firmati a scadenza.
+"""
+import time
+
+from django.core.files.base import ContentFile
+from django.test import Client, TestCase, override_settings
+
+from booking.models import AppointmentAttachment
+from sld_project.protected_media import protected_storage, signed_url, verify_signature
+from tests.unit.utils import TemporaryMediaMixin
+
+
+class ProtectedMediaTestBase(TemporaryMediaMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.name = protected_storage().save('appointments/1/atto.pdf', ContentFile(b'%PDF-1.4 atto'))
+        self.client = Client()
+
+
+class SignedUrlTest(ProtectedMediaTestBase):
+    """Firma e scadenza dei link."""
+
+    def test_signature_roundtrip(self):
+        url = signed_url(self.name, ttl=60, now=1000)
+        _prefix, expires, signature, _rest = url.split('/', 4)[1:]
+        self.assertEqual(expires, '1060')
+        self.assertTrue(verify_signature(self.name, 1060, signature, now=1000))
+        self.assertFalse(verify_signature(self.name, 1060, signature, now=1061))
+        self.assertFalse(verify_signature('appointments/2/altro.pdf', 1060, signature, now=1000))
+
+    def test_model_file_url_is_signed(self):
+        attachment = AppointmentAttachment(original_filename="atto.pdf")
+        attachment.file.name = self.name
+
+        self.assertTrue(attachment.file.url.startswith('/allegati/'))
+        self.assertTrue(attachment.file.url.endswith('/appointments/1/atto.pdf'))
+
+
+class ProtectedMediaViewTest(ProtectedMediaTestBase):
+    """Download tramite la view /allegati/."""
+
+    def test_valid_link_streamed_without_queries(self):
+        url = signed_url(self.name)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-1.4 atto')
+        self.assertIn('attachment', response['Content-Disposition'])
+        self.assertEqual(response['Cache-Control'], 'private, no-store')
+        self.assertIn('noindex', response['X-Robots-Tag'])
+
+    @override_settings(SENDFILE_BACKEND='sld_project.sendfile', SENDFILE_URL='/internal-media/')
+    def test_valid_link_delegated_to_nginx(self):
+        response = self.client.get(signed_url(self.name))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/internal-media/appointments/1/atto.pdf')
+        self.assertEqual(response.content, b'')
+
+    def test_expired_link_forbidden(self):
+        url = signed_url(self.name, ttl=60, now=time.time() - 120)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 403)
+
+    def test_tampered_link_forbidden(self):
+        url = signed_url(self.name).replace('atto.pdf', 'altro.pdf')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 403)
+
+    def test_path_outside_media_root(self):
+        name = '../segreti.txt'
+        url = signed_url(name)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 404)
+
+    def test_missing_file(self):
+        response = self.client.get(signed_url('appointments/1/mancante.pdf'))
+        self.assertEqual(response.status_code, 404)
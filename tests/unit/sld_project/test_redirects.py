@@ -0,0 +1,92 @@
+"""
+Test per l'indice in memoria dei redirect.
+"""
+from django.core.cache import cache
+from django.test import Client, TestCase
+from wagtail.contrib.redirects.models import Redirect
+
+from sld_project import redirects
+from sld_project.tests import setup_wagtail_home
+
+
+class CachedRedirectTest(TestCase):
+    """Redirect risolti con una ricerca nel dizionario."""
+
+    def setUp(self):
+        from sld_project.models import SiteSettings
+
+        cache.clear()
+        redirects._index.update({'generation': None, 'paths': {}})
+        self.client = Client()
+        self.home = setup_wagtail_home()
+        SiteSettings.for_site(self.home.get_site())
+
+    def test_redirect_to_link(self):
+        Redirect.objects.create(old_path='/vecchia-pagina', redirect_link='https://example.com/nuova/')
+        response = self.client.get('/vecchia-pagina/')
+        self.assertEqual(response.status_code, 301)
+        self.assertEqual(response['Location'], 'https://example.com/nuova/')
+
+    def test_temporary_redirect_to_page(self):
+        from contact.models import ContactPage
+
+        contact = self.home.add_child(instance=ContactPage(title="Contatti", slug="contatti"))
+        Redirect.objects.create(old_path='/contattaci', redirect_page=contact, is_permanent=False)
+        response = self.client.get('/contattaci/')
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response['Location'], '/contatti/')
+
+    def test_site_specific_redirect_preferred(self):
+        site = self.home.get_site()
+        Redirect.objects.create(old_path='/studio', redirect_link='/generico/')
+        Redirect.objects.create(old_path='/studio', site=site, redirect_link='/specifico/')
+        self.assertEqual(self.client.get('/studio/')['Location'], '/specifico/')
+
+    def test_redirect_with_query_string_fallback(self):
+        Redirect.objects.create(old_path='/news', redirect_link='/articoli/')
+        self.assertEqual(self.client.get('/news/?page=2')['Location'], '/articoli/')
+
+    def test_old_file_url_not_swallowed_by_fast_path(self):
+        Redirect.objects.create(old_path='/chi-siamo.php', redirect_link='/chi-siamo/')
+        self.assertEqual(self.client.get('/chi-siamo.php')['Location'], '/chi-siamo/')
+
+    def test_index_reloaded_after_change(self):
+        self.assertEqual(self.client.get('/promo/').status_code, 404)
+        redirect = Redirect.objects.create(old_path='/promo', redirect_link='/servizi/')
+        self.assertEqual(self.client.get('/promo/').status_code, 301)
+        redirect.delete()
+        self.assertEqual(self.client.get('/promo/').status_code, 404)
+
+    def test_miss_does_not_query_redirects(self):
+        Redirect.objects.create(old_path='/esiste', redirect_link='/x/')
+        redirects.get_redirect_index()
+        with self.assertNumQueries(0):
+            self.assertIsNone(redirects.find_redirect(None, '/non-esiste'))
+
+    def test_slug_change_redirect(self):
+        from contact.models import ContactPage
+
+        page = self.home.add_child(instance=ContactPage(title="Contatti", slug="contatti"))
+        self.assertEqual(self.client.get('/contatti/').status_code, 200)
+        # Carica l'indice prima della modifica
+        self.assertEqual(self.client.get('/non-esiste/').status_code, 404)
+
+        page.slug = 'contattaci'
+        with self.captureOnCommitCallbacks(execute=True):
+            page.save_revision().publish()
+        self.assertTrue(Redirect.objects.filter(old_path='/contatti').exists())
+
+        response = self.client.get('/contatti/')
+        self.assertEqual(response.status_code, 301)
+        self.assertEqual(response['Location'], '/contattaci/')
+
+    def test_page_move_redirect(self):
+        from contact.models import ContactPage
+
+        parent = self.home.add_child(instance=ContactPage(title="Studio", slug="studio"))
+        page = self.home.add_child(instance=ContactPage(title="Contatti", slug="contatti"))
+        self.assertEqual(self.client.get('/non-esiste/').status_code, 404)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            page.move(parent, pos='last-child')
+        self.assertEqual(self.client.get('/contatti/')['Location'], '/studio/contatti/')
@@ -0,0 +1,172 @@
+"""
+Test per la pre-generazione delle rendition e l'output <picture>.
+"""
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from wagtail.images.models import Image, Rendition
+from wagtail.images.rect import Rect
+from wagtail.images.tests.utils import get_test_image_file, get_test_image_file_svg
+
+from sld_project import renditions
+from sld_project.tests import setup_wagtail_home
+
+
+class RenditionSpecsTest(TestCase):
+    """Filtri dichiarati per insieme e formato."""
+
+    def test_picture_sets_include_modern_formats(self):
+        image = Image.objects.create(title="Foto", file=get_test_image_file())
+        specs = renditions.specs_for(image, renditions.SET_COVER)
+
+        self.assertIn('fill-800x450|format-png', specs)
+        self.assertIn('fill-1200x675|format-webp', specs)
+        self.assertEqual('fill-1200x675|format-avif' in specs, renditions.avif_supported())
+
+    def test_social_set_keeps_original_format(self):
+        image = Image.objects.create(title="Foto", file=get_test_image_file())
+        self.assertEqual(renditions.specs_for(image, renditions.SET_SOCIAL), [renditions.SOCIAL_SPEC])
+
+    def test_svg_only_resized(self):
+        image = Image.objects.create(title="Logo", file=get_test_image_file_svg())
+        specs = renditions.specs_for(image, renditions.SET_CARD)
+        self.assertEqual(specs, ['fill-400x225', 'fill-800x450'])
+
+
+class RenditionPregenerationTest(TestCase):
+    """Generazione anticipata al caricamento, alla pubblicazione e da comando."""
+
+    def setUp(self):
+        cache.clear()
+        self.home = setup_wagtail_home()
+
+    def _create_article(self, cover_image):
+        from articles.models import ArticleIndexPage, ArticlePage
+
+        index = self.home.add_child(instance=ArticleIndexPage(title="Articoli", slug="articoli"))
+        article = ArticlePage(title="Articolo", slug="articolo", body="<p>Testo</p>", cover_image=cover_image)
+        index.add_child(instance=article)
+        return index, article
+
+    def test_pregenerate_is_idempotent(self):
+        image = Image.objects.create(title="Foto", file=get_test_image_file())
+        expected = len(renditions.specs_for(image, renditions.SET_CARD))
+
+        self.assertEqual(renditions.pregenerate(image, [renditions.SET_CARD]), expected)
+        self.assertEqual(renditions.pregenerate(image, [renditions.SET_CARD]), 0)
+        self.assertEqual(Rendition.objects.filter(image=image).count(), expected)
+
+    def test_upload_generates_nothing_until_used(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            image = Image.objects.create(title="Foto", file=get_test_image_file())
+        self.assertFalse(Rendition.objects.filter(image=image).exists())
+
+        # Usata come immagine social: la modifica genera solo quell'insieme
+        from sld_project.models import SiteSettings
+        site_settings = SiteSettings.for_site(self.home.get_site())
+        site_settings.default_social_image = image
+        site_settings.save()
+        Rendition.objects.filter(image=image).delete()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            image.focal_point_x, image.focal_point_y, image.focal_point_width, image.focal_point_height = 10, 10, 20, 20
+            image.save()
+        specs = set(Rendition.objects.filter(image=image).values_list('filter_spec', flat=True))
+        self.assertEqual(specs, {renditions.SOCIAL_SPEC})
+
+    def test_article_publish_generates_cover(self):
+        image = Image.objects.create(title="Foto", file=get_test_image_file())
+        _index, article = self._create_article(image)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            article.save_revision().publish()
+
+        specs = set(Rendition.objects.filter(image=image).values_list('filter_spec', flat=True))
+        self.assertIn('fill-1200x675|format-webp', specs)
+        self.assertIn('fill-400x225|format-png', specs)
+        self.assertIn(renditions.SOCIAL_SPEC, specs)
+
+    def test_backfill_command(self):
+        image = Image.objects.create(title="Foto", file=get_test_image_file())
+        self._create_article(image)
+
+        call_command('backfill_renditions', stdout=StringIO())
+        expected = set()
+        for set_name in renditions.ARTICLE_COVER_SETS:
+            expected.update(renditions.specs_for(image, set_name))
+        self.assertEqual(Rendition.objects.filter(image=image).count(), len(expected))
+
+        out = StringIO()
+        call_command('backfill_renditions', stdout=out)
+        self.assertIn('0 rendition generate per 1 immagini', out.getvalue())
+
+    def test_pages_render_picture(self):
+        image = Image.objects.create(title="Foto", file=get_test_image_file())
+        self._create_article(image)
+        client = Client()
+
+        response = client.get('/articoli/articolo/')
+        self.assertContains(response, '<picture>')
+        self.assertContains(response, 'type="image/webp"')
+        self.assertContains(response, 'sizes="(min-width: 896px) 848px, 100vw"')
+
+        response = client.get('/articoli/')
+        self.assertContains(response, 'type="image/webp"')
+        self.assertContains(response, 'loading="lazy"')
+
+
+class RenditionCacheTest(TestCase):
+    """Cache di processo delle rendition."""
+
+    def setUp(self):
+        cache.clear()
+        renditions._rendition_cache['generation'] = None
+        self.home = setup_wagtail_home()
+        self.image = Image.objects.create(title="Social", file=get_test_image_file())
+
+        from sld_project.models import SiteSettings
+        site_settings = SiteSettings.for_site(self.home.get_site())
+        site_settings.default_social_image = self.image
+        site_settings.save()
+        renditions.pregenerate_for_settings(site_settings)
+
+    def test_warm_then_lookup_by_id_without_queries(self):
+        self.assertEqual(renditions.warm_rendition_cache(), 1)
+        with self.assertNumQueries(0):
+            rendition = renditions.get_cached_rendition(self.image.pk, renditions.SOCIAL_SPEC)
+        self.assertEqual(rendition.filter_spec, renditions.SOCIAL_SPEC)
+
+    def test_template_tag_uses_cache(self):
+        from django.template import Context, Template
+
+        renditions.warm_rendition_cache()
+        template = Template('{% load image_tags %}{% rendition image_id "fill-1200x630" as og %}{{ og.url }}')
+        with self.assertNumQueries(0):
+            output = template.render(Context({'image_id': self.image.pk}))
+        self.assertIn('fill-1200x630', output)
+
+    def test_focal_point_change_invalidates(self):
+        renditions.warm_rendition_cache()
+        before = renditions.get_cached_rendition(self.image.pk, renditions.SOCIAL_SPEC)
+
+        self.image.set_focal_point(Rect(0, 0, 100, 100))
+        self.image.save()
+        self.assertEqual(renditions._entries()['renditions'], {})
+
+        after = renditions.get_cached_rendition(self.image.pk, renditions.SOCIAL_SPEC)
+        self.assertNotEqual(before.focal_point_key, after.focal_point_key)
+
+    def test_rendition_delete_invalidates(self):
+        renditions.warm_rendition_cache()
+        self.image.renditions.all().delete()
+        self.assertEqual(renditions._entries()['renditions'], {})
+
+    def test_missing_image(self):
+        self.assertIsNone(renditions.get_cached_rendition(999999, renditions.SOCIAL_SPEC))
+
+    def test_base_template_og_image(self):
+        renditions.warm_rendition_cache()
+        response = Client().get('/')
+        self.assertContains(response, 'fill-1200x630')
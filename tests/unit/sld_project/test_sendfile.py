@@ -0,0 +1,73 @@
+"""
+Test per il download dei documenti tramite X-Accel-Redirect.
+"""
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.test import Client, TestCase, override_settings
+from wagtail.documents.models import Document
+from wagtail.models import Collection, CollectionViewRestriction
+
+from sld_project.sendfile import accel_redirect_path
+from tests.unit.utils import TemporaryMediaMixin
+
+
+class DocumentServeTestBase(TemporaryMediaMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+
+        self.document = Document.objects.create(title="Parere")
+        self.document.file.save('parere_è.pdf', ContentFile(b'%PDF-1.4 contenuto'))
+        self.client = Client()
+
+
+@override_settings(SENDFILE_BACKEND='sld_project.sendfile', SENDFILE_URL='/internal-media/')
+class XAccelDocumentTest(DocumentServeTestBase):
+    """Con SENDFILE_BACKEND il file lo invia nginx."""
+
+    def test_download_delegated_to_nginx(self):
+        response = self.client.get(self.document.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/internal-media/documents/parere_%C3%A8.pdf')
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertIn("filename*=UTF-8''parere_%C3%A8.pdf", response['Content-Disposition'])
+        self.assertEqual(response['X-Content-Type-Options'], 'nosniff')
+
+    def test_restricted_collection_still_checked(self):
+        collection = Collection.get_first_root_node().add_child(name="Riservati")
+        self.document.collection = collection
+        self.document.save()
+        CollectionViewRestriction.objects.create(
+            collection=collection,
+            restriction_type=CollectionViewRestriction.PASSWORD,
+            password='segreta',
+        )
+
+        response = self.client.get(self.document.url)
+        self.assertFalse(response.has_header('X-Accel-Redirect'))
+        self.assertContains(response, 'password')
+
+    def test_wrong_filename_is_404(self):
+        response = self.client.get(f'/documents/{self.document.pk}/altro.pdf')
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header('X-Accel-Redirect'))
+
+    def test_file_outside_root_is_streamed(self):
+        with override_settings(SENDFILE_ROOT=tempfile.gettempdir() + '/altro'):
+            self.assertIsNone(accel_redirect_path(self.document.file.path))
+            response = self.client.get(self.document.url)
+        self.assertFalse(response.has_header('X-Accel-Redirect'))
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-1.4 contenuto')
+
+
+class StreamingDocumentTest(DocumentServeTestBase):
+    """Senza SENDFILE_BACKEND (sviluppo) il file passa da Django."""
+
+    def test_download_streamed(self):
+        response = self.client.get(self.document.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('X-Accel-Redirect'))
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-1.4 contenuto')
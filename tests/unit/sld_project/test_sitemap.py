@@ -0,0 +1,99 @@
+"""
+Test per la sitemap in cache con rigenerazione per sezione.
+"""
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+
+from sld_project import sitemaps
+from sld_project.tests import setup_wagtail_home
+
+
+class CachedSitemapTest(TestCase):
+    """Sitemap generata una volta e invalidata per sezione."""
+
+    def setUp(self):
+        from articles.models import ArticleIndexPage
+        from sld_project.models import SiteSettings
+
+        cache.clear()
+        self.client = Client()
+        self.home = setup_wagtail_home()
+        SiteSettings.for_site(self.home.get_site())
+        self.blog = self.home.add_child(instance=ArticleIndexPage(title="Articoli", slug="articoli"))
+
+    def _publish_article(self, slug):
+        from articles.models import ArticlePage
+
+        article = self.blog.add_child(instance=ArticlePage(title=slug, slug=slug, body="<p>x</p>"))
+        article.save_revision().publish()
+        return article
+
+    def test_single_urlset_for_small_sites(self):
+        self._publish_article('primo')
+        response = self.client.get('/sitemap.xml')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('xml', response['Content-Type'])
+        content = response.content.decode('utf-8')
+        self.assertIn('<urlset', content)
+        self.assertIn('/articoli/primo/', content)
+
+    def test_second_request_served_from_cache(self):
+        self.client.get('/sitemap.xml')
+        with self.assertNumQueries(0):
+            response = self.client.get('/sitemap.xml')
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_modified_since_returns_304(self):
+        self._publish_article('primo')
+        last_modified = self.client.get('/sitemap.xml')['Last-Modified']
+        response = self.client.get('/sitemap.xml', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_publishing_article_invalidates_only_articles(self):
+        pages_generation = sitemaps._generation(sitemaps.SECTION_PAGES)
+        articles_generation = sitemaps._generation(sitemaps.SECTION_ARTICLES)
+
+        self._publish_article('nuovo')
+
+        self.assertEqual(sitemaps._generation(sitemaps.SECTION_PAGES), pages_generation)
+        self.assertEqual(sitemaps._generation(sitemaps.SECTION_ARTICLES), articles_generation + 1)
+        self.assertIn('/articoli/nuovo/', self.client.get('/sitemap-articles.xml').content.decode())
+
+    def test_unpublished_article_disappears(self):
+        article = self._publish_article('ritirato')
+        self.assertIn('/articoli/ritirato/', self.client.get('/sitemap.xml').content.decode())
+        article.unpublish()
+        self.assertNotIn('/articoli/ritirato/', self.client.get('/sitemap.xml').content.decode())
+
+    def test_index_when_articles_exceed_one_file(self):
+        self._publish_article('uno')
+        self._publish_article('due')
+        original_limit = sitemaps.ArticlesSitemap.limit
+        sitemaps.ArticlesSitemap.limit = 1
+        try:
+            content = self.client.get('/sitemap.xml').content.decode('utf-8')
+            self.assertIn('<sitemapindex', content)
+            self.assertIn('/sitemap-pages.xml', content)
+            self.assertIn('/sitemap-articles.xml?p=2', content)
+
+            page_two = self.client.get('/sitemap-articles.xml', {'p': 2})
+            self.assertEqual(page_two.status_code, 200)
+            self.assertEqual(page_two.content.decode().count('<url>'), 1)
+        finally:
+            sitemaps.ArticlesSitemap.limit = original_limit
+
+    def test_unknown_section_404(self):
+        self.assertEqual(self.client.get('/sitemap-inesistente.xml').status_code, 404)
+
+    def test_invalid_page_not_cached(self):
+        for page in ('abc', '0', '-1', '99'):
+            self.assertEqual(self.client.get('/sitemap-articles.xml', {'p': page}).status_code, 404, page)
+        self.assertEqual(self.client.get('/sitemap-articles.xml', {'p': '01'}).status_code, 200)
+
+        with mock.patch.object(sitemaps.cache, 'set') as cache_set:
+            self.client.get('/sitemap-articles.xml', {'p': '99'})
+            cache_set.assert_not_called()
+            self.client.get('/sitemap-pages.xml')
+        self.assertEqual(cache_set.call_args.args[2], sitemaps.CACHE_TIMEOUT)
@@ -0,0 +1,59 @@
+"""
+Test per gli statici precompressi serviti da WhiteNoise.
+"""
+import gzip
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import Client, TestCase, override_settings
+from whitenoise.compress import Compressor
+
+
+class PrecompressedStaticTest(TestCase):
+    """Le varianti .gz generate da collectstatic vengono servite con cache immutabile."""
+
+    def setUp(self):
+        self.static_root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.static_root, 'css'))
+        self.css_path = os.path.join(self.static_root, 'css', 'site.0123456789ab.css')
+        with open(self.css_path, 'w') as fh:
+            fh.write('body { color: #111; }\n' * 200)
+        for _compressed in Compressor(quiet=True).compress(self.css_path):
+            pass
+
+    def tearDown(self):
+        shutil.rmtree(self.static_root, ignore_errors=True)
+
+    def test_whitenoise_middleware_first(self):
+        self.assertEqual(settings.MIDDLEWARE[0], 'whitenoise.middleware.WhiteNoiseMiddleware')
+
+    def test_compressed_storage_configured(self):
+        from sld_project.settings import base
+        self.assertEqual(
+            base.STORAGES['staticfiles']['BACKEND'],
+            'whitenoise.storage.CompressedManifestStaticFilesStorage',
+        )
+
+    def test_gzip_sibling_written(self):
+        self.assertTrue(os.path.exists(f'{self.css_path}.gz'))
+
+    def test_serves_gzip_variant_with_immutable_cache(self):
+        with override_settings(STATIC_ROOT=self.static_root, DEBUG=False):
+            response = Client().get(
+                '/static/css/site.0123456789ab.css',
+                HTTP_ACCEPT_ENCODING='gzip, deflate',
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertIn('Accept-Encoding', response['Vary'])
+            self.assertIn('immutable', response['Cache-Control'])
+            body = gzip.decompress(b''.join(response.streaming_content))
+            self.assertTrue(body.startswith(b'body { color'))
+
+    def test_serves_plain_file_without_accept_encoding(self):
+        with override_settings(STATIC_ROOT=self.static_root, DEBUG=False):
+            response = Client().get('/static/css/site.0123456789ab.css')
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(response.has_header('Content-Encoding'))
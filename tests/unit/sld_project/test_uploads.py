@@ -0,0 +1,128 @@
+"""
+Test per la validazione degli allegati durante lo streaming dell'upload.
+"""
+import hashlib
+import os
+from io import BytesIO
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http.multipartparser import MultiPartParser
+from django.test import Client, RequestFactory, TestCase
+
+from booking.models import Appointment
+from sld_project import uploads
+from sld_project.protected_media import protected_storage
+from sld_project.uploads import StagedUploadedFile, StreamingValidationUploadHandler
+from sld_project.validators import FileValidator
+from tests.unit.utils import TemporaryMediaMixin
+
+PDF = b'%PDF-1.4\n' + b'0' * 20000
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 100
+
+
+class StreamingUploadTest(TemporaryMediaMixin, TestCase):
+
+    def _parse(self, data):
+        request = RequestFactory().post('/', data)
+        parser = MultiPartParser(
+            request.META, BytesIO(request.body),
+            [StreamingValidationUploadHandler(request)] + request.upload_handlers[1:],
+        )
+        post, files = parser.parse()
+        return request, post, files
+
+    def _staged_files(self):
+        staging_dir = os.path.join(self.media_root, uploads.STAGING_DIR)
+        return os.listdir(staging_dir) if os.path.isdir(staging_dir) else []
+
+    def test_valid_file_staged_in_storage(self):
+        request, post, files = self._parse({
+            'nome': 'Mario',
+            'attachments': SimpleUploadedFile('atto.pdf', PDF),
+        })
+
+        upload = files['attachments']
+        self.assertIsInstance(upload, StagedUploadedFile)
+        self.assertEqual(upload.size, len(PDF))
+        self.assertTrue(upload.temporary_file_path().startswith(self.media_root))
+        self.assertEqual(upload.sha256, hashlib.sha256(PDF).hexdigest())
+        self.assertFalse(hasattr(request, 'upload_error'))
+
+        # Il salvataggio nello storage è un rename, non una copia
+        name = protected_storage().save('appointments/1/atto.pdf', upload)
+        upload.close()
+        self.assertEqual(self._staged_files(), [])
+        with protected_storage().open(name) as f:
+            self.assertEqual(f.read(), PDF)
+
+    def test_content_mismatch_rejected_before_disk(self):
+        with mock.patch('sld_project.uploads.StagedUploadedFile') as staged:
+            request, post, files = self._parse({
+                'attachments': SimpleUploadedFile('atto.pdf', PNG),
+                'nome': 'Mario',
+            })
+
+        staged.assert_not_called()
+        self.assertIn('atto.pdf', request.upload_error)
+        self.assertIn('non corrisponde', request.upload_error)
+        self.assertNotIn('attachments', files)
+        # I campi successivi al file non vengono letti
+        self.assertNotIn('nome', post)
+
+    def test_extension_rejected(self):
+        request, _post, files = self._parse({
+            'documents': SimpleUploadedFile('script.exe', b'MZ' + b'\x00' * 100),
+        })
+        self.assertIn('Tipo di file non permesso', request.upload_error)
+        self.assertEqual(len(files), 0)
+
+    def test_per_file_limit(self):
+        policy = {'validator': FileValidator(max_size=1024), 'max_total_size': 10 * 1024 * 1024}
+        with mock.patch.dict(uploads.UPLOAD_FIELDS, {'attachments': policy}):
+            request, _post, files = self._parse({
+                'attachments': SimpleUploadedFile('atto.pdf', PDF),
+            })
+
+        self.assertIn('troppo grande', request.upload_error)
+        self.assertEqual(len(files), 0)
+        self.assertEqual(self._staged_files(), [])
+
+    def test_total_limit(self):
+        content = PDF + b'0' * 600 * 1024
+        policy = {'validator': FileValidator(), 'max_total_size': 1024 * 1024}
+        with mock.patch.dict(uploads.UPLOAD_FIELDS, {'attachments': policy}):
+            request, _post, files = self._parse({
+                'attachments': [
+                    SimpleUploadedFile('uno.pdf', content),
+                    SimpleUploadedFile('due.pdf', content),
+                ],
+            })
+
+        self.assertEqual(request.upload_error, 'La dimensione totale degli allegati supera i 1MB')
+        # Il primo file, già completo, si elimina alla chiusura della richiesta
+        for upload in files.getlist('attachments'):
+            upload.close()
+        self.assertEqual(self._staged_files(), [])
+
+    def test_other_fields_use_default_handlers(self):
+        request, _post, files = self._parse({
+            'file': SimpleUploadedFile('foto.exe', b'qualsiasi'),
+        })
+        self.assertNotIsInstance(files['file'], StagedUploadedFile)
+        self.assertEqual(files['file'].read(), b'qualsiasi')
+
+
+class CheckoutUploadTest(TestCase):
+    """La view di prenotazione risponde con l'errore dell'upload."""
+
+    def test_rejected_upload_returns_error(self):
+        response = Client().post('/prenota/checkout/', {
+            'first_name': 'Mario',
+            'attachments': ContentFile(PNG, name='atto.pdf'),
+        }, HTTP_X_FORWARDED_FOR='127.0.0.1')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('non corrisponde', response.json()['error'])
+        self.assertEqual(Appointment.objects.count(), 0)
@@ -0,0 +1,97 @@
+"""
+Test per robots.txt, security.txt e favicon generati per host.
+"""
+import os
+import re
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.utils import timezone
+
+from sld_project import wellknown
+from sld_project.models import SiteSettings
+from sld_project.tests import setup_wagtail_home
+
+
+@override_settings(ALLOWED_HOSTS=['studio.example.com', '.example.org', '*', 'testserver'])
+class WellKnownFilesTest(TestCase):
+    """Generazione dei file statici per host."""
+
+    def setUp(self):
+        cache.clear()
+        self.root = tempfile.mkdtemp()
+        self.override = override_settings(WELLKNOWN_ROOT=os.path.join(self.root, 'wellknown'))
+        self.override.enable()
+        self.home = setup_wagtail_home()
+        self.settings = SiteSettings.for_site(self.home.get_site())
+        self.settings.email = 'studio@example.com'
+        self.settings.save()
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def _read(self, *parts):
+        with open(os.path.join(wellknown.get_wellknown_root(), *parts), encoding='utf-8') as fh:
+            return fh.read()
+
+    def test_configured_hosts_skip_wildcards(self):
+        hosts = wellknown.configured_hosts()
+        self.assertIn('studio.example.com', hosts)
+        self.assertIn('localhost', hosts)
+        self.assertNotIn('*', hosts)
+        self.assertNotIn('.example.org', hosts)
+
+    def test_command_writes_files_per_host(self):
+        call_command('build_wellknown', stdout=open(os.devnull, 'w'))
+        robots = self._read('studio.example.com', 'robots.txt')
+        self.assertIn('Disallow: /admin/', robots)
+        self.assertIn('Sitemap: http://studio.example.com/sitemap.xml', robots)
+        # security.txt resta dinamico
+        self.assertFalse(os.path.exists(
+            os.path.join(wellknown.get_wellknown_root(), 'studio.example.com', '.well-known', 'security.txt')
+        ))
+
+    def test_settings_save_refreshes_existing_files(self):
+        call_command('build_wellknown', '--host', 'studio.example.com', stdout=open(os.devnull, 'w'))
+        os.remove(os.path.join(wellknown.get_wellknown_root(), 'studio.example.com', 'robots.txt'))
+        self.settings.save()
+        self.assertIn('Disallow: /admin/', self._read('studio.example.com', 'robots.txt'))
+
+    def test_security_txt_never_expires(self):
+        later = timezone.now() + timedelta(days=400)
+        content = wellknown.build_security_txt('https://studio.example.com', self.settings, now=later)
+        expires = re.search(r'^Expires: (.+)$', content, re.MULTILINE).group(1)
+        self.assertGreater(datetime.strptime(expires, '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=dt_timezone.utc), later)
+
+        # Stesso contenuto (ed ETag) per tutto il giorno
+        self.assertEqual(
+            wellknown.build_security_txt('https://x', self.settings, now=later.replace(hour=1)),
+            wellknown.build_security_txt('https://x', self.settings, now=later.replace(hour=22)),
+        )
+
+    def test_settings_save_without_deploy_writes_nothing(self):
+        self.settings.save()
+        self.assertFalse(os.path.exists(wellknown.get_wellknown_root()))
+
+    def test_django_fallback_views(self):
+        client = Client()
+        robots = client.get('/robots.txt', HTTP_HOST='studio.example.com')
+        self.assertEqual(robots.status_code, 200)
+        self.assertIn('Sitemap: http://studio.example.com/sitemap.xml', robots.content.decode())
+
+        security = client.get('/.well-known/security.txt')
+        self.assertEqual(security.status_code, 200)
+        self.assertIn('max-age=86400', security['Cache-Control'])
+        self.assertIn('Contact: mailto:studio@example.com', security.content.decode())
+
+        self.settings.email = 'nuova@example.com'
+        self.settings.save()
+        self.assertIn('nuova@example.com', client.get('/.well-known/security.txt').content.decode())
+
+    def test_favicon_without_settings_is_404(self):
+        self.assertEqual(Client().get('/favicon.ico').status_code, 404)
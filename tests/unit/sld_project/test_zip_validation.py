@@ -0,0 +1,108 @@
+"""
+Test per il controllo degli archivi ZIP in FileValidator.
+"""
+import io
+import struct
+import zipfile
+from unittest import mock
+
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase
+
+from sld_project import validators
+from sld_project.validators import inspect_zip, validate_attachment_file
+
+PDF = b'%PDF-1.4\nparere'
+
+
+def make_zip(entries, compression=zipfile.ZIP_DEFLATED):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', compression) as archive:
+        for name, content in entries:
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+class RecordingFile(SimpleUploadedFile):
+    """Registra la dimensione massima di ogni read."""
+
+    max_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.max_read = max(self.max_read, len(data))
+        return data
+
+
+class ZipInspectionTest(SimpleTestCase):
+
+    def _validate(self, data, name='pratica.zip'):
+        validate_attachment_file(SimpleUploadedFile(name, data))
+
+    def test_valid_archive(self):
+        self._validate(make_zip([('atti/parere.pdf', PDF), ('atti/', b''), ('note.txt', b'note')]))
+
+    def test_disallowed_inner_extension(self):
+        with self.assertRaisesMessage(ValidationError, 'programma.exe'):
+            self._validate(make_zip([('parere.pdf', PDF), ('programma.exe', b'MZ')]))
+
+    def test_nested_archive_rejected(self):
+        with self.assertRaisesMessage(ValidationError, 'interno.zip'):
+            self._validate(make_zip([('interno.zip', make_zip([('a.pdf', PDF)]))]))
+
+    def test_path_traversal_rejected(self):
+        with self.assertRaisesMessage(ValidationError, 'File non permesso'):
+            self._validate(make_zip([('../parere.pdf', PDF)]))
+
+    def test_office_documents_in_archive(self):
+        docx = make_zip([('[Content_Types].xml', b'<Types/>'), ('word/document.xml', b'<w:document/>')])
+        archive = make_zip([('contratto.docx', docx), ('memoria.odt', b'PK'), ('parere.pdf', PDF)])
+        self._validate(archive, name='atti.zip')
+        validators.validate_document_file(SimpleUploadedFile('atti.zip', archive))
+
+    def test_docx_inner_files_not_filtered(self):
+        docx = make_zip([('[Content_Types].xml', b'<Types/>'), ('word/document.xml', b'<w:document/>')])
+        self._validate(docx, name='contratto.docx')
+
+    def test_entry_limit(self):
+        data = make_zip([(f'doc_{i}.pdf', PDF) for i in range(5)])
+        with mock.patch.object(validators, 'ZIP_MAX_ENTRIES', 4):
+            with self.assertRaisesMessage(ValidationError, 'troppi file'):
+                self._validate(data)
+
+    def test_total_uncompressed_limit(self):
+        data = make_zip([('a.txt', b'a' * 1000), ('b.txt', b'b' * 1000)], zipfile.ZIP_STORED)
+        with mock.patch.object(validators, 'ZIP_MAX_UNCOMPRESSED_SIZE', 1500):
+            with self.assertRaisesMessage(ValidationError, 'una volta estratto'):
+                self._validate(data)
+
+    def test_compression_bomb(self):
+        data = make_zip([('vuoto.txt', b'\0' * (4 * 1024 * 1024))])
+        self.assertLess(len(data), 10 * 1024)
+        with self.assertRaisesMessage(ValidationError, 'Rapporto di compressione'):
+            self._validate(data)
+
+    def test_overlapping_entries(self):
+        data = bytearray(make_zip([('a.txt', b'a' * 100)], zipfile.ZIP_STORED))
+        header = data.index(b'PK\x01\x02')
+        # Dimensione compressa dichiarata oltre lo spazio dei dati
+        struct.pack_into('<L', data, header + 20, 10_000)
+        with self.assertRaisesMessage(ValidationError, 'danneggiato'):
+            self._validate(bytes(data))
+
+    def test_missing_central_directory(self):
+        data = make_zip([('a.pdf', PDF)])
+        with self.assertRaisesMessage(ValidationError, 'danneggiato'):
+            self._validate(data[:data.index(b'PK\x01\x02')])
+
+    def test_reads_only_central_directory(self):
+        data = make_zip([(f'doc_{i}.pdf', PDF * 1000) for i in range(50)], zipfile.ZIP_STORED)
+        upload = RecordingFile('pratica.zip', data)
+
+        with mock.patch('zlib.decompressobj') as decompress:
+            inspect_zip(upload, validators.ALLOWED_EXTENSIONS)
+
+        decompress.assert_not_called()
+        self.assertLessEqual(upload.max_read, 22 + 0xFFFF)
+        self.assertEqual(upload.tell(), 0)
@@ -0,0 +1,28 @@
+"""
+Utility condivise dai test unitari.
+"""
+import shutil
+import tempfile
+
+from django.test import override_settings
+from wagtail.utils.sendfile import _get_sendfile
+
+
+class TemporaryMediaMixin:
+    """
+    MEDIA_ROOT (e SENDFILE_ROOT) in una directory temporanea propria di
+    ogni test, rimossa alla fine: i file scritti da un test non sono
+    visibili agli altri.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, SENDFILE_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        # Wagtail memorizza il backend sendfile al primo uso
+        _get_sendfile.clear()
+        self.addCleanup(_get_sendfile.clear)